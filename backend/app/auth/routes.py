@@ -1,6 +1,6 @@
 from fastapi import APIRouter,HTTPException,Depends
 from fastapi.responses import RedirectResponse,JSONResponse
-import httpx
+from githubapi.client import get_github_client,auth_headers
 from auth.schemas import UserInfo,UserTokenInfo,UserGithubInfo
 from auth.db import upsert_user,set_user_inactive
 from auth.security import create_token,verify_token
@@ -34,22 +34,19 @@ async def callback(code:str):
             "client_secret":GITHUB_CLIENT_SECRET,
             "code":code
         }
-        async with httpx.AsyncClient() as client:
-            token_response = await client.post(
-                "https://github.com/login/oauth/access_token",
-                headers=headers,
-                params=params,
-            )
+        client = get_github_client()
+        token_response = await client.post(
+            "https://github.com/login/oauth/access_token",
+            headers=headers,
+            params=params,
+        )
         response_json = token_response.json()
         access_token = response_json.get("access_token")
         print(access_token)
-        headers = {"Authorization":f"Bearer {access_token}"}
-
-        async with httpx.AsyncClient() as client:
-            user_response = await client.get(
-                "https://api.github.com/user",
-                headers=headers
-            )
+        user_response = await client.get(
+            "/user",
+            headers=auth_headers(access_token)
+        )
         user_response_json = user_response.json()
         username = user_response_json.get("login")
         name = user_response_json.get("name")
@@ -0,0 +1,133 @@
+import hashlib
+import os
+import re
+import time
+import httpx
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from githubapi.client import get_github_client,auth_headers
+from metrics.registry import register_source
+from dotenv import load_dotenv
+load_dotenv(override=True)
+
+GITHUB_CACHE_MAX_MB = float(os.getenv("GITHUB_CACHE_MAX_MB","64"))
+# Upper bound on how long a response is served without asking GitHub; GitHub's own
+# Cache-Control max-age (60s on most endpoints) applies when it is shorter
+GITHUB_CACHE_MAX_AGE = float(os.getenv("GITHUB_CACHE_MAX_AGE","60"))
+# Headers kept with a cached body and replayed on hits
+_KEPT_HEADERS = ('content-type','etag','last-modified','link','cache-control')
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+
+class CachedResponse(NamedTuple):
+    headers: Dict[str,str]
+    content: bytes
+    stored_at: float
+    max_age: float
+
+    @property
+    def size(self) -> int:
+        return len(self.content) + sum(len(key) + len(value) for key,value in self.headers.items())
+
+class GitHubResponseCache:
+    """LRU cache of GitHub GET responses keyed by (token identity, URL).
+
+    A response younger than its max-age is served as is. After that it is revalidated with
+    If-None-Match / If-Modified-Since: a 304 (which GitHub doesn't count against the rate
+    limit) refreshes it, a 200 replaces it. Only 200s are stored, and entries are evicted
+    least recently used first once the cached bytes pass `max_bytes`.
+    """
+    def __init__(self,max_bytes:int=None,max_age:float=GITHUB_CACHE_MAX_AGE):
+        self.max_bytes = max_bytes if max_bytes is not None else int(GITHUB_CACHE_MAX_MB * 1024 * 1024)
+        self.max_age = max_age
+        self.entries: OrderedDict = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(token:Optional[str],url:str) -> Tuple[str,str]:
+        # Responses differ per user/installation; the token itself is never kept
+        identity = hashlib.sha256(token.encode('utf-8')).hexdigest()[:32] if token else ''
+        return (identity,url)
+
+    def _store(self,key:Tuple[str,str],response:httpx.Response):
+        self._drop(key)
+        match = _MAX_AGE.search(response.headers.get('cache-control',''))
+        max_age = min(float(match.group(1)),self.max_age) if match else self.max_age
+        entry = CachedResponse(
+            {name:response.headers[name] for name in _KEPT_HEADERS if name in response.headers},
+            response.content,time.monotonic(),max_age,
+        )
+        if not ('etag' in entry.headers or 'last-modified' in entry.headers) or entry.size > self.max_bytes // 4:
+            return
+        self.entries[key] = entry
+        self.bytes += entry.size
+        while self.bytes > self.max_bytes:
+            _,evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.evictions += 1
+
+    def _drop(self,key:Tuple[str,str]):
+        entry = self.entries.pop(key,None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    @staticmethod
+    def _replay(entry:CachedResponse,request:httpx.Request) -> httpx.Response:
+        return httpx.Response(200,headers=entry.headers,content=entry.content,request=request)
+
+    async def get(self,url:str,token:Optional[str]=None,client:Optional[httpx.AsyncClient]=None) -> httpx.Response:
+        """GET `url` (relative to the API base) as `token`, from the cache when it is still valid"""
+        client = client or get_github_client()
+        key = self.key(token,url)
+        headers = auth_headers(token) if token else {}
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            if time.monotonic() - entry.stored_at < entry.max_age:
+                self.hits += 1
+                return self._replay(entry,client.build_request("GET",url,headers=headers))
+            if 'etag' in entry.headers:
+                headers["If-None-Match"] = entry.headers['etag']
+            if 'last-modified' in entry.headers:
+                headers["If-Modified-Since"] = entry.headers['last-modified']
+        response = await client.get(url,headers=headers)
+        if response.status_code == 304 and entry is not None:
+            self.revalidated += 1
+            entry = entry._replace(stored_at=time.monotonic())
+            self.entries[key] = entry
+            return self._replay(entry,response.request)
+        self.misses += 1
+        if response.status_code == 200:
+            self._store(key,response)
+        else:
+            self._drop(key)
+        return response
+
+    def stats(self) -> Dict[str,Any]:
+        lookups = self.hits + self.revalidated + self.misses
+        return {
+            'entries':len(self.entries),
+            'bytes':self.bytes,
+            'max_bytes':self.max_bytes,
+            'hits':self.hits,
+            'revalidated':self.revalidated,
+            'misses':self.misses,
+            'evictions':self.evictions,
+            # Served without downloading the body again (fresh hits and 304s)
+            'hit_rate':round((self.hits + self.revalidated) / lookups,4) if lookups else 0.0,
+        }
+
+_cache: Optional[GitHubResponseCache] = None
+
+def get_github_cache() -> GitHubResponseCache:
+    global _cache
+    if _cache is None:
+        _cache = GitHubResponseCache()
+        register_source("github_cache",_cache.stats)
+    return _cache
+
+async def cached_get(url:str,token:Optional[str]=None) -> httpx.Response:
+    return await get_github_cache().get(url,token)
@@ -0,0 +1,123 @@
+import os
+import time
+import httpx
+from typing import Any, Dict, Optional
+from metrics.registry import register_source
+from dotenv import load_dotenv
+load_dotenv(override=True)
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL","https://api.github.com")
+GITHUB_API_VERSION = os.getenv("GITHUB_API_VERSION","2022-11-28")
+GITHUB_HTTP2 = os.getenv("GITHUB_HTTP2","true").lower() == "true"
+GITHUB_MAX_CONNECTIONS = int(os.getenv("GITHUB_MAX_CONNECTIONS","32"))
+GITHUB_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GITHUB_MAX_KEEPALIVE_CONNECTIONS","32"))
+# Idle connections are kept this long before being closed
+GITHUB_KEEPALIVE_EXPIRY = float(os.getenv("GITHUB_KEEPALIVE_EXPIRY","60"))
+GITHUB_TIMEOUT = float(os.getenv("GITHUB_TIMEOUT","30"))
+GITHUB_CONNECT_TIMEOUT = float(os.getenv("GITHUB_CONNECT_TIMEOUT","10"))
+# How long a request may wait for a free connection once the pool is full
+GITHUB_POOL_TIMEOUT = float(os.getenv("GITHUB_POOL_TIMEOUT","10"))
+
+def auth_headers(token:str) -> Dict[str,str]:
+    return {"Authorization":f"Bearer {token}"}
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Connection-pooled transport that counts requests, handshakes and pool usage for /metrics"""
+    def __init__(self,**kwargs):
+        self.transport = httpx.AsyncHTTPTransport(**kwargs)
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.errors = 0
+        self.statuses: Dict[str,int] = {}
+        self.tcp_connects = 0
+        self.tls_handshakes = 0
+        self.http2_connections = 0
+        self.seconds = 0.0
+
+    async def _trace(self,event:str,info:Dict[str,Any]):
+        # httpcore reports every new connection; reused ones skip these events
+        if event == "connection.connect_tcp.complete":
+            self.tcp_connects += 1
+        elif event == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+        elif event == "http2.send_connection_init.complete":
+            self.http2_connections += 1
+
+    async def handle_async_request(self,request:httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = self._trace
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight,self.in_flight)
+        started = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.seconds += time.perf_counter() - started
+        status = f"{response.status_code // 100}xx"
+        self.statuses[status] = self.statuses.get(status,0) + 1
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+    def stats(self) -> Dict[str,Any]:
+        return {
+            'requests':self.requests,
+            'in_flight':self.in_flight,
+            'max_in_flight':self.max_in_flight,
+            'errors':self.errors,
+            'statuses':dict(self.statuses),
+            'tcp_connects':self.tcp_connects,
+            'tls_handshakes':self.tls_handshakes,
+            'http2_connections':self.http2_connections,
+            # Requests served per new connection; 1.0 means no reuse at all
+            'requests_per_connection':round(self.requests / self.tcp_connects,2) if self.tcp_connects else 0.0,
+            'avg_ms':round(self.seconds / self.requests * 1000,2) if self.requests else 0.0,
+            'max_connections':GITHUB_MAX_CONNECTIONS,
+        }
+
+def create_transport() -> InstrumentedTransport:
+    limits = httpx.Limits(
+        max_connections=GITHUB_MAX_CONNECTIONS,
+        max_keepalive_connections=GITHUB_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=GITHUB_KEEPALIVE_EXPIRY,
+    )
+    # retries only covers failed connection attempts, never a request that was sent
+    return InstrumentedTransport(http2=GITHUB_HTTP2,limits=limits,retries=1)
+
+def create_github_client(transport:httpx.AsyncBaseTransport) -> httpx.AsyncClient:
+    """AsyncClient for api.github.com (and github.com OAuth) with GitHub's default headers and timeouts"""
+    return httpx.AsyncClient(
+        base_url=GITHUB_API_URL,
+        headers={
+            "Accept":"application/vnd.github+json",
+            "X-GitHub-Api-Version":GITHUB_API_VERSION,
+        },
+        timeout=httpx.Timeout(GITHUB_TIMEOUT,connect=GITHUB_CONNECT_TIMEOUT,pool=GITHUB_POOL_TIMEOUT),
+        transport=transport,
+    )
+
+_client: Optional[httpx.AsyncClient] = None
+
+def get_github_client() -> httpx.AsyncClient:
+    """The process-wide GitHub client, sharing one keep-alive (HTTP/2) connection pool.
+
+    Opened by the app lifespan (or on first use outside it) and closed by close_github_client().
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        transport = create_transport()
+        _client = create_github_client(transport)
+        register_source("github_http",transport.stats)
+    return _client
+
+async def close_github_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import math
+import os
+import re
+import httpx
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from githubapi.cache import cached_get
+from dotenv import load_dotenv
+load_dotenv(override=True)
+
+GITHUB_PER_PAGE = int(os.getenv("GITHUB_PER_PAGE","100"))
+# Pages of one listing fetched at once after the first
+GITHUB_PAGE_CONCURRENCY = int(os.getenv("GITHUB_PAGE_CONCURRENCY","8"))
+_LINK = re.compile(r'<([^>]+)>\s*;\s*rel="([^"]+)"')
+
+def parse_link_header(value:Optional[str]) -> Dict[str,str]:
+    """{rel: url} from a Link header: '<...?page=2>; rel="next", <...?page=5>; rel="last"'"""
+    return {rel:url for url,rel in _LINK.findall(value or '')}
+
+def page_url(url:str,page:int,per_page:int) -> str:
+    return str(httpx.URL(url).copy_merge_params({'page':page,'per_page':per_page}))
+
+def _page_items(response:httpx.Response,items_key:Optional[str]) -> List[Any]:
+    body = response.json()
+    return body.get(items_key,[]) if items_key else body
+
+def _page_count(response:httpx.Response,items_key:Optional[str],per_page:int) -> Optional[int]:
+    links = parse_link_header(response.headers.get('link'))
+    if 'last' in links:
+        return int(httpx.URL(links['last']).params.get('page','1'))
+    if 'next' not in links:
+        return 1
+    # Listings wrapped in an object (installation repositories) report their size up front
+    total = response.json().get('total_count') if items_key else None
+    return math.ceil(total / per_page) if isinstance(total,int) else None
+
+async def paginate(
+    url:str,
+    token:Optional[str]=None,
+    items_key:Optional[str]=None,
+    get:Optional[Callable[[str],Awaitable[httpx.Response]]]=None,
+    per_page:int=GITHUB_PER_PAGE,
+    concurrency:int=GITHUB_PAGE_CONCURRENCY,
+) -> AsyncIterator[Any]:
+    """Every item of a paginated GitHub listing.
+
+    The first page and the page count are settled before returning, so a failure
+    (httpx.HTTPStatusError) surfaces before anything is streamed; a later page's failure is
+    raised from the iterator. The Link header (or total_count) gives the page count and the
+    remaining pages are fetched `concurrency` at a time, their items yielded as each page
+    arrives; without a page count the `next` links are followed one by one. `items_key` names
+    the list inside object-shaped pages. Pages go through the conditional cache unless `get`
+    fetches them some other way.
+    """
+    get = get or (lambda page:cached_get(page,token))
+    first = await get(page_url(url,1,per_page))
+    first.raise_for_status()
+    items = _page_items(first,items_key)
+    pages = _page_count(first,items_key,per_page)
+    return _iter_items(url,first,items,pages,get,items_key,per_page,concurrency)
+
+async def _iter_items(url,first,items,pages,get,items_key,per_page,concurrency) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+    if pages is None:
+        response = first
+        while 'next' in parse_link_header(response.headers.get('link')):
+            response = await get(parse_link_header(response.headers['link'])['next'])
+            response.raise_for_status()
+            for item in _page_items(response,items_key):
+                yield item
+        return
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(page:int) -> httpx.Response:
+        async with semaphore:
+            response = await get(page_url(url,page,per_page))
+        response.raise_for_status()
+        return response
+
+    tasks = [asyncio.create_task(fetch(page)) for page in range(2,pages + 1)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for item in _page_items(await next_done,items_key):
+                yield item
+    finally:
+        # The consumer may stop early (or fail); don't leave pages downloading
+        for task in tasks:
+            task.cancel()
+
+async def stream_json_array(items:AsyncIterator[Any]) -> AsyncIterator[bytes]:
+    """Encode items as one JSON array, a few at a time, for a StreamingResponse.
+
+    Once the 200 has gone out a failure can't change the status, so it is logged and re-raised
+    without closing the array: the server then aborts the connection before the final chunk,
+    and the client sees a failed transfer instead of a short, well-formed list.
+    """
+    yield b"["
+    first = True
+    try:
+        async for item in items:
+            yield (b"" if first else b",") + json.dumps(item).encode('utf-8')
+            first = False
+    except Exception as e:
+        print(f"Aborting streamed listing: {e}")
+        raise
+    yield b"]"
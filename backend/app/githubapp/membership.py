@@ -0,0 +1,140 @@
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from metrics.registry import register_source
+from dotenv import load_dotenv
+load_dotenv()
+
+# How long an installation's repository set is trusted before it is reloaded from GitHub;
+# installation_repositories webhooks keep it current in between
+GITHUB_MEMBERSHIP_TTL = float(os.getenv("GITHUB_MEMBERSHIP_TTL","300"))
+
+# {full_name: name} of every repository an installation can access
+RepositorySet = Dict[str,str]
+Loader = Callable[[],Awaitable[Optional[RepositorySet]]]
+
+class InstallationRepositoryIndex:
+    """Per-installation hash set of accessible repositories, so membership checks don't list them.
+
+    The first lookup for an installation loads its full repository list; later lookups are
+    answered from memory. Once a set is older than `ttl` it is still served while one
+    background reload replaces it. Webhook deltas are applied in place and other installation
+    events drop the set. A failed load (None from the loader) is not cached.
+    """
+    def __init__(self,ttl:float=GITHUB_MEMBERSHIP_TTL):
+        self.ttl = ttl
+        self._sets: Dict[str,Tuple[RepositorySet,float]] = {}
+        self._loads: Dict[str,Tuple[asyncio.Task,float]] = {}
+        # When each installation last changed by webhook, so a list downloaded before that isn't trusted
+        self._changed: Dict[str,float] = {}
+        self._cleared_at = float('-inf')
+        self.stats_counters = {'hits':0,'stale_hits':0,'loads':0,'load_failures':0,'shared_loads':0,'webhook_updates':0,'invalidations':0}
+
+    async def repositories(self,installation_id:str,load:Loader) -> Optional[RepositorySet]:
+        installation_id = str(installation_id)
+        cached = self._sets.get(installation_id)
+        if cached is not None:
+            if time.monotonic() - cached[1] < self.ttl:
+                self.stats_counters['hits'] += 1
+            else:
+                self.stats_counters['stale_hits'] += 1
+                self._start_load(installation_id,load)
+            return cached[0]
+        in_flight = self._loads.get(installation_id)
+        if in_flight is not None and in_flight[1] > self._changed_at(installation_id):
+            self.stats_counters['shared_loads'] += 1
+        # A cancelled caller must not cancel the load other callers are waiting on
+        return await asyncio.shield(self._start_load(installation_id,load))
+
+    def _start_load(self,installation_id:str,load:Loader) -> asyncio.Task:
+        in_flight = self._loads.get(installation_id)
+        # A load started before the last change may return the old list; don't join it
+        if in_flight is not None and in_flight[1] > self._changed_at(installation_id):
+            return in_flight[0]
+        started = time.monotonic()
+        task = asyncio.ensure_future(self._load(installation_id,load,started))
+        self._loads[installation_id] = (task,started)
+        task.add_done_callback(lambda done: self._forget_load(installation_id,done))
+        return task
+
+    def _forget_load(self,installation_id:str,task:asyncio.Task):
+        in_flight = self._loads.get(installation_id)
+        if in_flight is not None and in_flight[0] is task:
+            del self._loads[installation_id]
+
+    async def _load(self,installation_id:str,load:Loader,loaded_at:float) -> Optional[RepositorySet]:
+        self.stats_counters['loads'] += 1
+        try:
+            repositories = await load()
+        except Exception as e:
+            print(f"Error loading repositories of installation {installation_id}: {e}")
+            repositories = None
+        cached = self._sets.get(installation_id)
+        if cached is not None and cached[1] > loaded_at:
+            # A later load already finished
+            return cached[0]
+        if repositories is None:
+            self.stats_counters['load_failures'] += 1
+            self._sets.pop(installation_id,None)
+            return None
+        if self._changed_at(installation_id) >= loaded_at:
+            # The list may predate a webhook that arrived while it downloaded: keep the
+            # webhook-updated set if there is one, and reload on the next lookup either way
+            repositories = cached[0] if cached is not None else repositories
+            self._sets[installation_id] = (repositories,float('-inf'))
+            return repositories
+        self._sets[installation_id] = (repositories,loaded_at)
+        return repositories
+
+    def _changed_at(self,installation_id:str) -> float:
+        return max(self._changed.get(installation_id,float('-inf')),self._cleared_at)
+
+    def apply_changes(self,installation_id:str,added:Iterable[dict]=(),removed:Iterable[dict]=()):
+        """Apply an installation_repositories webhook to a loaded set (a missing one loads fresh anyway)"""
+        installation_id = str(installation_id)
+        self.stats_counters['webhook_updates'] += 1
+        self._changed[installation_id] = time.monotonic()
+        cached = self._sets.get(installation_id)
+        if cached is None:
+            return
+        repositories = dict(cached[0])
+        for repo in removed:
+            repositories.pop(repo["full_name"],None)
+        for repo in added:
+            repositories[repo["full_name"]] = repo["name"]
+        # Sets handed out earlier stay unchanged; the stored age is kept so the TTL still applies
+        self._sets[installation_id] = (repositories,cached[1])
+
+    def invalidate(self,installation_id:Optional[str]=None):
+        """Drop one installation's set, or every set when no installation is given"""
+        self.stats_counters['invalidations'] += 1
+        if installation_id is None:
+            self._cleared_at = time.monotonic()
+            self._sets.clear()
+        else:
+            installation_id = str(installation_id)
+            # Nothing cached or loading means the next lookup is fresh anyway; ids that were never
+            # looked up (possibly from unsigned deliveries) aren't recorded
+            if installation_id in self._sets or installation_id in self._loads:
+                self._changed[installation_id] = time.monotonic()
+            self._sets.pop(installation_id,None)
+
+    def stats(self) -> Dict[str,Any]:
+        now = time.monotonic()
+        return {
+            **self.stats_counters,
+            'installations':len(self._sets),
+            'fresh_installations':sum(1 for _,loaded_at in self._sets.values() if now - loaded_at < self.ttl),
+            'repositories':sum(len(repositories) for repositories,_ in self._sets.values()),
+            'loads_in_flight':len(self._loads),
+        }
+
+_index: Optional[InstallationRepositoryIndex] = None
+
+def get_repository_index() -> InstallationRepositoryIndex:
+    global _index
+    if _index is None:
+        _index = InstallationRepositoryIndex()
+        register_source("github_installation_repos",_index.stats)
+    return _index
@@ -1,19 +1,31 @@
 from fastapi import APIRouter,Request,HTTPException,Depends
 from fastapi.responses import RedirectResponse,JSONResponse
-from githubapp.services import generate_jwt_for_githubapp_access,get_githubapp_installation_token,get_repos_with_app_access,is_repo_installed
+from githubapp.services import get_repos_with_app_access,is_repo_installed
 from githubapp.db import addupdate_installation_id,get_installation_id
+from githubapp.membership import get_repository_index
 from auth.security import verify_token
 from auth.schemas import UserTokenInfo
-from user.db import get_user_access_token
+import hashlib
+import hmac
+import json
 import os
-import httpx
 from dotenv import load_dotenv
 load_dotenv()
 
 FRONTEND_URL = os.getenv("FRONTEND_URL")
 GITHUB_APP_ID = int(os.getenv("GITHUB_APP_ID"))
+# Secret configured on the GitHub App's webhook. Without it no delivery can be authenticated,
+# so webhooks may only drop cached repository sets (which then reload from GitHub)
+GITHUB_WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET")
 router = APIRouter(prefix="/githubapp",tags=["githubapp"])
 
+def verify_webhook_signature(body:bytes,signature:str) -> bool:
+    """Whether the delivery is signed with GITHUB_WEBHOOK_SECRET; never true when no secret is set"""
+    if not GITHUB_WEBHOOK_SECRET:
+        return False
+    expected = "sha256=" + hmac.new(GITHUB_WEBHOOK_SECRET.encode("utf-8"),body,hashlib.sha256).hexdigest()
+    return signature is not None and hmac.compare_digest(expected,signature)
+
 @router.get("/callback")
 async def callback(request:Request):
     try:
@@ -55,21 +67,42 @@ async def install_app_on_repo(repo_owner: str, user_data: UserTokenInfo = Depend
 @router.get("/get-installed-repos/{username}")
 async def get_repos(username:str):
     installation_id = await get_installation_id(username)
-    jwt_token = await generate_jwt_for_githubapp_access()
-    github_app_installation_token = await get_githubapp_installation_token(installation_id,jwt_token,username)
-    repos = await get_repos_with_app_access(github_app_installation_token)
-    return JSONResponse({"repositories":repos})
+    repos = await get_repos_with_app_access(installation_id,username) if installation_id else None
+    return JSONResponse({"repositories":repos or []})
 
 @router.post("/webhooks/github")
-async def github_webhook():
-    pass
+async def github_webhook(request:Request):
+    body = await request.body()
+    verified = verify_webhook_signature(body,request.headers.get("X-Hub-Signature-256"))
+    if GITHUB_WEBHOOK_SECRET and not verified:
+        raise HTTPException(status_code=401,detail="Invalid webhook signature")
+    event = request.headers.get("X-GitHub-Event")
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        payload = None
+    if not isinstance(payload,dict):
+        raise HTTPException(status_code=400,detail="Malformed webhook payload")
+    installation_id = (payload.get("installation") or {}).get("id")
+    if installation_id is None:
+        return JSONResponse({"success":True})
+    index = get_repository_index()
+    if event == "installation_repositories" and verified:
+        index.apply_changes(
+            installation_id,
+            added=payload.get("repositories_added",[]),
+            removed=payload.get("repositories_removed",[]),
+        )
+    elif event in ("installation","installation_repositories"):
+        # Created, deleted, suspended or permissions changed: the whole set may differ.
+        # An unverified delivery is never applied, only makes the next lookup ask GitHub
+        index.invalidate(installation_id)
+    return JSONResponse({"success":True})
 
 @router.get("/check-repo/{username}/{repo}")
 async def check_if_app_installated_on_repo(username:str,repo:str):
     installation_id = await get_installation_id(username)
-    jwt_token = await generate_jwt_for_githubapp_access()
-    github_app_installation_token = await get_githubapp_installation_token(installation_id,jwt_token,username)
-    check_if_app_installed = await is_repo_installed(github_app_installation_token,username,repo)
+    check_if_app_installed = installation_id is not None and await is_repo_installed(installation_id,username,username,repo)
     if not check_if_app_installed:
         raise HTTPException(status_code=401,detail="Github app not installed on repo")
     return JSONResponse(status_code=200,content={"success":True})
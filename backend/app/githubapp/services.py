@@ -1,80 +1,81 @@
-import time
-import jwt
 import os
 import httpx
+from typing import AsyncIterator, Dict, Optional
 from dotenv import load_dotenv
 from githubapp.db import delete_installation_id
+from githubapp.tokens import get_token_manager,InstallationTokenError
+from githubapp.membership import get_repository_index
+from githubapi.client import get_github_client,auth_headers
+from githubapi.cache import cached_get
+from githubapi.pagination import paginate
 load_dotenv()
 
-GITHUB_APP_ID = os.getenv("GITHUB_APP_ID")
-private_key_path = os.getenv("GITHUB_PRIVATE_KEY")
-with open(private_key_path, "r") as f:
-    GITHUB_PRIVATE_KEY = f.read()
 FRONTEND_URL = os.getenv("FRONTEND_URL")
 
-async def generate_jwt_for_githubapp_access():
-    payload = {
-        "iat":int(time.time()) - 60,
-        "exp":int(time.time()) + (5 * 60),
-        "iss":GITHUB_APP_ID
-    }
-    print("mmmmmmmmmmmmmmmm")
-    print(jwt.encode(payload,GITHUB_PRIVATE_KEY,algorithm="RS256"))
-    print("mmmmmmmmmmmmmmmm")
-    return jwt.encode(payload,GITHUB_PRIVATE_KEY,algorithm="RS256")
+async def get_githubapp_installation_token(installation_id:str,username:str) -> Optional[str]:
+    """Cached installation access token; None (and the installation forgotten) if GitHub refuses one"""
+    try:
+        return await get_token_manager().installation_token(installation_id)
+    except InstallationTokenError as e:
+        print(f"GitHub API Error: {e}")
+        await delete_installation_id(username)
+        return None
 
-async def get_githubapp_installation_token(installation_id:str,token:str,username:str):
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github+json"
-    }
-    async with httpx.AsyncClient() as client:
-        response = await client.post(f"https://api.github.com/app/installations/{installation_id}/access_tokens",headers=headers)
-        if response.status_code >= 400:  
-            print(f"GitHub API Error: {response.status_code}")
-            print(response.json())
-            await delete_installation_id(username)
-            return None
-        
-        if response.status_code != 201: 
-            print(f"Unexpected status code: {response.status_code}")
+async def installation_request(method:str,url:str,installation_id:str,username:str,cached:bool=True,**kwargs) -> Optional[httpx.Response]:
+    """Request authenticated as the installation (GETs through the conditional cache unless `cached`
+    is False). A 401 drops the cached token and retries once with a new one; None if no token can be had."""
+    manager = get_token_manager()
+    for attempt in range(2):
+        token = await get_githubapp_installation_token(installation_id,username)
+        if token is None:
             return None
-            
-    response_json = response.json()
-    if "token" not in response_json:
-        print("No token in response")
+        if method == "GET" and cached and not kwargs:
+            response = await cached_get(url,token)
+        else:
+            response = await get_github_client().request(method,url,headers=auth_headers(token),**kwargs)
+        if response.status_code != 401 or attempt:
+            return response
+        manager.invalidate(installation_id)
+
+async def iter_installation_repositories(installation_id:str,username:str,cached:bool=True) -> Optional[AsyncIterator[dict]]:
+    """Every repository the installation can access, pages fetched concurrently; None if GitHub refuses"""
+    async def get(url:str) -> httpx.Response:
+        response = await installation_request("GET",url,installation_id,username,cached=cached)
+        if response is None:
+            raise InstallationTokenError(installation_id,401,"no installation token")
+        return response
+    try:
+        return await paginate("/installation/repositories",items_key="repositories",get=get)
+    except (InstallationTokenError,httpx.HTTPStatusError) as e:
+        print(f"Error listing installation repositories: {e}")
+        return None
+
+async def load_installation_repositories(installation_id:str,username:str) -> Optional[Dict[str,str]]:
+    # The membership index is this listing's cache, so it always reads GitHub's current pages
+    repositories = await iter_installation_repositories(installation_id,username,cached=False)
+    if repositories is None:
         return None
-        
-    return response_json["token"]
+    return {repo["full_name"]:repo["name"] async for repo in repositories}
+
+async def installation_repositories(installation_id:str,username:str) -> Optional[Dict[str,str]]:
+    """{full_name: name} of the installation's repositories, from the membership index"""
+    return await get_repository_index().repositories(
+        installation_id,lambda: load_installation_repositories(installation_id,username)
+    )
 
-async def get_repos_with_app_access(github_app_installation_token:str) -> list:
-    headers = {
-        "Authorization": f"Bearer {github_app_installation_token}",
-        "Accept": "application/vnd.github+json"
-    }
-    async with httpx.AsyncClient() as client:
-        response = await client.get("https://api.github.com/installation/repositories?per_page=100",headers=headers)
-    print(response.json())
-    repositories = response.json()["repositories"]
+async def get_repos_with_app_access(installation_id:str,username:str) -> Optional[list]:
+    repositories = await installation_repositories(installation_id,username)
+    if repositories is None:
+        return None
     cleaned_repositories = [
         {
-            "full_name":repo["full_name"],
-            "name":repo["name"]
-        }  for repo in repositories
+            "full_name":full_name,
+            "name":name
+        } for full_name,name in repositories.items()
     ]
-    print(len(repositories))
+    print(len(cleaned_repositories))
     return cleaned_repositories
 
-async def is_repo_installed(installation_token: str, owner: str, repo: str) -> bool:
-    headers = {
-        "Authorization": f"Bearer {installation_token}",
-        "Accept": "application/vnd.github+json"
-    }
-    async with httpx.AsyncClient() as client:
-        response = await client.get("https://api.github.com/installation/repositories?per_page=100", headers=headers)
-    if response.status_code != 200:
-        return False
-    repos = response.json().get("repositories", [])
-    full_name = f"{owner}/{repo}"
-    return any(r.get("full_name") == full_name for r in repos)
-
+async def is_repo_installed(installation_id: str, username: str, owner: str, repo: str) -> bool:
+    repositories = await installation_repositories(installation_id, username)
+    return repositories is not None and f"{owner}/{repo}" in repositories
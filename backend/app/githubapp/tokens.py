@@ -0,0 +1,114 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+import jwt
+from githubapi.client import get_github_client,auth_headers
+from metrics.registry import register_source
+from dotenv import load_dotenv
+load_dotenv()
+
+GITHUB_APP_ID = os.getenv("GITHUB_APP_ID")
+GITHUB_PRIVATE_KEY_PATH = os.getenv("GITHUB_PRIVATE_KEY")
+# GitHub accepts app JWTs valid for at most 10 minutes; iat is backdated for clock drift
+APP_JWT_LIFETIME = 9 * 60
+APP_JWT_CLOCK_DRIFT = 60
+APP_JWT_REFRESH_MARGIN = 60
+# Tokens are replaced this long before they expire, so one never runs out mid-request
+TOKEN_REFRESH_MARGIN = int(os.getenv("GITHUB_TOKEN_REFRESH_MARGIN","300"))
+
+class InstallationTokenError(Exception):
+    def __init__(self,installation_id:str,status_code:int,detail:Any):
+        super().__init__(f"GitHub returned {status_code} for installation {installation_id} token: {detail}")
+        self.installation_id = installation_id
+        self.status_code = status_code
+
+class GitHubAppTokenManager:
+    """Caches the GitHub App JWT and one access token per installation.
+
+    The JWT is re-signed shortly before it expires and installation tokens are reused until
+    shortly before their `expires_at` (an hour after issue). Concurrent callers missing the
+    same installation share one in-flight request. A 401 drops the cached credentials so the
+    next call fetches new ones.
+    """
+    def __init__(self,app_id:str,private_key:str):
+        self.app_id = app_id
+        self.private_key = private_key
+        self._jwt: Optional[Tuple[str,float]] = None
+        self._tokens: Dict[str,Tuple[str,float]] = {}
+        self._refreshes: Dict[str,asyncio.Task] = {}
+        self.stats_counters = {'jwt_signed':0,'token_requests':0,'token_hits':0,'shared_refreshes':0,'invalidations':0}
+
+    def app_jwt(self) -> str:
+        now = time.time()
+        if self._jwt and self._jwt[1] - APP_JWT_REFRESH_MARGIN > now:
+            return self._jwt[0]
+        payload = {"iat":int(now) - APP_JWT_CLOCK_DRIFT,"exp":int(now) + APP_JWT_LIFETIME,"iss":self.app_id}
+        token = jwt.encode(payload,self.private_key,algorithm="RS256")
+        self._jwt = (token,now + APP_JWT_LIFETIME)
+        self.stats_counters['jwt_signed'] += 1
+        return token
+
+    async def installation_token(self,installation_id:str) -> str:
+        installation_id = str(installation_id)
+        cached = self._tokens.get(installation_id)
+        if cached and cached[1] - TOKEN_REFRESH_MARGIN > time.time():
+            self.stats_counters['token_hits'] += 1
+            return cached[0]
+        task = self._refreshes.get(installation_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(installation_id))
+            self._refreshes[installation_id] = task
+            task.add_done_callback(lambda _: self._refreshes.pop(installation_id,None))
+        else:
+            self.stats_counters['shared_refreshes'] += 1
+        # A cancelled caller must not cancel the refresh other callers are waiting on
+        return await asyncio.shield(task)
+
+    async def _fetch(self,installation_id:str) -> str:
+        for attempt in range(2):
+            self.stats_counters['token_requests'] += 1
+            response = await get_github_client().post(
+                f"/app/installations/{installation_id}/access_tokens",
+                headers=auth_headers(self.app_jwt())
+            )
+            if response.status_code == 401 and attempt == 0:
+                # Rejected JWT (clock skew, rotated key): sign a new one and try once more
+                self.invalidate()
+                continue
+            break
+        if response.status_code != 201:
+            self._tokens.pop(installation_id,None)
+            raise InstallationTokenError(installation_id,response.status_code,response.text)
+        body = response.json()
+        expires_at = datetime.fromisoformat(body["expires_at"].replace("Z","+00:00")).timestamp()
+        self._tokens[installation_id] = (body["token"],expires_at)
+        return body["token"]
+
+    def invalidate(self,installation_id:Optional[str]=None):
+        """Drop one installation's token, or the app JWT when no installation is given"""
+        self.stats_counters['invalidations'] += 1
+        if installation_id is None:
+            self._jwt = None
+        else:
+            self._tokens.pop(str(installation_id),None)
+
+    def stats(self) -> Dict[str,Any]:
+        now = time.time()
+        return {
+            **self.stats_counters,
+            'cached_installations':sum(1 for _,expires_at in self._tokens.values() if expires_at > now),
+            'refreshes_in_flight':len(self._refreshes),
+        }
+
+_manager: Optional[GitHubAppTokenManager] = None
+
+def get_token_manager() -> GitHubAppTokenManager:
+    global _manager
+    if _manager is None:
+        with open(GITHUB_PRIVATE_KEY_PATH,"r") as f:
+            private_key = f.read()
+        _manager = GitHubAppTokenManager(GITHUB_APP_ID,private_key)
+        register_source("github_app_tokens",_manager.stats)
+    return _manager
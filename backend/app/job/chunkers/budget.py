@@ -0,0 +1,106 @@
+import os
+from typing import Any, Dict, List
+from job.chunkers.lines import LineIndex
+from dotenv import load_dotenv
+load_dotenv(override=True)
+
+CHUNK_MAX_CHARS = int(os.getenv("CHUNK_MAX_CHARS","3000"))
+CHUNK_MIN_CHARS = int(os.getenv("CHUNK_MIN_CHARS","200"))
+
+def make_chunk(chunk_type:str,name:str,lines:LineIndex,line_start:int,line_end:int,file_path:str,metadata:Dict[str,Any]=None) -> Dict[str,Any]:
+    return {
+        'type':chunk_type,
+        'name':name,
+        'content':lines.slice(line_start,line_end),
+        'file_path':file_path,
+        'line_start':line_start,
+        'line_end':line_end,
+        'metadata':metadata or {}
+    }
+
+def split_oversized(chunk:Dict[str,Any],lines:LineIndex,max_chars:int) -> List[Dict[str,Any]]:
+    """Cut a chunk over `max_chars` into parts on line boundaries; a single line over the budget
+    by itself (minified code, dumps) is cut by character offset into parts on that line"""
+    if chunk['content'] != lines.slice(chunk['line_start'],chunk['line_end']):
+        # A character range that starts or ends inside a line (JS members sharing a line):
+        # split the content itself and shift its line numbers back into the file
+        own = LineIndex(chunk['content'])
+        shift = chunk['line_start'] - 1
+        parts = split_oversized({**chunk,'line_start':1,'line_end':len(own.offsets) - 1},own,max_chars)
+        if len(parts) <= 1:
+            return [chunk]
+        return [{**part,'line_start':part['line_start'] + shift,'line_end':part['line_end'] + shift} for part in parts]
+    # (line_start, line_end, char_start, char_end) of each part
+    parts = []
+    offsets = lines.offsets
+    start = chunk['line_start']
+    size = 0
+    for line in range(chunk['line_start'],chunk['line_end'] + 1):
+        line_size = offsets[line] - offsets[line - 1]
+        if line_size > max_chars:
+            if size:
+                parts.append((start,line - 1,offsets[start - 1],offsets[line - 1] - 1))
+            line_end_offset = offsets[line] - 1
+            for offset in range(offsets[line - 1],line_end_offset,max_chars):
+                parts.append((line,line,offset,min(offset + max_chars,line_end_offset)))
+            start,size = line + 1,0
+            continue
+        if size and size + line_size > max_chars:
+            parts.append((start,line - 1,offsets[start - 1],offsets[line - 1] - 1))
+            start,size = line,0
+        size += line_size
+    if size:
+        parts.append((start,chunk['line_end'],offsets[start - 1],offsets[chunk['line_end']] - 1))
+    if len(parts) <= 1:
+        return [chunk]
+    return [
+        {
+            **chunk,
+            'name':f"{chunk['name']} (part {i + 1})",
+            'content':lines.content[char_start:char_end],
+            'line_start':part_start,
+            'line_end':part_end,
+            'metadata':{**chunk['metadata'],'part':i + 1,'parts':len(parts)}
+        }
+        for i,(part_start,part_end,char_start,char_end) in enumerate(parts)
+    ]
+
+def enforce_budget(chunks:List[Dict[str,Any]],lines:LineIndex,max_chars:int=None,min_chars:int=None) -> List[Dict[str,Any]]:
+    """Split chunks over `max_chars` (on line boundaries, or inside a line that is too long by
+    itself) and merge runs of small neighbours.
+
+    Only adjacent chunks of the same type that are both under `min_chars` are merged, and
+    never past `max_chars`; the merged chunk lists every original name in metadata.
+    Skeleton chunks (content that is not a plain slice of the source) are left alone.
+    """
+    max_chars = max_chars or CHUNK_MAX_CHARS
+    min_chars = min_chars or CHUNK_MIN_CHARS
+    result = []
+    for chunk in chunks:
+        previous = result[-1] if result else None
+        if chunk['metadata'].get('skeleton'):
+            result.append(chunk)
+            continue
+        if (
+            previous is not None
+            and not previous['metadata'].get('skeleton')
+            and previous['type'] == chunk['type']
+            and len(previous['content']) < min_chars
+            and len(chunk['content']) < min_chars
+            and chunk['line_start'] > previous['line_end']
+            and lines.offsets[chunk['line_end']] - lines.offsets[previous['line_start'] - 1] <= max_chars
+        ):
+            names = previous['metadata'].get('names',[previous['name']]) + [chunk['name']]
+            result[-1] = {
+                **previous,
+                'name':', '.join(names),
+                'content':lines.slice(previous['line_start'],chunk['line_end']),
+                'line_end':chunk['line_end'],
+                'metadata':{**previous['metadata'],'names':names}
+            }
+            continue
+        if len(chunk['content']) > max_chars:
+            result.extend(split_oversized(chunk,lines,max_chars))
+        else:
+            result.append(chunk)
+    return result
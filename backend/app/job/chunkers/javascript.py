@@ -0,0 +1,357 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from job.chunkers.lines import LineIndex
+from job.chunkers.budget import enforce_budget, CHUNK_MAX_CHARS
+
+# (kind, value, start, end)
+Token = Tuple[str,str,int,int]
+
+_TOKEN = re.compile(r'''
+    \s*(?:
+    (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>'(?:[^'\\\n]|\\.)*'|"(?:[^"\\\n]|\\.)*")
+  | (?P<name>[A-Za-z_$#\u0080-￿][\w$\u0080-￿]*)
+  | (?P<number>\.?\d[\w.]*)
+  | (?P<punct>=>|\.\.\.|\?\.|[{}()\[\];,:?<>=*/!+\-&|^%~.@`])
+  | (?P<other>.)
+)''',re.VERBOSE | re.DOTALL)
+_REGEX = re.compile(r'/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*')
+_TEMPLATE_TEXT = re.compile(r'(?:[^`\\$]|\\.|\$(?!\{))*',re.DOTALL)
+
+# After these a "/" starts a regex literal rather than a division
+_REGEX_PRECEDING_WORDS = {
+    'return','typeof','instanceof','in','of','new','delete','void','throw',
+    'case','do','else','yield','await',
+}
+_CONTROL_KEYWORDS = {'if','for','while','switch','catch','with','function'}
+_DECLARATION_PREFIXES = {'export','default','async','declare','const','let','var'}
+_MEMBER_MODIFIERS = {
+    'static','async','get','set','public','private','protected','readonly',
+    'override','abstract','*',
+}
+
+def tokenize(content:str) -> Tuple[List[Token],Dict[int,str]]:
+    """Split JS/TS source into tokens in one left-to-right pass.
+
+    Strings, template literals (including nested `${...}` expressions), regex literals and
+    comments are consumed whole so braces inside them never count. Returns the tokens plus
+    the JSDoc comments keyed by their end offset.
+    """
+    tokens: List[Token] = []
+    jsdoc: Dict[int,str] = {}
+    template_depths: List[int] = []
+    depth = 0
+    pos = 0
+    length = len(content)
+
+    def scan_template(pos:int) -> int:
+        """Consume template text from `pos`; returns the offset after "`" or after "${" """
+        end = _TEMPLATE_TEXT.match(content,pos).end()
+        if content.startswith('${',end):
+            template_depths.append(depth)
+            tokens.append(('template',content[pos - 1:end + 2],pos - 1,end + 2))
+            return end + 2
+        tokens.append(('template',content[pos - 1:end + 1],pos - 1,end + 1))
+        return min(end + 1,length)
+
+    while pos < length:
+        match = _TOKEN.match(content,pos)
+        if match is None:
+            break  # only trailing whitespace left
+        kind = match.lastgroup
+        value = match.group(kind)
+        start = match.start(kind)
+        end = match.end()
+        if kind == 'name' or kind == 'string' or kind == 'number':
+            tokens.append((kind,value,start,end))
+            pos = end
+            continue
+        if kind == 'comment':
+            if value.startswith('/**'):
+                jsdoc[end] = value
+            pos = end
+            continue
+        if kind == 'punct':
+            if value == '`':
+                pos = scan_template(end)
+                continue
+            if value == '{':
+                depth += 1
+            elif value == '}':
+                if template_depths and template_depths[-1] == depth:
+                    template_depths.pop()
+                    pos = scan_template(end)
+                    continue
+                depth -= 1
+            elif value == '/':
+                previous = tokens[-1] if tokens else None
+                if (
+                    previous is None
+                    or (previous[0] == 'punct' and previous[1] not in (')',']','}'))
+                    or (previous[0] == 'name' and previous[1] in _REGEX_PRECEDING_WORDS)
+                ):
+                    regex = _REGEX.match(content,start)
+                    if regex:
+                        tokens.append(('regex',regex.group(),start,regex.end()))
+                        pos = regex.end()
+                        continue
+        tokens.append((kind,value,start,end))
+        pos = end
+    return tokens,jsdoc
+
+class _JavaScriptChunker:
+    def __init__(self,content:str,file_path:str):
+        self.content = content
+        self.file_path = file_path
+        self.lines = LineIndex(content)
+        self.tokens,self.jsdoc = tokenize(content)
+        self.paren_match: Dict[int,int] = {}
+        self.chunks: List[Dict[str,Any]] = []
+
+    def _statement_start(self,index:int,prefixes) -> int:
+        while index > 0 and self.tokens[index - 1][1] in prefixes:
+            index -= 1
+        return index
+
+    def _skip_generics(self,index:int) -> int:
+        """If tokens[index] closes a `<...>` type parameter list, return the index before it"""
+        if self.tokens[index][1] != '>':
+            return index
+        nesting = 0
+        for i in range(index,max(index - 64,-1),-1):
+            value = self.tokens[i][1]
+            if value == '>':
+                nesting += 1
+            elif value == '<':
+                nesting -= 1
+                if nesting == 0:
+                    return i - 1
+        return index
+
+    def _params(self,open_index:int,close_index:int) -> List[str]:
+        params = []
+        nesting = 0
+        for i in range(open_index + 1,close_index):
+            kind,value,_,_ = self.tokens[i]
+            if value in ('(','[','{','<'):
+                nesting += 1
+            elif value in (')',']','}','>'):
+                nesting -= 1
+            elif kind == 'name' and nesting == 0 and self.tokens[i - 1][1] in ('(',',','...') and value != 'this':
+                params.append(value)
+        return params
+
+    def _assigned_name(self,index:int) -> Tuple[Optional[str],int]:
+        """Name in `name = <expr>` / `name: <expr>` where the expression starts at `index`"""
+        if index > 0 and self.tokens[index - 1][1] == 'async':
+            index -= 1
+        if index < 2 or self.tokens[index - 1][1] not in ('=',':'):
+            return None,index
+        name_index = index - 2
+        # Skip a simple type annotation: `const handler: Handler = ...`
+        if self.tokens[index - 1][1] == '=' and index >= 4 and self.tokens[index - 3][1] == ':':
+            name_index = index - 4
+        kind,value,_,_ = self.tokens[name_index]
+        if kind not in ('name','string'):
+            return None,index
+        return value.strip('\'"'),self._statement_start(name_index,_DECLARATION_PREFIXES)
+
+    def _classify(self,brace_index:int,enclosing:Optional[Dict[str,Any]]) -> Dict[str,Any]:
+        """Work out what the `{` at `brace_index` opens by looking back at its header"""
+        tokens = self.tokens
+        previous = tokens[brace_index - 1][1] if brace_index else None
+
+        if previous == '=>':
+            param_end = brace_index - 2
+            # `(a): Result => {` - step back over the return type annotation
+            for i in range(param_end,max(param_end - 16,0),-1):
+                if tokens[i][1] in (';','{','}','=','=>'):
+                    break
+                if tokens[i][1] == ')' and (i == param_end or tokens[i + 1][1] == ':'):
+                    param_end = i
+                    break
+            if tokens[param_end][1] == ')':
+                param_start = self.paren_match.get(param_end,param_end)
+                params = self._params(param_start,param_end)
+            else:
+                param_start = param_end
+                params = [tokens[param_end][1]]
+            name,start = self._assigned_name(param_start)
+            return {'kind':'function','name':name,'start':start,'params':params}
+
+        # Walk back over the statement header: `class X extends Y<Z> implements W {` or
+        # `...) {` / `...): ReturnType {`
+        close_paren = None
+        class_index = None
+        for i in range(brace_index - 1,max(brace_index - 64,-1),-1):
+            value = tokens[i][1]
+            if value in (';','{','}'):
+                break
+            if value == 'class' and tokens[i][0] == 'name':
+                class_index = i
+                break
+            if value == ')':
+                annotation = tokens[i + 1][1] if i + 1 < brace_index else None
+                if i == brace_index - 1 or annotation == ':':
+                    close_paren = i
+                break
+            if value in ('=','(',',','return','?','[','=>'):
+                break
+
+        if class_index is not None:
+            name = tokens[class_index + 1][1] if tokens[class_index + 1][0] == 'name' else None
+            bases = [
+                tokens[i + 1][1] for i in range(class_index,brace_index - 1)
+                if tokens[i][1] in ('extends','implements') and tokens[i + 1][0] == 'name'
+            ]
+            if name in ('extends','implements'):
+                name = None
+            if name is None:
+                name,start = self._assigned_name(class_index)
+            else:
+                start = self._statement_start(class_index,_DECLARATION_PREFIXES | {'abstract'})
+            return {'kind':'class','name':name,'start':start,'bases':bases,'methods':[]}
+
+        if close_paren is None:
+            return {'kind':'block'}
+
+        open_paren = self.paren_match.get(close_paren)
+        if open_paren is None or open_paren == 0:
+            return {'kind':'block'}
+        params = self._params(open_paren,close_paren)
+        name_index = self._skip_generics(open_paren - 1)
+        kind,value,_,_ = tokens[name_index]
+
+        if value == 'function' or (value == '*' and tokens[name_index - 1][1] == 'function'):
+            function_index = name_index if value == 'function' else name_index - 1
+            name,start = self._assigned_name(function_index)
+            return {'kind':'function','name':name,'start':start,'params':params}
+        if kind != 'name' or value in _CONTROL_KEYWORDS:
+            return {'kind':'block'}
+        before = tokens[name_index - 1][1] if name_index else None
+        if before == '*' and name_index > 1 and tokens[name_index - 2][1] == 'function':
+            before = 'function'
+            name_index -= 1
+        if before == 'function':
+            start = self._statement_start(name_index - 1,_DECLARATION_PREFIXES)
+            return {'kind':'function','name':value,'start':start,'params':params}
+        if enclosing is not None and enclosing['kind'] in ('class','object'):
+            start = self._statement_start(name_index,_MEMBER_MODIFIERS)
+            kind = 'method' if enclosing['kind'] == 'class' else 'function'
+            return {'kind':kind,'name':value.lstrip('#'),'start':start,'params':params}
+        return {'kind':'block'}
+
+    def _docstring(self,offset:int) -> str:
+        pos = offset - 1
+        while pos >= 0 and self.content[pos].isspace():
+            pos -= 1
+        comment = self.jsdoc.get(pos + 1)
+        if not comment:
+            return ""
+        lines = [line.strip().lstrip('*').strip() for line in comment[3:-2].splitlines()]
+        return '\n'.join(line for line in lines if line)
+
+    def _emit(self,entry:Dict[str,Any],end_offset:int,class_name:Optional[str]=None):
+        start_offset = self.tokens[entry['start']][2]
+        content = self.content[start_offset:end_offset]
+        if entry['kind'] == 'class':
+            # Skeleton: the class with every method body collapsed to `{ ... }`
+            parts,cursor = [],start_offset
+            for body_start,body_end in entry['methods']:
+                parts.append(self.content[cursor:body_start + 1])
+                parts.append(' ... ')
+                cursor = body_end - 1
+            parts.append(self.content[cursor:end_offset])
+            content = ''.join(parts)
+            metadata = {'base_classes':entry['bases'],'methods':entry['method_names'],'skeleton':True}
+            chunk_type = 'class'
+        else:
+            metadata = {'args':entry['params']}
+            if class_name:
+                metadata['class_name'] = class_name
+            chunk_type = 'function'
+        self.chunks.append({
+            'type':chunk_type,
+            'name':entry['name'],
+            'content':content,
+            'docstring':self._docstring(start_offset),
+            'file_path':self.file_path,
+            'line_start':self.lines.line_of(start_offset),
+            'line_end':self.lines.line_of(end_offset - 1),
+            'metadata':metadata
+        })
+
+    def chunk(self) -> List[Dict[str,Any]]:
+        tokens = self.tokens
+        paren_stack: List[int] = []
+        braces: List[Dict[str,Any]] = []
+        # Named functions/methods currently open; code inside them stays in their chunk
+        open_functions = 0
+
+        for index,(kind,value,start,end) in enumerate(tokens):
+            if kind != 'punct':
+                continue
+            if value in ('(','['):
+                paren_stack.append(index)
+            elif value in (')',']'):
+                if paren_stack:
+                    self.paren_match[index] = paren_stack.pop()
+            elif value == '{':
+                enclosing = braces[-1] if braces else None
+                previous = tokens[index - 1][1] if index else None
+                if previous in ('=','(',',',':','[','?','return','??','||','&&'):
+                    entry = {'kind':'object'}
+                else:
+                    entry = self._classify(index,enclosing)
+                    if entry['kind'] == 'function' and enclosing is not None and enclosing['kind'] == 'class':
+                        # Arrow-function class fields behave like methods
+                        entry['kind'] = 'method'
+                entry['open'] = start
+                named = entry['kind'] in ('function','method','class') and entry.get('name')
+                entry['emit'] = bool(named) and open_functions == 0
+                if entry['kind'] == 'method':
+                    entry['emit'] = entry['emit'] and enclosing is not None and enclosing.get('emit',False)
+                if entry['kind'] == 'class':
+                    entry['method_names'] = []
+                if named and entry['kind'] != 'class':
+                    open_functions += 1
+                    entry['counted'] = True
+                braces.append(entry)
+            elif value == '}':
+                if not braces:
+                    continue
+                entry = braces.pop()
+                if entry.get('counted'):
+                    open_functions -= 1
+                enclosing = braces[-1] if braces else None
+                if entry['kind'] == 'method' and enclosing is not None and enclosing['kind'] == 'class':
+                    enclosing['methods'].append((entry['open'],end))
+                    enclosing['method_names'].append(entry['name'])
+                if entry['emit']:
+                    class_name = enclosing['name'] if entry['kind'] == 'method' and enclosing else None
+                    self._emit(entry,end,class_name)
+        # Outer chunks close after inner ones; report them in source order
+        self.chunks.sort(key=lambda chunk:(chunk['line_start'],-chunk['line_end']))
+        return self.chunks
+
+def is_minified(lines:LineIndex,max_chars:int) -> bool:
+    """Whether most of the source sits on lines longer than `max_chars` (bundles, minified builds)"""
+    offsets = lines.offsets
+    long_lines = sum(
+        size for size in (offsets[i] - offsets[i - 1] for i in range(1,len(offsets))) if size > max_chars
+    )
+    return long_lines * 2 > len(lines.content)
+
+def chunk_javascript(content:str,file_path:str) -> List[Dict[str,Any]]:
+    """Function, class (skeleton) and method chunks for .js/.ts/.jsx/.tsx source, within the
+    chunk budget.
+
+    Minified sources return [] so they fall back to generic chunking: their thousands of tiny
+    functions would all share one line, and cutting the text by character offset gives fewer,
+    budget-sized chunks for a fraction of the work.
+    """
+    lines = LineIndex(content)
+    if is_minified(lines,CHUNK_MAX_CHARS):
+        return []
+    chunker = _JavaScriptChunker(content,file_path)
+    return enforce_budget(chunker.chunk(),chunker.lines)
@@ -0,0 +1,20 @@
+from bisect import bisect_right
+
+class LineIndex:
+    """Start offset of every line, built once so any line range can be sliced directly"""
+    def __init__(self,content:str):
+        self.content = content
+        self.offsets = [0]
+        pos = content.find('\n')
+        while pos != -1:
+            self.offsets.append(pos + 1)
+            pos = content.find('\n',pos + 1)
+        self.offsets.append(len(content) + 1)
+    
+    def slice(self,line_start:int,line_end:int) -> str:
+        """Lines `line_start`..`line_end` (1-based, inclusive) without the trailing newline"""
+        return self.content[self.offsets[line_start - 1]:self.offsets[line_end] - 1]
+    
+    def line_of(self,offset:int) -> int:
+        """1-based line number containing character `offset`"""
+        return bisect_right(self.offsets,offset,0,len(self.offsets) - 1)
@@ -0,0 +1,148 @@
+import re
+from typing import Any, Dict, List, Optional
+from job.chunkers.lines import LineIndex
+from job.chunkers.budget import make_chunk, enforce_budget
+
+_HEADING = re.compile(r'(#{1,6})\s+(.*?)\s*#*\s*$')
+_FENCE = re.compile(r'\s*(```|~~~)')
+_YAML_KEY = re.compile(r'''(?:"([^"]+)"|'([^']+)'|([^\s#'"\-?:][^:#]*?))\s*:(?:\s|$)''')
+_SECTION = re.compile(r'\s*\[\[?\s*([^\]]+?)\s*\]\]?\s*(?:[#;].*)?$')
+_JSON_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[{}\[\],:]')
+_SQL_COMMENT = re.compile(r"--[^\n]*|/\*.*?(?:\*/|\Z)",re.DOTALL)
+_SQL_TOKEN = re.compile(r"--[^\n]*|/\*.*?(?:\*/|\Z)|'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\$\$.*?\$\$|;",re.DOTALL)
+
+def _line_chunks(lines:LineIndex,starts:List[tuple],file_path:str,chunk_type:str,last_line:int) -> List[Dict[str,Any]]:
+    """Turn (line, name, metadata) section starts into chunks that run to the next start"""
+    chunks = []
+    for i,(start,name,metadata) in enumerate(starts):
+        end = starts[i + 1][0] - 1 if i + 1 < len(starts) else last_line
+        while end > start and not lines.slice(end,end).strip():
+            end -= 1
+        chunks.append(make_chunk(chunk_type,name,lines,start,end,file_path,metadata))
+    return chunks
+
+def markdown_chunker(content:str,file_path:str) -> List[Dict[str,Any]]:
+    """One chunk per heading section (headings inside code fences don't count)"""
+    lines = LineIndex(content)
+    last_line = len(lines.offsets) - 1
+    starts = []
+    trail: List[str] = []
+    in_fence = False
+    for line in range(1,last_line + 1):
+        text = lines.slice(line,line)
+        if _FENCE.match(text):
+            in_fence = not in_fence
+            continue
+        heading = None if in_fence else _HEADING.match(text)
+        if not heading:
+            if not starts and text.strip():
+                starts.append((line,file_path,{'headings':[]}))
+            continue
+        level = len(heading.group(1))
+        trail = trail[:level - 1] + [heading.group(2)]
+        starts.append((line,heading.group(2),{'headings':list(trail),'level':level}))
+    return enforce_budget(_line_chunks(lines,starts,file_path,'section',last_line),lines)
+
+def yaml_chunker(content:str,file_path:str) -> List[Dict[str,Any]]:
+    """One chunk per top-level mapping key, with its leading comments"""
+    lines = LineIndex(content)
+    last_line = len(lines.offsets) - 1
+    starts = []
+    pending_comment: Optional[int] = None
+    for line in range(1,last_line + 1):
+        text = lines.slice(line,line)
+        if not text or text[0].isspace():
+            if not text.strip():
+                pending_comment = None
+            continue
+        if text.startswith('#'):
+            pending_comment = pending_comment or line
+            continue
+        if text.startswith('---'):
+            pending_comment = None
+            continue
+        key = _YAML_KEY.match(text)
+        if key:
+            name = next(group for group in key.groups() if group)
+            starts.append((pending_comment or line,name.strip(),{}))
+        elif not starts:
+            starts.append((line,file_path,{}))
+        pending_comment = None
+    if not starts:
+        return []
+    return enforce_budget(_line_chunks(lines,starts,file_path,'key',last_line),lines)
+
+def json_chunker(content:str,file_path:str) -> List[Dict[str,Any]]:
+    """One chunk per key of a top-level object (or per element of a top-level array)"""
+    lines = LineIndex(content)
+    depth = 0
+    top = None
+    expect_item = False
+    starts = []
+    for match in _JSON_TOKEN.finditer(content):
+        token = match.group()
+        if depth == 1:
+            if expect_item and top == '{' and token.startswith('"'):
+                starts.append((token[1:-1],match.start()))
+                expect_item = False
+            elif expect_item and top == '[' and token not in (',',']'):
+                starts.append((f"[{len(starts)}]",match.start()))
+                expect_item = False
+            elif token == ',':
+                expect_item = True
+        if token in ('{','['):
+            if depth == 0:
+                top = token
+                expect_item = True
+            depth += 1
+        elif token in ('}',']'):
+            depth -= 1
+    sections = []
+    for name,offset in starts:
+        line = lines.line_of(offset)
+        # Several keys on one line (minified JSON) share a chunk
+        if not sections or sections[-1][0] != line:
+            sections.append((line,name,{}))
+    if not sections:
+        return []
+    sections[0] = (1,sections[0][1],sections[0][2])
+    return enforce_budget(_line_chunks(lines,sections,file_path,'key',len(lines.offsets) - 1),lines)
+
+def sql_chunker(content:str,file_path:str) -> List[Dict[str,Any]]:
+    """One chunk per statement, split on semicolons outside strings and comments"""
+    lines = LineIndex(content)
+    chunks = []
+    start = 0
+    for match in _SQL_TOKEN.finditer(content):
+        if match.group() != ';':
+            continue
+        statement = content[start:match.end()]
+        if statement.strip():
+            first = start + len(statement) - len(statement.lstrip())
+            line_start = lines.line_of(first)
+            line_end = lines.line_of(match.end() - 1)
+            name = ' '.join(_SQL_COMMENT.sub(' ',statement).split()[:4])
+            chunks.append(make_chunk('statement',name,lines,line_start,line_end,file_path))
+        start = match.end()
+    tail = content[start:]
+    if tail.strip():
+        first = start + len(tail) - len(tail.lstrip())
+        line_start = lines.line_of(first)
+        line_end = lines.line_of(start + len(tail.rstrip()) - 1)
+        chunks.append(make_chunk('statement',' '.join(_SQL_COMMENT.sub(' ',tail).split()[:4]),lines,line_start,line_end,file_path))
+    return enforce_budget(chunks,lines)
+
+def section_chunker(content:str,file_path:str) -> List[Dict[str,Any]]:
+    """One chunk per `[section]` / `[[table]]` of an INI or TOML file"""
+    lines = LineIndex(content)
+    last_line = len(lines.offsets) - 1
+    starts = []
+    for line in range(1,last_line + 1):
+        section = _SECTION.match(lines.slice(line,line))
+        if section:
+            starts.append((line,section.group(1),{}))
+    if not starts:
+        return []
+    if starts[0][0] > 1:
+        starts.insert(0,(1,file_path,{}))
+    return enforce_budget(_line_chunks(lines,starts,file_path,'section',last_line),lines)
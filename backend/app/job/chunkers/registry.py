@@ -0,0 +1,28 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from job.chunkers.javascript import chunk_javascript
+from job.chunkers.structural import brace_chunker, indent_chunker
+from job.chunkers.markup import markdown_chunker, yaml_chunker, json_chunker, sql_chunker, section_chunker
+
+Chunker = Callable[[str,str],List[Dict[str,Any]]]
+
+# Extension -> chunker(content, file_path). A chunker returning [] falls back to generic chunking.
+CHUNKERS: Dict[str,Chunker] = {}
+
+def register_chunker(extensions:Iterable[str],chunker:Chunker):
+    for extension in extensions:
+        CHUNKERS[extension.lower()] = chunker
+
+def get_chunker(extension:str) -> Optional[Chunker]:
+    return CHUNKERS.get(extension.lower())
+
+register_chunker(('.js','.ts','.jsx','.tsx'),chunk_javascript)
+register_chunker(('.java','.c','.h','.cpp','.cs','.go','.rs','.swift','.kt','.scala'),brace_chunker('c_like'))
+register_chunker(('.php',),brace_chunker('php'))
+register_chunker(('.css',),brace_chunker('css'))
+register_chunker(('.scss',),brace_chunker('scss'))
+register_chunker(('.rb','.sass'),indent_chunker)
+register_chunker(('.md',),markdown_chunker)
+register_chunker(('.yml','.yaml'),yaml_chunker)
+register_chunker(('.json',),json_chunker)
+register_chunker(('.sql',),sql_chunker)
+register_chunker(('.toml','.ini'),section_chunker)
@@ -0,0 +1,226 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from job.chunkers.lines import LineIndex
+from job.chunkers.budget import make_chunk, enforce_budget, CHUNK_MAX_CHARS
+
+# Type parameters, one level of nesting deep: <T>, <'a, T: Iterator<Item = u8>>
+_GENERICS = r'<(?:[^<>{}]|<[^<>{}]*>)*>'
+_CONTAINER = re.compile(
+    r'\b(?:class|struct|interface|enum|trait|impl|namespace|object|protocol|extension|record|module|union)'
+    r'(?:\s*' + _GENERICS + r')?\s+'
+    r'(?:[\w:]+(?:\s*' + _GENERICS + r')?\s+for\s+)?([A-Za-z_][\w:.]*)'
+)
+_GO_TYPE = re.compile(r'\btype\s+([A-Za-z_]\w*)\s+(?:struct|interface)\b')
+_CALLABLE = re.compile(r'([A-Za-z_~$][\w$]*)\s*(?:<[^()]*>)?\s*\(')
+_NOT_NAMES = {
+    'if','for','while','switch','catch','return','sizeof','func','fn','fun','function',
+    'def','foreach','using','lock','fixed','synchronized','when','match','new','else','do',
+}
+
+def _brace_pattern(single_quote_strings:bool,line_comments:str,raw_strings:bool) -> re.Pattern:
+    parts = [r'(?P<comment>/\*.*?(?:\*/|\Z)' + (f'|{line_comments}[^\\n]*' if line_comments else '') + ')']
+    strings = []
+    if raw_strings:
+        strings += [r'"""[\s\S]*?(?:"""|\Z)', r'`[^`]*`', r'@"(?:[^"]|"")*"', r'r(#*)"[\s\S]*?"\1']
+    strings.append(r'"(?:[^"\\\n]|\\.)*"')
+    # Where single quotes are character literals (or Rust lifetimes) only match one char
+    strings.append(r"'(?:[^'\\\n]|\\.)*'" if single_quote_strings else r"'(?:\\.|[^'\\\n])'")
+    parts.append('(?P<string>' + '|'.join(strings) + ')')
+    parts.append(r'(?P<brace>[{}])')
+    return re.compile('|'.join(parts),re.DOTALL)
+
+_BRACE_PATTERNS = {
+    'c_like':_brace_pattern(False,'//',True),
+    'php':_brace_pattern(True,'(?://|#(?!\\[))',False),
+    'css':_brace_pattern(True,None,False),
+    'scss':_brace_pattern(True,'//',False),
+}
+
+def _brace_blocks(content:str,pattern:re.Pattern) -> List[Tuple[int,int,int]]:
+    """(open offset, close offset, depth) of every balanced brace pair outside strings/comments"""
+    stack = []
+    blocks = []
+    for match in pattern.finditer(content):
+        if match.lastgroup != 'brace':
+            continue
+        if match.group() == '{':
+            stack.append(match.start())
+        elif stack:
+            open_offset = stack.pop()
+            blocks.append((open_offset,match.start(),len(stack)))
+    blocks.sort()
+    return blocks
+
+def _describe(header:str) -> Tuple[str,str]:
+    """(chunk type, name) for the text in front of a block's opening brace"""
+    container = _CONTAINER.search(header) or _GO_TYPE.search(header)
+    if container:
+        return 'class',container.group(1)
+    for match in _CALLABLE.finditer(header):
+        if match.group(1) not in _NOT_NAMES:
+            return 'function',match.group(1)
+    name = ' '.join(header.split())[-80:]
+    return 'block',name or 'block'
+
+class _BraceChunker:
+    def __init__(self,content:str,file_path:str,pattern:re.Pattern,max_chars:int):
+        self.content = content
+        self.file_path = file_path
+        self.lines = LineIndex(content)
+        self.blocks = _brace_blocks(content,pattern)
+        self.max_chars = max_chars
+        self.chunks: List[Dict[str,Any]] = []
+
+    def _header_start(self,open_line:int,floor_line:int) -> int:
+        """First line of the header ending at `open_line`: walk up until a blank line, a
+        finished statement or the previous unit"""
+        line = open_line
+        while line - 1 > floor_line:
+            text = self.lines.slice(line - 1,line - 1).strip()
+            if not text or text.endswith((';','}','{')):
+                break
+            line -= 1
+        return line
+
+    def _declarations(self,line_start:int,line_end:int,class_name:Optional[str]):
+        while line_start <= line_end and not self.lines.slice(line_start,line_start).strip():
+            line_start += 1
+        while line_end >= line_start and not self.lines.slice(line_end,line_end).strip():
+            line_end -= 1
+        if line_start <= line_end:
+            metadata = {'class_name':class_name} if class_name else {}
+            self.chunks.append(make_chunk('declarations',f"{self.file_path}:{line_start}",self.lines,line_start,line_end,self.file_path,metadata))
+
+    def _units(self,blocks:List[Tuple[int,int,int]],depth:int,floor_line:int,ceiling_line:int,class_name:Optional[str]=None):
+        """Emit every block at `depth` between `floor_line` and `ceiling_line` (exclusive)"""
+        previous_end = floor_line
+        for index,(open_offset,close_offset,block_depth) in enumerate(blocks):
+            if block_depth != depth:
+                continue
+            open_line = self.lines.line_of(open_offset)
+            close_line = self.lines.line_of(close_offset)
+            if open_line <= previous_end:
+                # Shares a line with the previous unit (e.g. `} else {`); already covered
+                previous_end = max(previous_end,close_line)
+                continue
+            start_line = self._header_start(open_line,previous_end)
+            self._declarations(previous_end + 1,start_line - 1,class_name)
+            header = self.content[self.lines.offsets[start_line - 1]:open_offset]
+            chunk_type,name = _describe(header)
+            metadata = {'class_name':class_name} if class_name else {}
+            size = self.lines.offsets[close_line] - self.lines.offsets[start_line - 1]
+            if chunk_type == 'class' and size > self.max_chars:
+                members = [block for block in blocks if open_offset < block[0] and block[1] < close_offset]
+                qualified = f"{class_name}.{name}" if class_name else name
+                # Skeleton: the container with every member body elided
+                skeleton,cursor = [],self.lines.offsets[start_line - 1]
+                for member_open,member_close,member_depth in members:
+                    if member_depth == depth + 1:
+                        skeleton.append(self.content[cursor:member_open + 1])
+                        skeleton.append(' ... ')
+                        cursor = member_close
+                skeleton.append(self.content[cursor:close_offset + 1])
+                self.chunks.append({
+                    'type':'class',
+                    'name':name,
+                    'content':''.join(skeleton),
+                    'file_path':self.file_path,
+                    'line_start':start_line,
+                    'line_end':close_line,
+                    'metadata':{**metadata,'skeleton':True}
+                })
+                self._units(members,depth + 1,open_line,close_line,qualified)
+            else:
+                self.chunks.append(make_chunk(chunk_type,name,self.lines,start_line,close_line,self.file_path,metadata))
+            previous_end = close_line
+        self._declarations(previous_end + 1,ceiling_line - 1,class_name)
+
+    def chunk(self) -> List[Dict[str,Any]]:
+        self._units(self.blocks,0,0,len(self.lines.offsets))
+        return self.chunks
+
+def brace_chunker(dialect:str='c_like'):
+    """Chunker for brace-delimited languages: one chunk per top-level block, descending
+    into classes/structs/impls/namespaces that are over the size budget"""
+    pattern = _BRACE_PATTERNS[dialect]
+    def chunk(content:str,file_path:str) -> List[Dict[str,Any]]:
+        chunker = _BraceChunker(content,file_path,pattern,CHUNK_MAX_CHARS)
+        if not chunker.blocks:
+            return []
+        return enforce_budget(chunker.chunk(),chunker.lines)
+    return chunk
+
+_INDENT_HEADER = re.compile(r'\s*(?:(?:private|protected|public|static|async)\s+)*(def|class|module|fn)\s+(?:self\.)?([A-Za-z_][\w.?!=]*)')
+
+def _indent_of(text:str) -> int:
+    return len(text) - len(text.lstrip())
+
+class _IndentChunker:
+    def __init__(self,content:str,file_path:str,max_chars:int):
+        self.content = content
+        self.file_path = file_path
+        self.lines = LineIndex(content)
+        self.line_count = len(self.lines.offsets) - 1
+        self.max_chars = max_chars
+        self.chunks: List[Dict[str,Any]] = []
+
+    def _text(self,line:int) -> str:
+        return self.lines.slice(line,line)
+
+    def _units(self,line_start:int,line_end:int,indent:int,class_name:Optional[str]=None):
+        """Split lines `line_start`..`line_end` into units that begin at indentation `indent`"""
+        units = []
+        for line in range(line_start,line_end + 1):
+            text = self._text(line)
+            stripped = text.strip()
+            if not stripped or _indent_of(text) > indent:
+                continue
+            # Closing keywords and comments belong to the unit before/after them
+            if stripped in ('end','end.') or stripped.startswith('end ') or stripped.startswith(('#','//')):
+                continue
+            units.append(line)
+        # Leading comments attach to the unit they precede
+        starts = []
+        for line in units:
+            start = line
+            while start - 1 >= line_start and self._text(start - 1).strip().startswith(('#','//')) and _indent_of(self._text(start - 1)) == indent:
+                start -= 1
+            starts.append(start)
+        if starts and starts[0] > line_start:
+            starts[0] = line_start
+        for i,start in enumerate(starts):
+            end = starts[i + 1] - 1 if i + 1 < len(starts) else line_end
+            while end > start and not self._text(end).strip():
+                end -= 1
+            header = _INDENT_HEADER.match(self._text(units[i]))
+            metadata = {'class_name':class_name} if class_name else {}
+            if not header:
+                self.chunks.append(make_chunk('declarations',f"{self.file_path}:{start}",self.lines,start,end,self.file_path,metadata))
+                continue
+            keyword,name = header.groups()
+            chunk_type = 'function' if keyword in ('def','fn') else 'class'
+            size = self.lines.offsets[end] - self.lines.offsets[start - 1]
+            body_indent = None
+            for line in range(units[i] + 1,end + 1):
+                if self._text(line).strip():
+                    body_indent = _indent_of(self._text(line))
+                    break
+            if chunk_type == 'class' and size > self.max_chars and body_indent is not None and body_indent > indent:
+                self.chunks.append(make_chunk('class',name,self.lines,start,units[i],self.file_path,metadata))
+                qualified = f"{class_name}.{name}" if class_name else name
+                # The closing `end` of the class is not part of its last method
+                body_end = end
+                while body_end > units[i] + 1 and _indent_of(self._text(body_end)) < body_indent:
+                    body_end -= 1
+                self._units(units[i] + 1,body_end,body_indent,qualified)
+            else:
+                self.chunks.append(make_chunk(chunk_type,name,self.lines,start,end,self.file_path,metadata))
+
+    def chunk(self) -> List[Dict[str,Any]]:
+        self._units(1,self.line_count,0)
+        return self.chunks
+
+def indent_chunker(content:str,file_path:str) -> List[Dict[str,Any]]:
+    """Chunker for languages whose top-level units start at column 0 (Ruby, Sass, ...)"""
+    chunker = _IndentChunker(content,file_path,CHUNK_MAX_CHARS)
+    return enforce_budget(chunker.chunk(),chunker.lines)
@@ -0,0 +1,85 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+import os
+from dotenv import load_dotenv
+load_dotenv()
+
+MONGODB_URI = os.getenv("MONGODB_URI")
+MONGODB_DATABASE_NAME = os.getenv("MONGODB_DATABASE_NAME")
+
+client = AsyncIOMotorClient(MONGODB_URI)
+db = client[f"{MONGODB_DATABASE_NAME}"]
+manifest_collection = db["index_manifests"]
+
+async def get_index_manifest(username:str,repo_name:str,branch:str) -> Dict[str,str]:
+    """Return {file_path: blob_sha} for the files currently indexed for this repo and branch"""
+    manifest = await manifest_collection.find_one(
+        {"username":username,"repo_name":repo_name,"branch":branch}
+    )
+    if not manifest:
+        return {}
+    return {entry["path"]:entry["sha"] for entry in manifest.get("files",[])}
+
+async def get_index_version(username:str,repo_name:str,branch:str) -> Optional[str]:
+    """The index version queries should read for this repo and branch, if it has been indexed"""
+    manifest = await manifest_collection.find_one(
+        {"username":username,"repo_name":repo_name,"branch":branch},
+        {"index_version":1}
+    )
+    return manifest.get("index_version") if manifest else None
+
+async def get_index_revisions(username:str,repo_name:str,branch:Optional[str]=None) -> Dict[str,Tuple[str,int]]:
+    """{branch: (live index version, manifest revision)}; the revision changes on every save,
+    including incremental runs that update the live version in place"""
+    query = {"username":username,"repo_name":repo_name,"index_version":{"$exists":True}}
+    if branch:
+        query["branch"] = branch
+    cursor = manifest_collection.find(query,{"branch":1,"index_version":1,"revision":1})
+    return {manifest["branch"]:(manifest["index_version"],manifest.get("revision",0)) async for manifest in cursor}
+
+async def save_index_manifest(username:str,repo_name:str,branch:str,files:Dict[str,str],index_version:str):
+    """Record the indexed files and make `index_version` the live one, in a single write"""
+    # Paths are stored as values rather than keys since they contain dots
+    await manifest_collection.update_one(
+        {"username":username,"repo_name":repo_name,"branch":branch},
+        {
+            "$set":{
+                "files":[{"path":path,"sha":sha} for path,sha in files.items()],
+                "index_version":index_version,
+                "updatedAt":datetime.utcnow()
+            },
+            "$inc":{
+                "revision":1
+            },
+            "$setOnInsert":{
+                "createdAt":datetime.utcnow()
+            }
+        },
+        upsert=True
+    )
+
+index_job_collection = db["index_jobs"]
+
+async def create_index_job(job:Dict[str,Any]):
+    await index_job_collection.insert_one({
+        **job,
+        "createdAt":datetime.utcnow(),
+        "updatedAt":datetime.utcnow()
+    })
+
+async def update_index_job(job_id:str,fields:Dict[str,Any]):
+    await index_job_collection.update_one(
+        {"job_id":job_id},
+        {"$set":{**fields,"updatedAt":datetime.utcnow()}}
+    )
+
+async def get_index_job(job_id:str) -> Optional[Dict[str,Any]]:
+    return await index_job_collection.find_one({"job_id":job_id},{"_id":0})
+
+async def fail_interrupted_index_jobs():
+    """Jobs left queued/running by a previous process can never finish; mark them failed"""
+    await index_job_collection.update_many(
+        {"status":{"$in":["queued","running"]}},
+        {"$set":{"status":"failed","error":"Interrupted by server restart","updatedAt":datetime.utcnow()}}
+    )
@@ -0,0 +1,25 @@
+from fastapi import HTTPException
+from fastapi.requests import Request
+from job.embeddings import CodeEmbeddingGenerator
+from job.vectorstore import CodeVectorStore
+from job.search import CodeSearch
+
+# All of these are created once in main.lifespan and shared by every request and index job
+
+def get_vector_store(request:Request) -> CodeVectorStore:
+    vector_store = getattr(request.app.state,"vector_store",None)
+    if vector_store is None:
+        raise HTTPException(status_code=503,detail="Vector store is not available")
+    return vector_store
+
+def get_embedding_generator(request:Request) -> CodeEmbeddingGenerator:
+    embedding_generator = getattr(request.app.state,"embedding_generator",None)
+    if embedding_generator is None:
+        raise HTTPException(status_code=503,detail="Embedding model is not available")
+    return embedding_generator
+
+def get_code_search(request:Request) -> CodeSearch:
+    code_search = getattr(request.app.state,"code_search",None)
+    if code_search is None:
+        raise HTTPException(status_code=503,detail="Code search is not available")
+    return code_search
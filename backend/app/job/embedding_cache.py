@@ -0,0 +1,145 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+from metrics.registry import register_source
+from dotenv import load_dotenv
+load_dotenv(override=True)
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH","./embedding_cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB","1024"))
+# Keys per SQL statement; stays under SQLite's default host-parameter limit
+_LOOKUP_BATCH = 500
+
+def cache_key(model_name:str,text:str) -> bytes:
+    return hashlib.sha256(f"{model_name}\0{text}".encode('utf-8')).digest()
+
+class EmbeddingCache:
+    """Content-addressed store of embedding vectors on disk.
+
+    Vectors are keyed by sha256(model name + enhanced text) and stored as raw float32, so
+    identical chunks are embedded once across runs, branches and forks. When the stored
+    vectors grow past `max_bytes` the least recently used entries are evicted.
+    """
+    def __init__(self,path:str=EMBEDDING_CACHE_PATH,max_bytes:int=None):
+        self.path = path
+        self.max_bytes = max_bytes if max_bytes is not None else int(EMBEDDING_CACHE_MAX_MB * 1024 * 1024)
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)),exist_ok=True)
+        # Shared by the embedding threads; every access holds the lock
+        self.conn = sqlite3.connect(path,check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key BLOB PRIMARY KEY, model TEXT NOT NULL, dimension INTEGER NOT NULL,"
+            "vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+        self.conn.commit()
+        self.entries,self.total_bytes = self.conn.execute("SELECT COUNT(*),COALESCE(SUM(LENGTH(vector)),0) FROM embeddings").fetchone()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def get_many(self,model_name:str,texts:Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Cached vector for each text, or None where there is none"""
+        keys = [cache_key(model_name,text) for text in texts]
+        found: Dict[bytes,np.ndarray] = {}
+        with self.lock:
+            unique = list(dict.fromkeys(keys))
+            for i in range(0,len(unique),_LOOKUP_BATCH):
+                batch = unique[i:i + _LOOKUP_BATCH]
+                placeholders = ','.join('?' * len(batch))
+                rows = self.conn.execute(f"SELECT key,vector FROM embeddings WHERE key IN ({placeholders})",batch).fetchall()
+                for key,vector in rows:
+                    found[key] = np.frombuffer(vector,dtype=np.float32)
+                if rows:
+                    now = time.time()
+                    self.conn.executemany("UPDATE embeddings SET last_used=? WHERE key=?",[(now,key) for key,_ in rows])
+            self.conn.commit()
+            results = [found.get(key) for key in keys]
+            hits = sum(1 for vector in results if vector is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(self,model_name:str,texts:Sequence[str],vectors:Sequence[Sequence[float]]):
+        now = time.time()
+        rows = {}
+        for text,vector in zip(texts,vectors):
+            vector = np.asarray(vector,dtype=np.float32)
+            rows[cache_key(model_name,text)] = (model_name,len(vector),vector.tobytes(),now)
+        if not rows:
+            return
+        with self.lock:
+            keys = list(rows)
+            replaced = 0
+            replaced_bytes = 0
+            for i in range(0,len(keys),_LOOKUP_BATCH):
+                batch = keys[i:i + _LOOKUP_BATCH]
+                placeholders = ','.join('?' * len(batch))
+                count,size = self.conn.execute(
+                    f"SELECT COUNT(*),COALESCE(SUM(LENGTH(vector)),0) FROM embeddings WHERE key IN ({placeholders})",batch
+                ).fetchone()
+                replaced += count
+                replaced_bytes += size
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings(key,model,dimension,vector,last_used) VALUES (?,?,?,?,?)",
+                [(key,*row) for key,row in rows.items()]
+            )
+            self.entries += len(rows) - replaced
+            self.total_bytes += sum(len(row[2]) for row in rows.values()) - replaced_bytes
+            self.writes += len(rows)
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        """Drop least recently used vectors until the cache is back to 90% of its cap"""
+        if not self.max_bytes or self.total_bytes <= self.max_bytes:
+            return
+        target = self.total_bytes - int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for key,size in self.conn.execute("SELECT key,LENGTH(vector) FROM embeddings ORDER BY last_used"):
+            victims.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self.conn.executemany("DELETE FROM embeddings WHERE key=?",victims)
+        self.entries -= len(victims)
+        self.total_bytes -= freed
+        self.evictions += len(victims)
+
+    def stats(self) -> Dict[str,float]:
+        lookups = self.hits + self.misses
+        return {
+            'entries':self.entries,
+            'bytes':self.total_bytes,
+            'max_bytes':self.max_bytes,
+            'hits':self.hits,
+            'misses':self.misses,
+            'hit_rate':round(self.hits / lookups,4) if lookups else 0.0,
+            'writes':self.writes,
+            'evictions':self.evictions,
+        }
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache, opened on first use; None when EMBEDDING_CACHE_PATH is empty"""
+    global _cache
+    if not EMBEDDING_CACHE_PATH:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
+
+register_source("embedding_cache",lambda:_cache.stats() if _cache else {'enabled':bool(EMBEDDING_CACHE_PATH),'opened':False})
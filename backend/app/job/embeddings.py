@@ -1,16 +1,182 @@
-from sentence_transformers import SentenceTransformer
-from langchain_huggingface import HuggingFaceEndpointEmbeddings
-from typing import List,Dict,Any
+from typing import List,Dict,Any,Optional
+from concurrent.futures import ThreadPoolExecutor
+from job.embedding_cache import EmbeddingCache,get_embedding_cache
+from metrics.registry import register_source
 
 import os
+import random
+import sys
+import threading
+import time
+import numpy as np
 from dotenv import load_dotenv
 load_dotenv(override=True)
 
 HF_TOKEN = os.getenv("HF_TOKEN")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE","32"))
+EMBED_BATCH_MAX_CHARS = int(os.getenv("EMBED_BATCH_MAX_CHARS","64000"))
+EMBED_MAX_IN_FLIGHT = int(os.getenv("EMBED_MAX_IN_FLIGHT","4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES","4"))
+EMBED_BACKOFF_BASE = float(os.getenv("EMBED_BACKOFF_BASE","1.0"))
+# "remote" uses the Hugging Face inference endpoint, "local" runs the model on this machine's CPU
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND","remote")
+# Local runtime: "torch", "int8" (dynamically quantized Linear layers) or "onnx" (needs optimum[onnxruntime])
+EMBEDDING_LOCAL_RUNTIME = os.getenv("EMBEDDING_LOCAL_RUNTIME","torch")
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS","0"))
+# Padded tokens per forward pass (batch size x longest text in the batch)
+EMBEDDING_LOCAL_TOKEN_BUDGET = int(os.getenv("EMBEDDING_LOCAL_TOKEN_BUDGET","16384"))
+# No tokenizer is loaded for the hosted endpoint, so tokens are estimated from characters
+CHARS_PER_TOKEN = 4
+
+class EmbeddingStats:
+    """Batches, texts and estimated tokens sent to the embedding model, across all generators"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.texts = 0
+        self.chars = 0
+        self.retries = 0
+        self.failures = 0
+        self.seconds = 0.0
+
+    def record(self,texts:int,chars:int,seconds:float):
+        with self.lock:
+            self.batches += 1
+            self.texts += texts
+            self.chars += chars
+            self.seconds += seconds
+
+    def as_dict(self) -> Dict[str,Any]:
+        tokens = self.chars // CHARS_PER_TOKEN
+        return {
+            'batches':self.batches,
+            'texts':self.texts,
+            'estimated_tokens':tokens,
+            'retries':self.retries,
+            'failures':self.failures,
+            'request_seconds':round(self.seconds,3),
+            'batches_per_second':round(self.batches / self.seconds,2) if self.seconds else 0.0,
+            'tokens_per_second':round(tokens / self.seconds,1) if self.seconds else 0.0,
+        }
+
+EMBEDDING_STATS = EmbeddingStats()
+
+def make_batches(texts:List[str],max_count:int,max_chars:int) -> List[List[int]]:
+    """Group text indices into batches of at most `max_count` texts and `max_chars` characters.
+    A single text longer than `max_chars` gets a batch of its own."""
+    batches = []
+    current,current_chars = [],0
+    for i,text in enumerate(texts):
+        if current and (len(current) >= max_count or current_chars + len(text) > max_chars):
+            batches.append(current)
+            current,current_chars = [],0
+        current.append(i)
+        current_chars += len(text)
+    if current:
+        batches.append(current)
+    return batches
+
+class EmbeddingBatch:
+    """Chunks with their vectors as one contiguous float32 matrix: row i belongs to chunks[i]"""
+    __slots__ = ('chunks','texts','vectors')
+
+    def __init__(self,chunks:List[Dict[str,Any]],texts:List[str],vectors:np.ndarray):
+        self.chunks = chunks
+        self.texts = texts
+        self.vectors = vectors
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+class LocalEmbeddings:
+    """Runs a sentence-transformers model on CPU behind the same `embed_documents` interface
+    as the hosted endpoint.
+
+    Texts are sorted by length and packed into batches whose padded size (count x longest
+    text) stays under `token_budget`, so short chunks aren't padded out to the longest one
+    in the request.
+    """
+    def __init__(self,model_name:str,runtime:str = EMBEDDING_LOCAL_RUNTIME,threads:int = EMBEDDING_THREADS,token_budget:int = EMBEDDING_LOCAL_TOKEN_BUDGET):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        if threads:
+            torch.set_num_threads(threads)
+        if runtime == 'onnx':
+            self.model = SentenceTransformer(model_name,device='cpu',backend='onnx')
+        else:
+            self.model = SentenceTransformer(model_name,device='cpu')
+            if runtime == 'int8':
+                self.model = torch.quantization.quantize_dynamic(self.model,{torch.nn.Linear},dtype=torch.qint8)
+            elif runtime != 'torch':
+                raise ValueError(f"Unknown local embedding runtime: {runtime}")
+        self.model.eval()
+        self.runtime = runtime
+        self.token_budget = token_budget
+        self.max_tokens = self.model.get_max_seq_length() or 512
+        self.lock = threading.Lock()
+
+    def _batches(self,order:List[int],lengths:List[int]) -> List[List[int]]:
+        batches = []
+        current = []
+        for i in order:
+            longest = lengths[current[0]] if current else lengths[i]
+            if current and (len(current) + 1) * longest > self.token_budget:
+                batches.append(current)
+                current = []
+            current.append(i)
+        if current:
+            batches.append(current)
+        return batches
+
+    def embed_documents(self,texts:List[str]) -> np.ndarray:
+        # Longest first, so the first text of each batch sets its padded length
+        lengths = [min(len(text) // CHARS_PER_TOKEN + 1,self.max_tokens) for text in texts]
+        order = sorted(range(len(texts)),key=lambda i:-lengths[i])
+        vectors = None
+        # One forward pass at a time; torch already spreads it over EMBEDDING_THREADS
+        with self.lock:
+            for batch in self._batches(order,lengths):
+                encoded = self.model.encode([texts[i] for i in batch],batch_size=len(batch),convert_to_numpy=True,show_progress_bar=False)
+                if vectors is None:
+                    vectors = np.empty((len(texts),encoded.shape[1]),dtype=np.float32)
+                vectors[batch] = encoded
+        return vectors if vectors is not None else np.empty((0,0),dtype=np.float32)
+
 class CodeEmbeddingGenerator:
-    def __init__(self,model_name:str = "microsoft/codebert-base"):
-        self.model = HuggingFaceEndpointEmbeddings(model=model_name,huggingfacehub_api_token=HF_TOKEN)
-        # self.model = HuggingFaceEmbeddings(model_name=model_name)
+    def __init__(
+        self,
+        model_name:str = "microsoft/codebert-base",
+        cache:Optional[EmbeddingCache] = None,
+        backend:str = EMBEDDING_BACKEND,
+        local_runtime:str = EMBEDDING_LOCAL_RUNTIME,
+        batch_size:int = EMBED_BATCH_SIZE,
+        batch_max_chars:int = EMBED_BATCH_MAX_CHARS,
+        max_in_flight:int = EMBED_MAX_IN_FLIGHT,
+        max_retries:int = EMBED_MAX_RETRIES,
+        backoff_base:float = EMBED_BACKOFF_BASE,
+    ):
+        self.model_name = model_name
+        self.backend = backend
+        if backend == 'local':
+            self.model = LocalEmbeddings(model_name,runtime=local_runtime)
+            # Quantized/ONNX vectors differ slightly from full precision ones, so they are cached apart
+            self.cache_namespace = f"{model_name}:{self.model.runtime}"
+            # CPU bound, so no concurrent requests; LocalEmbeddings length-sorts and batches
+            # the whole request itself
+            max_in_flight = 1
+            batch_size = batch_max_chars = sys.maxsize
+        elif backend == 'remote':
+            from langchain_huggingface import HuggingFaceEndpointEmbeddings
+            self.model = HuggingFaceEndpointEmbeddings(model=model_name,huggingfacehub_api_token=HF_TOKEN)
+            self.cache_namespace = model_name
+        else:
+            raise ValueError(f"Unknown embedding backend: {backend}")
+        self.cache = cache if cache is not None else get_embedding_cache()
+        self.batch_size = batch_size
+        self.batch_max_chars = batch_max_chars
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
     def create_enhanced_text(self,chunk:Dict[str,Any]) -> str:
         content = chunk['content']
         file_path = chunk['file_path']
@@ -22,6 +188,8 @@ class CodeEmbeddingGenerator:
         
         if chunk_type == 'function':
             enhanced_text += f"Function: {chunk.get('name', 'unknown')}\n"
+            if 'class_name' in metadata:
+                enhanced_text += f"Method of: {metadata['class_name']}\n"
             if 'args' in metadata:
                 enhanced_text += f"Arguments: {', '.join(metadata['args'])}\n"
             if chunk.get('docstring'):
@@ -31,6 +199,8 @@ class CodeEmbeddingGenerator:
             enhanced_text += f"Class: {chunk.get('name', 'unknown')}\n"
             if 'base_classes' in metadata:
                 enhanced_text += f"Inherits from: {', '.join(metadata['base_classes'])}\n"
+            if metadata.get('methods'):
+                enhanced_text += f"Methods: {', '.join(metadata['methods'])}\n"
             if chunk.get('docstring'):
                 enhanced_text += f"Documentation: {chunk['docstring']}\n"
         
@@ -38,14 +208,65 @@ class CodeEmbeddingGenerator:
         
         return enhanced_text
     
-    def generate_embeddings(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Generate embeddings for code chunks"""
+    def _embed_batch(self,texts:List[str]) -> np.ndarray:
+        """One request to the model, retried with exponential backoff and jitter"""
+        chars = sum(len(text) for text in texts)
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                vectors = self.model.embed_documents(texts)
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    with EMBEDDING_STATS.lock:
+                        EMBEDDING_STATS.failures += 1
+                    raise
+                delay = self.backoff_base * (2 ** attempt) * (0.5 + random.random() / 2)
+                print(f"Embedding batch of {len(texts)} failed ({e}); retrying in {delay:.1f}s")
+                with EMBEDDING_STATS.lock:
+                    EMBEDDING_STATS.retries += 1
+                time.sleep(delay)
+                continue
+            EMBEDDING_STATS.record(len(texts),chars,time.perf_counter() - started)
+            if len(vectors) != len(texts):
+                raise ValueError(f"Embedding model returned {len(vectors)} vectors for {len(texts)} texts")
+            # One conversion for the whole batch; a no-op for the local backend's matrix
+            return np.asarray(vectors,dtype=np.float32)
+
+    def embed_texts(self,texts:List[str]) -> np.ndarray:
+        """Embed `texts` in size-bounded batches, up to `max_in_flight` at once; row i is texts[i]"""
+        batches = [[texts[i] for i in batch] for batch in make_batches(texts,self.batch_size,self.batch_max_chars)]
+        if len(batches) <= 1 or self.max_in_flight <= 1:
+            results = [self._embed_batch(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_in_flight,len(batches))) as executor:
+                # map() yields in submission order, whatever order the batches finish in
+                results = list(executor.map(self._embed_batch,batches))
+        return results[0] if len(results) == 1 else np.concatenate(results)
+
+    def generate_embeddings(self, chunks: List[Dict[str, Any]]) -> EmbeddingBatch:
+        """Generate embeddings for code chunks; only texts missing from the cache are sent to the model"""
         enhanced_texts = [self.create_enhanced_text(chunk) for chunk in chunks]
-        
-        embeddings = self.model.embed_documents(enhanced_texts)
-        # Add embeddings to chunks
-        for i, chunk in enumerate(chunks):
-            chunk['embedding'] = embeddings[i].tolist()
-            chunk['enhanced_text'] = enhanced_texts[i]
-        
-        return chunks
\ No newline at end of file
+
+        cached = self.cache.get_many(self.cache_namespace,enhanced_texts) if self.cache else [None] * len(enhanced_texts)
+        missing = [i for i,vector in enumerate(cached) if vector is None]
+        computed = None
+        if missing:
+            # Identical texts within a batch are embedded once
+            unique_texts = list(dict.fromkeys(enhanced_texts[i] for i in missing))
+            computed = self.embed_texts(unique_texts)
+            if self.cache:
+                self.cache.put_many(self.cache_namespace,unique_texts,computed)
+        if not chunks:
+            return EmbeddingBatch([],[],np.empty((0,0),dtype=np.float32))
+
+        dimension = computed.shape[1] if computed is not None else len(cached[0])
+        vectors = np.empty((len(chunks),dimension),dtype=np.float32)
+        for i,vector in enumerate(cached):
+            if vector is not None:
+                vectors[i] = vector
+        if missing:
+            row = {text:j for j,text in enumerate(unique_texts)}
+            vectors[missing] = computed[[row[enhanced_texts[i]] for i in missing]]
+        return EmbeddingBatch(chunks,enhanced_texts,vectors)
+
+register_source("embeddings",EMBEDDING_STATS.as_dict)
@@ -0,0 +1,99 @@
+import os
+import uuid
+import asyncio
+from typing import Any, Callable, Dict, Optional
+from job.services import iter_repo_files,iter_repo_archive,CodePreprocessor
+from job.db import get_index_manifest,get_index_version,save_index_manifest
+from job.pipeline import IndexingPipeline
+from job.symbol_index import SymbolIndexWriter,symbol_index_path,drop_other_versions
+
+async def index_repository(
+    username:str,
+    repo_name:str,
+    access_token:str,
+    vector_store,
+    embedding_generator,
+    branch:str="main",
+    ingest_mode:str="contents",
+    incremental:bool=False,
+    on_progress:Optional[Callable[[Dict[str,Any]],None]]=None,
+) -> Dict[str,Any]:
+    """Fetch, chunk, embed and store a repository; returns the summary reported to clients.
+
+    `vector_store` and `embedding_generator` are the app-wide instances; nothing here
+    closes them.
+
+    An incremental run updates the live index version in place. A full run builds a new
+    version next to it that queries can't see; the manifest then points at the new version
+    in one write and the old one is dropped with a single filtered delete.
+    """
+    live_version = await get_index_version(username,repo_name,branch)
+    # Manifests written before versioning (or before the symbol index existed) have nothing to update in place
+    rebuild = (
+        not incremental
+        or live_version is None
+        or not os.path.exists(symbol_index_path(username,repo_name,branch,live_version))
+    )
+    manifest = {} if rebuild else await get_index_manifest(username,repo_name,branch)
+    index_version = uuid.uuid4().hex if rebuild else live_version
+
+    print(f"Indexing repository {username}/{repo_name}...")
+    fetch_stats = {}
+    if ingest_mode == 'archive':
+        files = iter_repo_archive(username,repo_name,access_token,branch,skip_shas=manifest,stats=fetch_stats)
+    else:
+        files = iter_repo_files(username,repo_name,access_token,branch,skip_shas=manifest,stats=fetch_stats)
+
+    # Only does work if Qdrant was unreachable when the app started
+    await vector_store.ensure_collection()
+    symbol_writer = await asyncio.to_thread(SymbolIndexWriter,username,repo_name,branch,index_version,rebuild)
+    pipeline = IndexingPipeline(
+        CodePreprocessor(),embedding_generator,vector_store,repo_name,username,branch,index_version,
+        stale_files=manifest,symbol_writer=symbol_writer,on_progress=on_progress
+    )
+    try:
+        stage_stats = await pipeline.run(files)
+
+        tree = fetch_stats['tree']
+        removed_paths = [path for path in manifest if path not in tree]
+        if removed_paths:
+            print(f"Removing chunks for {len(removed_paths)} deleted files...")
+            await vector_store.delete_by_files(repo_name,removed_paths,owner=username,branch=branch,index_version=index_version)
+            await asyncio.to_thread(symbol_writer.remove_files,removed_paths)
+        await asyncio.to_thread(symbol_writer.commit)
+    except BaseException:
+        await asyncio.to_thread(symbol_writer.discard)
+        if rebuild:
+            # The half-built version was never visible; don't leave it behind
+            try:
+                await vector_store.delete_index_version(repo_name,username,branch,index_version)
+            except Exception as e:
+                print(f"Error removing unfinished index version {index_version}: {e}")
+        raise
+
+    files_processed = stage_stats['fetch']['items_out']
+    chunks_created = stage_stats['parse']['items_out']
+    # Files that failed to download keep their previous sha (or none) so the next incremental run retries them
+    failures = fetch_stats.get('failures',{})
+    indexed = {path:sha for path,sha in tree.items() if path not in failures}
+    indexed.update({path:manifest[path] for path in failures if path in manifest})
+    await save_index_manifest(username,repo_name,branch,indexed,index_version)
+    if rebuild:
+        await vector_store.delete_other_versions(repo_name,username,branch,index_version)
+        await asyncio.to_thread(drop_other_versions,username,repo_name,branch,index_version)
+
+    return {
+        "status":"success",
+        "message":f"Successfully indexed {files_processed} files with {chunks_created} code chunks",
+        "files_processed":files_processed,
+        "chunks_created":chunks_created,
+        "files_skipped":fetch_stats['files_skipped'],
+        "files_updated":files_processed,
+        "files_deleted":len(removed_paths),
+        "index_version":index_version,
+        "rebuilt":rebuild,
+        "files_failed":fetch_stats['files_failed'],
+        "fetch_retries":fetch_stats['retries'],
+        "fetch_seconds":round(fetch_stats['elapsed'],2),
+        "stages":stage_stats
+    }
@@ -0,0 +1,378 @@
+import os
+import json
+import shutil
+import asyncio
+import sqlite3
+import threading
+import numpy as np
+from typing import List, Dict, Any, Optional, NamedTuple, TYPE_CHECKING
+from job.vectorstore import ChunkWriter, path_prefixes
+from dotenv import load_dotenv
+load_dotenv(override=True)
+
+if TYPE_CHECKING:
+    from job.embeddings import EmbeddingBatch
+
+# Rows the vector file is created with; it doubles whenever it fills up
+LOCAL_INITIAL_CAPACITY = int(os.getenv("LOCAL_VECTOR_INITIAL_CAPACITY", "4096"))
+# Rows scored per matrix product, which bounds the memory a search gathers at once
+LOCAL_SCAN_BLOCK = int(os.getenv("LOCAL_VECTOR_SCAN_BLOCK", "16384"))
+# Rows per SQL statement; stays under SQLite's default host-parameter limit
+_SQL_BATCH = 500
+# Payload fields kept in their own columns; the rest is stored as JSON
+_COLUMNS = ('id', 'owner', 'repo_name', 'branch', 'index_version', 'file_path', 'type')
+
+class LocalPoint(NamedTuple):
+    """Search hit with the fields callers read from a Qdrant ScoredPoint"""
+    id: str
+    score: float
+    payload: Dict[str, Any]
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+class LocalPointWriter:
+    """PointWriter counterpart for LocalVectorStore; every write is applied before it returns"""
+    def __init__(self, store: "LocalVectorStore"):
+        self.store = store
+        self.points_written = 0
+
+    async def write(self, ids: List[str], vectors: np.ndarray, payloads: List[Dict[str, Any]]):
+        await asyncio.to_thread(self.store._upsert, ids, vectors, payloads)
+        self.points_written += len(ids)
+
+    async def close(self):
+        await asyncio.to_thread(self.store._flush)
+
+    def abort(self):
+        pass
+
+class LocalVectorStore:
+    """Embedded vector index for running without a Qdrant server.
+
+    Unit-normalised vectors live in one memory-mapped float32 file, one row per point, and
+    payloads in a SQLite side table keyed by row. Per-row scope (owner/repo/branch/version),
+    file and type codes are kept in NumPy arrays so filters are vectorised masks. Search is
+    exact: blocked dot products and argpartition for the top k. Deleted rows are reused.
+
+    Same interface as CodeVectorStore, so the indexer, pipeline and search don't care
+    which one they are given.
+    """
+    def __init__(self, persist_directory: str = "./vector_db", dimension: int = 768, collection_name: str = "code_embeddings"):
+        self.collection_name = collection_name
+        self.directory = os.path.join(persist_directory, collection_name)
+        self.dimension = dimension
+        self.lock = threading.RLock()
+        self.conn: Optional[sqlite3.Connection] = None
+        self.ready = False
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.directory, "vectors.f32")
+
+    def _load(self):
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            self.conn = sqlite3.connect(os.path.join(self.directory, "points.sqlite3"), check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(
+                "CREATE TABLE IF NOT EXISTS points ("
+                "row INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, owner TEXT, repo_name TEXT, branch TEXT,"
+                "index_version TEXT, file_path TEXT, type TEXT, payload TEXT);"
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+            )
+            stored = self.conn.execute("SELECT value FROM meta WHERE key='dimension'").fetchone()
+            if stored and int(stored[0]) != self.dimension:
+                raise ValueError(f"{self.directory} holds {stored[0]}-dim vectors, not {self.dimension}")
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO meta(key,value) VALUES ('dimension',?)", (str(self.dimension),))
+
+            rows = self.conn.execute("SELECT row, id, owner, repo_name, branch, index_version, file_path, type FROM points").fetchall()
+            self.size = max((row[0] for row in rows), default=-1) + 1
+            existing = os.path.getsize(self._vectors_path) // (self.dimension * 4) if os.path.exists(self._vectors_path) else 0
+            self._open_vectors(max(existing, self.size, LOCAL_INITIAL_CAPACITY))
+            self.ids: List[Optional[str]] = [None] * self.size
+            self.rows_by_id: Dict[str, int] = {}
+            self.codes: Dict[str, Dict[Any, int]] = {'scope': {}, 'file': {}, 'type': {}}
+            # -1 marks a free row
+            self.scopes = np.full(self.capacity, -1, dtype=np.int32)
+            self.files = np.zeros(self.capacity, dtype=np.int32)
+            self.types = np.zeros(self.capacity, dtype=np.int32)
+            for row, point, owner, repo_name, branch, index_version, file_path, chunk_type in rows:
+                self._set_row(row, point, (owner, repo_name, branch, index_version), file_path, chunk_type)
+            self.free = [row for row in range(self.size) if self.ids[row] is None]
+
+    def _open_vectors(self, capacity: int):
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self.dimension * 4)
+        self.capacity = capacity
+        self.vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+
+    def _code(self, kind: str, key: Any) -> int:
+        codes = self.codes[kind]
+        if key not in codes:
+            codes[key] = len(codes)
+        return codes[key]
+
+    def _set_row(self, row: int, point: str, scope: tuple, file_path: str, chunk_type: str):
+        self.ids[row] = point
+        self.rows_by_id[point] = row
+        self.scopes[row] = self._code('scope', scope)
+        self.files[row] = self._code('file', file_path)
+        self.types[row] = self._code('type', chunk_type)
+
+    def _allocate(self) -> int:
+        if self.free:
+            return self.free.pop()
+        row = self.size
+        self.size += 1
+        self.ids.append(None)
+        if self.size > self.capacity:
+            grown = self.capacity
+            self.vectors.flush()
+            del self.vectors
+            self._open_vectors(self.capacity * 2)
+            self.scopes = np.concatenate([self.scopes, np.full(grown, -1, dtype=np.int32)])
+            self.files = np.concatenate([self.files, np.zeros(grown, dtype=np.int32)])
+            self.types = np.concatenate([self.types, np.zeros(grown, dtype=np.int32)])
+        return row
+
+    def _upsert(self, ids: List[str], vectors: np.ndarray, payloads: List[Dict[str, Any]]):
+        # A repeated id keeps only its last occurrence, as a Qdrant upsert would; giving it two
+        # rows would leave one live in the scope arrays with no SQLite record behind it
+        last = list({point: i for i, point in enumerate(ids)}.values())
+        if len(last) < len(ids):
+            last.sort()
+            ids = [ids[i] for i in last]
+            vectors = np.asarray(vectors)[last]
+            payloads = [payloads[i] for i in last]
+        vectors = _normalize(vectors)
+        with self.lock:
+            rows = [self.rows_by_id.get(point) for point in ids]
+            rows = [row if row is not None else self._allocate() for row in rows]
+            self.vectors[rows] = vectors
+            records = []
+            for row, point, payload in zip(rows, ids, payloads):
+                self._set_row(row, point, tuple(payload.get(key) for key in _COLUMNS[1:5]), payload.get('file_path'), payload.get('type'))
+                rest = {key: value for key, value in payload.items() if key not in _COLUMNS and key != 'path_prefixes'}
+                records.append((row, point) + tuple(payload.get(key) for key in _COLUMNS[1:]) + (json.dumps(rest),))
+            # Vectors reach the file before their rows are committed, so a crash can't leave
+            # committed rows pointing at vectors that were never written
+            self.vectors.flush()
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO points(row, id, owner, repo_name, branch, index_version, file_path, type, payload)"
+                    " VALUES (?,?,?,?,?,?,?,?,?)",
+                    records,
+                )
+
+    def _flush(self):
+        with self.lock:
+            self.vectors.flush()
+
+    def _mask(self, points_filter: Dict[str, Any]) -> np.ndarray:
+        """Rows matching `points_filter`: repo_name/owner/branch, index_versions to keep or exclude_version
+        to skip, and optionally file_paths, path_prefix and type"""
+        def in_scope(owner, repo_name, branch, index_version):
+            return (
+                repo_name == points_filter['repo_name']
+                and all(points_filter.get(key) in (None, value) for key, value in (('owner', owner), ('branch', branch)))
+                and (points_filter.get('index_versions') is None or index_version in points_filter['index_versions'])
+                and index_version != points_filter.get('exclude_version')
+            )
+        scopes = [code for scope, code in self.codes['scope'].items() if in_scope(*scope)]
+        mask = np.isin(self.scopes[:self.size], scopes)
+        file_paths = points_filter.get('file_paths')
+        prefix = (points_filter.get('path_prefix') or '').strip('/')
+        if file_paths is not None or prefix:
+            wanted = set(file_paths or ())
+            files = [
+                code for path, code in self.codes['file'].items()
+                if (file_paths is None or path in wanted) and (not prefix or path == prefix or path.startswith(prefix + '/'))
+            ]
+            mask &= np.isin(self.files[:self.size], files)
+        if points_filter.get('type'):
+            mask &= self.types[:self.size] == self.codes['type'].get(points_filter['type'], -1)
+        return mask
+
+    def _payloads(self, rows: List[int]) -> Dict[int, Dict[str, Any]]:
+        payloads = {}
+        for i in range(0, len(rows), _SQL_BATCH):
+            batch = [int(row) for row in rows[i:i + _SQL_BATCH]]
+            for record in self.conn.execute(
+                f"SELECT row, id, owner, repo_name, branch, index_version, file_path, type, payload FROM points"
+                f" WHERE row IN ({','.join('?' * len(batch))})",
+                batch,
+            ):
+                payload = dict(zip(_COLUMNS, record[1:8]))
+                payload['path_prefixes'] = path_prefixes(payload['file_path'])
+                payload.update(json.loads(record[8]))
+                payloads[record[0]] = payload
+        return payloads
+
+    def _top_k(self, queries: np.ndarray, rows: np.ndarray, limit: int):
+        """Best `limit` (row, score) pairs per query among `rows`, best first"""
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(rows), LOCAL_SCAN_BLOCK):
+            block = rows[start:start + LOCAL_SCAN_BLOCK]
+            # A contiguous run of rows is read straight from the map; anything else is gathered
+            if block[-1] - block[0] + 1 == len(block):
+                vectors = self.vectors[block[0]:block[-1] + 1]
+            else:
+                vectors = self.vectors[block]
+            scores = np.concatenate([best_scores, queries @ vectors.T], axis=1)
+            candidates = np.concatenate([best_rows, np.broadcast_to(block, (len(queries), len(block)))], axis=1)
+            k = min(limit, scores.shape[1])
+            keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, keep, axis=1)
+            best_rows = np.take_along_axis(candidates, keep, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def _query(self, vectors: np.ndarray, points_filter: Optional[Dict[str, Any]], limit: int) -> List[List[LocalPoint]]:
+        queries = _normalize(vectors)
+        with self.lock:
+            mask = self._mask(points_filter) if points_filter else self.scopes[:self.size] >= 0
+            rows = np.flatnonzero(mask)
+            if not rows.size or limit <= 0:
+                return [[] for _ in queries]
+            top_rows, top_scores = self._top_k(queries, rows, limit)
+            payloads = self._payloads(np.unique(top_rows).tolist())
+        return [
+            [LocalPoint(self.ids[row], float(score), payloads[row]) for row, score in zip(row_ids.tolist(), scores.tolist())]
+            for row_ids, scores in zip(top_rows, top_scores)
+        ]
+
+    def _delete(self, points_filter: Dict[str, Any]):
+        with self.lock:
+            rows = np.flatnonzero(self._mask(points_filter)).tolist()
+            if not rows:
+                return
+            self.scopes[rows] = -1
+            for row in rows:
+                del self.rows_by_id[self.ids[row]]
+                self.ids[row] = None
+            self.free.extend(rows)
+            with self.conn:
+                for i in range(0, len(rows), _SQL_BATCH):
+                    batch = rows[i:i + _SQL_BATCH]
+                    self.conn.execute(f"DELETE FROM points WHERE row IN ({','.join('?' * len(batch))})", batch)
+
+    async def ensure_collection(self):
+        """Open (or create) the index files and load the row metadata; a no-op once it has succeeded"""
+        if self.ready:
+            return
+        await asyncio.to_thread(self._load)
+        self.ready = True
+
+    async def health(self) -> Dict[str, Any]:
+        try:
+            await self.ensure_collection()
+        except Exception as e:
+            return {'ok': False, 'backend': 'local', 'error': str(e)}
+        return {'ok': True, 'backend': 'local', 'directory': self.directory, 'points': len(self.rows_by_id)}
+
+    def open_writer(self, repo_name: str, owner: str, branch: str, index_version: str) -> ChunkWriter:
+        """Writer for embedded chunks; close() it to flush the vector file"""
+        return ChunkWriter(LocalPointWriter(self), repo_name, owner, branch, index_version)
+
+    async def store_embeddings(self, batch: "EmbeddingBatch", repo_name: str, owner: str, branch: str, index_version: str):
+        """Store a batch of embedded chunks in the local index"""
+        await self.ensure_collection()
+        writer = self.open_writer(repo_name, owner, branch, index_version)
+        try:
+            await writer.write(batch)
+        finally:
+            await writer.close()
+
+    async def search_similar_code(self, query: str, embedding_generator, n_results: int = 10, repo_name: str = None, index_version: str = None, ef: Optional[int] = None) -> Dict[str, Any]:
+        """Exact nearest neighbours of `query`, in the same shape CodeVectorStore returns (`ef` is ignored)"""
+        await self.ensure_collection()
+        query_embedding = await asyncio.to_thread(embedding_generator.embed_texts, [query])
+        points_filter = None
+        if repo_name:
+            points_filter = {'repo_name': repo_name, 'index_versions': [index_version] if index_version else None}
+        hits = (await asyncio.to_thread(self._query, query_embedding, points_filter, n_results))[0]
+        return {
+            'ids': [[hit.id for hit in hits]],
+            'distances': [[hit.score for hit in hits]],
+            'documents': [[hit.payload.get('document', '') for hit in hits]],
+            'metadatas': [[hit.payload for hit in hits]],
+        }
+
+    def search_filter(self, repo_name: str, owner: str, index_versions: List[str], path_prefix: Optional[str] = None, chunk_type: Optional[str] = None) -> Dict[str, Any]:
+        """Live chunks of one owner's repo (any of `index_versions`), optionally narrowed to a path prefix and chunk type"""
+        return {'repo_name': repo_name, 'owner': owner, 'index_versions': index_versions, 'path_prefix': path_prefix, 'type': chunk_type}
+
+    async def query_batch(self, vectors: np.ndarray, points_filter: Optional[Dict[str, Any]], limit: int, ef: Optional[int] = None) -> List[List[LocalPoint]]:
+        """Exact nearest neighbours of each row of `vectors`; the scan is exhaustive, so `ef` is ignored"""
+        await self.ensure_collection()
+        return await asyncio.to_thread(self._query, vectors, points_filter, limit)
+
+    async def retrieve_payloads(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Payloads of the given point ids, keyed by id; missing points are left out"""
+        await self.ensure_collection()
+        def retrieve():
+            with self.lock:
+                rows = [self.rows_by_id[point] for point in ids if point in self.rows_by_id]
+                return {self.ids[row]: payload for row, payload in self._payloads(rows).items()}
+        return await asyncio.to_thread(retrieve)
+
+    async def _delete_matching(self, points_filter: Dict[str, Any]):
+        await self.ensure_collection()
+        await asyncio.to_thread(self._delete, points_filter)
+
+    async def delete_by_repo(self, repo_name: str, owner: Optional[str] = None, branch: Optional[str] = None):
+        """Delete all embeddings for a repository (optionally one owner's, one branch)"""
+        await self._delete_matching({'repo_name': repo_name, 'owner': owner, 'branch': branch})
+
+    async def delete_index_version(self, repo_name: str, owner: str, branch: str, index_version: str):
+        """Drop every point of one index version, e.g. a rebuild that didn't finish"""
+        await self._delete_matching({'repo_name': repo_name, 'owner': owner, 'branch': branch, 'index_versions': [index_version]})
+
+    async def delete_other_versions(self, repo_name: str, owner: str, branch: str, index_version: str):
+        """Drop every point of this repo and branch that isn't part of `index_version`"""
+        await self._delete_matching({'repo_name': repo_name, 'owner': owner, 'branch': branch, 'exclude_version': index_version})
+
+    async def delete_by_files(self, repo_name: str, file_paths: List[str], owner: Optional[str] = None, branch: Optional[str] = None, index_version: Optional[str] = None, batch_size: int = 500):
+        """Delete every chunk of the given files in a repository"""
+        await self._delete_matching({
+            'repo_name': repo_name, 'owner': owner, 'branch': branch,
+            'index_versions': [index_version] if index_version else None, 'file_paths': file_paths,
+        })
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Get statistics about the local index"""
+        await self.ensure_collection()
+        return {
+            'total_embeddings': len(self.rows_by_id),
+            'dimension': self.dimension,
+            'index_type': 'Local',
+            'capacity': self.capacity,
+        }
+
+    async def clear_all(self):
+        """Clear all data from the local index (recreate its files)"""
+        def clear():
+            with self.lock:
+                self._close()
+                shutil.rmtree(self.directory, ignore_errors=True)
+                self._load()
+        await asyncio.to_thread(clear)
+        self.ready = True
+
+    def _close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.vectors.flush()
+                del self.vectors
+                self.conn.close()
+                self.conn = None
+
+    async def close(self):
+        await asyncio.to_thread(self._close)
+        self.ready = False
@@ -0,0 +1,219 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from metrics.registry import register_source
+from dotenv import load_dotenv
+load_dotenv(override=True)
+
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE","64"))
+# Large enough that the embedding generator can keep several model requests in flight
+PIPELINE_EMBED_BATCH_SIZE = int(os.getenv("PIPELINE_EMBED_BATCH_SIZE","128"))
+
+_DONE = object()
+RECENT_RUNS = deque(maxlen=20)
+
+class StageCounter:
+    """Items in/out and time spent working (not waiting on queues) for one pipeline stage"""
+    def __init__(self,name:str):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_seconds = 0.0
+        self.started_at = None
+        self.finished_at = None
+
+    def as_dict(self) -> Dict[str,Any]:
+        wall = ((self.finished_at or time.perf_counter()) - self.started_at) if self.started_at else 0.0
+        return {
+            'items_in':self.items_in,
+            'items_out':self.items_out,
+            'busy_seconds':round(self.busy_seconds,3),
+            'wall_seconds':round(wall,3),
+            'items_per_second':round(self.items_out / wall,2) if wall else 0.0,
+        }
+
+class IndexingPipeline:
+    """fetch -> parse -> embed -> store, each stage a task joined by bounded queues.
+
+    A full queue blocks the stage feeding it, so the amount of work held between any two
+    stages is bounded no matter how large the repository is. A failing stage cancels the
+    others rather than sending the end-of-stream marker downstream.
+    """
+    def __init__(
+        self,
+        processor,
+        embedding_generator,
+        vector_store,
+        repo_name:str,
+        owner:str,
+        branch:str,
+        index_version:str,
+        queue_size:Optional[int]=None,
+        embed_batch_size:Optional[int]=None,
+        stale_files:Optional[Dict[str,str]]=None,
+        symbol_writer=None,
+        on_progress:Optional[Callable[[Dict[str,Any]],None]]=None,
+    ):
+        self.processor = processor
+        self.embedding_generator = embedding_generator
+        self.vector_store = vector_store
+        self.repo_name = repo_name
+        self.owner = owner
+        self.branch = branch
+        self.index_version = index_version
+        self.queue_size = queue_size or PIPELINE_QUEUE_SIZE
+        self.embed_batch_size = embed_batch_size or PIPELINE_EMBED_BATCH_SIZE
+        # Files that already have chunks in the store; those are replaced, not duplicated
+        self.stale_files = stale_files or {}
+        # Inverted symbol index fed alongside the vector store, if any
+        self.symbol_writer = symbol_writer
+        self.on_progress = on_progress
+        self.pending_deletes: List[str] = []
+        self.counters = {name:StageCounter(name) for name in ('fetch','parse','embed','store')}
+
+    def stats(self) -> Dict[str,Any]:
+        return {name:counter.as_dict() for name,counter in self.counters.items()}
+
+    def _progress(self):
+        if self.on_progress:
+            self.on_progress(self.stats())
+
+    async def _fetch(self,files:AsyncIterator[Dict[str,Any]],out_queue:asyncio.Queue):
+        counter = self.counters['fetch']
+        counter.started_at = time.perf_counter()
+        iterator = files.__aiter__()
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    file_data = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+                counter.busy_seconds += time.perf_counter() - started
+                counter.items_in += 1
+                await out_queue.put(file_data)
+                counter.items_out += 1
+                self._progress()
+        finally:
+            counter.finished_at = time.perf_counter()
+        await out_queue.put(_DONE)
+
+    async def _drain(self,in_queue:asyncio.Queue,counter:StageCounter) -> AsyncIterator[Dict[str,Any]]:
+        while (item := await in_queue.get()) is not _DONE:
+            counter.items_in += 1
+            yield item
+
+    async def _parse(self,in_queue:asyncio.Queue,out_queue:asyncio.Queue):
+        counter = self.counters['parse']
+        counter.started_at = time.perf_counter()
+        results = self.processor.preprocess_stream(self._drain(in_queue,counter))
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    file_data,chunks = await results.__anext__()
+                except StopAsyncIteration:
+                    break
+                counter.busy_seconds += time.perf_counter() - started
+                if file_data['path'] in self.stale_files:
+                    self.pending_deletes.append(file_data['path'])
+                for chunk in chunks:
+                    await out_queue.put(chunk)
+                    counter.items_out += 1
+                self._progress()
+        finally:
+            counter.finished_at = time.perf_counter()
+            await results.aclose()
+        await out_queue.put(_DONE)
+
+    async def _embed(self,in_queue:asyncio.Queue,out_queue:asyncio.Queue):
+        counter = self.counters['embed']
+        counter.started_at = time.perf_counter()
+        done = False
+        try:
+            while not done:
+                chunk = await in_queue.get()
+                if chunk is _DONE:
+                    break
+                batch = [chunk]
+                # Take whatever is already queued, up to one batch, without waiting for more
+                while len(batch) < self.embed_batch_size and not in_queue.empty():
+                    chunk = in_queue.get_nowait()
+                    if chunk is _DONE:
+                        done = True
+                        break
+                    batch.append(chunk)
+                counter.items_in += len(batch)
+                started = time.perf_counter()
+                embedded = await asyncio.to_thread(self.embedding_generator.generate_embeddings,batch)
+                counter.busy_seconds += time.perf_counter() - started
+                counter.items_out += len(embedded)
+                await out_queue.put(embedded)
+                self._progress()
+        finally:
+            counter.finished_at = time.perf_counter()
+        await out_queue.put(_DONE)
+
+    async def _flush_deletes(self):
+        if self.pending_deletes:
+            paths,self.pending_deletes = self.pending_deletes,[]
+            await self.vector_store.delete_by_files(self.repo_name,paths,owner=self.owner,branch=self.branch,index_version=self.index_version)
+            if self.symbol_writer:
+                await asyncio.to_thread(self.symbol_writer.remove_files,paths)
+
+    async def _store(self,in_queue:asyncio.Queue):
+        counter = self.counters['store']
+        counter.started_at = time.perf_counter()
+        writer = self.vector_store.open_writer(self.repo_name,self.owner,self.branch,self.index_version)
+        try:
+            while (batch := await in_queue.get()) is not _DONE:
+                counter.items_in += len(batch)
+                started = time.perf_counter()
+                # Old chunks of a changed file must go before any of its new chunks land
+                await self._flush_deletes()
+                await writer.write(batch)
+                if self.symbol_writer:
+                    await asyncio.to_thread(self.symbol_writer.add_chunks,batch.chunks)
+                counter.busy_seconds += time.perf_counter() - started
+                counter.items_out += len(batch)
+                self._progress()
+            await self._flush_deletes()
+            # Wait for every write still in flight to be applied
+            started = time.perf_counter()
+            await writer.close()
+            counter.busy_seconds += time.perf_counter() - started
+        except BaseException:
+            writer.abort()
+            raise
+        finally:
+            counter.finished_at = time.perf_counter()
+
+    async def run(self,files:AsyncIterator[Dict[str,Any]]) -> Dict[str,Any]:
+        file_queue = asyncio.Queue(maxsize=self.queue_size)
+        chunk_queue = asyncio.Queue(maxsize=self.queue_size * self.embed_batch_size)
+        batch_queue = asyncio.Queue(maxsize=max(2,self.queue_size // self.embed_batch_size))
+        tasks = [
+            asyncio.create_task(self._fetch(files,file_queue)),
+            asyncio.create_task(self._parse(file_queue,chunk_queue)),
+            asyncio.create_task(self._embed(chunk_queue,batch_queue)),
+            asyncio.create_task(self._store(batch_queue)),
+        ]
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks,return_exceptions=True)
+            raise
+        finally:
+            RECENT_RUNS.append({
+                'repo_name':self.repo_name,
+                'seconds':round(time.perf_counter() - started,3),
+                'stages':self.stats(),
+            })
+        return self.stats()
+
+register_source("indexing_pipeline",lambda:{'recent_runs':list(RECENT_RUNS)})
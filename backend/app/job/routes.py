@@ -1,13 +1,16 @@
 from fastapi.routing import APIRouter
 from fastapi.requests import Request
 from fastapi import Depends,HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse,StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from user.db import get_user_access_token
 from auth.security import verify_token
 from auth.schemas import UserTokenInfo
-from job.services import fetch_entire_repo,CodePreprocessor
-from job.embeddings import CodeEmbeddingGenerator
-from job.vectorstore import CodeVectorStore
+from job.worker import index_job_manager,TERMINAL_STATUSES
+from job.dependencies import get_code_search
+from job.search import CodeSearch,SEARCH_MAX_QUERIES,SEARCH_MAX_LIMIT,SEARCH_MAX_EF,SEARCH_MODES
+import asyncio
+import json
 router = APIRouter(prefix="/job",tags=["job"])
 
 # @router.post("/create-job")
@@ -19,44 +22,122 @@ router = APIRouter(prefix="/job",tags=["job"])
     
 @router.post("/index-repository")
 async def index_repository(request:Request,user_token_info:UserTokenInfo = Depends(verify_token)):
+    body = await request.json()
+    repo_name = body.get('repo_name')
+    branch = body.get('branch','main')
+    ingest_mode = body.get('ingest_mode','contents')
+    incremental = bool(body.get('incremental',False))
+    if not repo_name:
+        raise HTTPException(status_code=400,detail="Repo name is required")
+    if ingest_mode not in ('contents','archive'):
+        raise HTTPException(status_code=400,detail="ingest_mode must be 'contents' or 'archive'")
     try:
-        print("[[[[[[[[[[[[[[[[[[]]]]]]]]]]]]]]]]]]")
-
-        body = await request.json()
-        repo_name = body.get('repo_name')
-        branch = body.get('branch','main')
-        print("[[[[[[[[[[[[[[[[[[]]]]]]]]]]]]]]]]]]")
-        if not repo_name:
-            raise HTTPException(status_code=400,detail="Repo name is required")
         access_token = await get_user_access_token(user_token_info)
-        username = user_token_info.username
-        
-        print(f"Fetching repository {username}/{repo_name}...")
-        files_data = await fetch_entire_repo(username,repo_name,access_token,branch)
-        
-        print(f"Processing {len(files_data)} files...")
-        processor = CodePreprocessor()
-        all_chunks = []
-        
-        for file_data in files_data:
-            chunks = processor.preprocess_file(file_data)
-            all_chunks.extend(chunks)
-        
-        print(f"Generating embeddings for {len(all_chunks)} code chunks...")
-        embedding_generator = CodeEmbeddingGenerator()
-        chunks_with_embeddings = embedding_generator.generate_embeddings(all_chunks)
-        
-        print("Storing embeddings in vector database...")
-        vector_store = CodeVectorStore()
-        vector_store.store_embeddings(chunks_with_embeddings,repo_name)
-        
-        return JSONResponse(content={
-            "status":"success",
-            "message":f"Successfully indexed {len(files_data)} files with {len(all_chunks)} code chunks",
-            "files_processed":len(files_data),
-            "chunks_created":len(all_chunks)
-        })
+        job_id = await index_job_manager.submit(
+            user_token_info.username,repo_name,access_token,branch,ingest_mode,incremental
+        )
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error indexing repository: {e}")
-        raise HTTPException(status_code=500,detail=f"Failed to index repository: {str(e)}")
+        print(f"Error queueing index job: {e}")
+        raise HTTPException(status_code=500,detail=f"Failed to queue index job: {str(e)}")
+    return JSONResponse(status_code=202,content={"job_id":job_id,"status":"queued"})
 
+async def get_owned_index_job(job_id:str,user_token_info:UserTokenInfo) -> dict:
+    job = await index_job_manager.get(job_id)
+    if not job or job["username"] != user_token_info.username:
+        raise HTTPException(status_code=404,detail="Index job not found")
+    return job
+
+@router.get("/index-jobs/{job_id}")
+async def get_index_job_status(job_id:str,user_token_info:UserTokenInfo = Depends(verify_token)):
+    job = await get_owned_index_job(job_id,user_token_info)
+    return JSONResponse(content=jsonable_encoder(job))
+
+@router.post("/index-jobs/{job_id}/cancel")
+async def cancel_index_job(job_id:str,user_token_info:UserTokenInfo = Depends(verify_token)):
+    await get_owned_index_job(job_id,user_token_info)
+    if not await index_job_manager.cancel(job_id):
+        raise HTTPException(status_code=409,detail="Index job has already finished")
+    return JSONResponse(content={"job_id":job_id,"status":"cancelling"})
+
+@router.get("/index-jobs/{job_id}/events")
+async def stream_index_job(job_id:str,request:Request,user_token_info:UserTokenInfo = Depends(verify_token)):
+    await get_owned_index_job(job_id,user_token_info)
+
+    async def events():
+        last_sent = None
+        while not await request.is_disconnected():
+            job = await index_job_manager.get(job_id)
+            if job is None:
+                break
+            payload = json.dumps(jsonable_encoder({
+                "job_id":job_id,
+                "status":job["status"],
+                "progress":job.get("progress",{}),
+                "result":job.get("result"),
+                "error":job.get("error"),
+            }))
+            if payload != last_sent:
+                last_sent = payload
+                yield f"event: progress\ndata: {payload}\n\n"
+            if job["status"] in TERMINAL_STATUSES:
+                yield "event: end\ndata: {}\n\n"
+                break
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control":"no-cache","X-Accel-Buffering":"no"}
+    )
+
+@router.post("/search")
+async def search_code(
+    request:Request,
+    user_token_info:UserTokenInfo = Depends(verify_token),
+    code_search:CodeSearch = Depends(get_code_search),
+):
+    """Code search in one of the user's indexed repos.
+
+    Body: repo_name, query (or queries: [...] for a batch), and optionally branch,
+    path_prefix, chunk_type, limit, mode (hybrid, vector or lexical; default hybrid) and
+    ef, the HNSW beam width for this request (default QDRANT_SEARCH_EF; higher trades
+    latency for recall). Without a branch every indexed branch is searched.
+    """
+    body = await request.json()
+    repo_name = body.get('repo_name')
+    queries = body.get('queries') if 'queries' in body else [body.get('query')]
+    if not repo_name:
+        raise HTTPException(status_code=400,detail="Repo name is required")
+    if not isinstance(queries,list) or not queries or not all(isinstance(query,str) and query.strip() for query in queries):
+        raise HTTPException(status_code=400,detail="query must be a non-empty string (or queries a non-empty list of them)")
+    if len(queries) > SEARCH_MAX_QUERIES:
+        raise HTTPException(status_code=400,detail=f"At most {SEARCH_MAX_QUERIES} queries per request")
+    try:
+        limit = min(max(int(body.get('limit',10)),1),SEARCH_MAX_LIMIT)
+    except (TypeError,ValueError):
+        raise HTTPException(status_code=400,detail="limit must be an integer")
+    mode = body.get('mode','hybrid')
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400,detail=f"mode must be one of {', '.join(SEARCH_MODES)}")
+    ef = body.get('ef')
+    if ef is not None:
+        try:
+            ef = min(max(int(ef),1),SEARCH_MAX_EF)
+        except (TypeError,ValueError):
+            raise HTTPException(status_code=400,detail="ef must be an integer")
+    try:
+        results = await code_search.search(
+            user_token_info.username,repo_name,queries,
+            branch=body.get('branch'),path_prefix=body.get('path_prefix'),chunk_type=body.get('chunk_type'),limit=limit,mode=mode,ef=ef
+        )
+    except Exception as e:
+        print(f"Error searching code: {e}")
+        raise HTTPException(status_code=500,detail=f"Search failed: {str(e)}")
+    if results is None:
+        raise HTTPException(status_code=404,detail="Repository has not been indexed")
+    return JSONResponse(content=jsonable_encoder({
+        "repo_name":repo_name,
+        "results":[{"query":query,"hits":hits} for query,hits in zip(queries,results)]
+    }))
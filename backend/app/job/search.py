@@ -0,0 +1,217 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Hashable, List, Optional
+import numpy as np
+from job.db import get_index_revisions
+from job.symbol_index import search_symbols,is_identifier_query
+from metrics.registry import register_source
+from dotenv import load_dotenv
+load_dotenv(override=True)
+
+SEARCH_EMBEDDING_CACHE_SIZE = int(os.getenv("SEARCH_EMBEDDING_CACHE_SIZE","2048"))
+SEARCH_RESULT_CACHE_SIZE = int(os.getenv("SEARCH_RESULT_CACHE_SIZE","512"))
+SEARCH_MAX_QUERIES = int(os.getenv("SEARCH_MAX_QUERIES","32"))
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT","50"))
+# Upper bound on the per-query HNSW beam width a request may ask for
+SEARCH_MAX_EF = int(os.getenv("SEARCH_MAX_EF","1024"))
+# Latencies kept for the percentiles reported under /metrics
+SEARCH_LATENCY_WINDOW = int(os.getenv("SEARCH_LATENCY_WINDOW","1000"))
+SEARCH_MODES = ('hybrid','vector','lexical')
+# Reciprocal rank fusion constant: larger values flatten the advantage of top ranks
+RRF_K = 60
+
+class LRUCache:
+    def __init__(self,max_size:int):
+        self.max_size = max_size
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self,key:Hashable) -> Optional[Any]:
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self,key:Hashable,value:Any):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> Dict[str,Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size':len(self.entries),
+            'max_size':self.max_size,
+            'hits':self.hits,
+            'misses':self.misses,
+            'hit_rate':round(self.hits / lookups,4) if lookups else 0.0,
+        }
+
+def _percentile(ordered:List[float],fraction:float) -> float:
+    return ordered[min(len(ordered) - 1,int(fraction * len(ordered)))]
+
+def _hit(point) -> Dict[str,Any]:
+    payload = point.payload or {}
+    return {
+        'id':point.id,
+        'score':point.score,
+        'file_path':payload.get('file_path'),
+        'branch':payload.get('branch'),
+        'type':payload.get('type'),
+        'name':payload.get('name'),
+        'line_start':payload.get('line_start'),
+        'line_end':payload.get('line_end'),
+        'document':payload.get('document',''),
+        'sources':['vector'],
+    }
+
+def fuse(rankings:Dict[str,List[Dict[str,Any]]],limit:int) -> List[Dict[str,Any]]:
+    """Reciprocal rank fusion: each hit scores sum(1 / (RRF_K + rank)) over the rankings it appears in"""
+    fused: Dict[Any,Dict[str,Any]] = {}
+    for source,hits in rankings.items():
+        for rank,hit in enumerate(hits,1):
+            entry = fused.get(hit['id'])
+            if entry is None:
+                entry = fused[hit['id']] = {**hit,'score':0.0,'sources':[]}
+            elif 'document' not in entry and 'document' in hit:
+                entry['document'] = hit['document']
+            entry['score'] += 1.0 / (RRF_K + rank)
+            entry['sources'].append(source)
+    return sorted(fused.values(),key=lambda hit:hit['score'],reverse=True)[:limit]
+
+class CodeSearch:
+    """Hybrid code search over a user's indexed repositories.
+
+    Each query runs against the symbol index and the vector store, and the two rankings
+    are fused. A query that looks like an identifier or file name and matches the symbol
+    index is answered from it alone, without embedding the query.
+
+    Query vectors are cached by text. Results are cached under the live index version and
+    manifest revision of every branch searched. Any re-index saves a new revision (a full
+    one also switches versions), so old entries become unreachable without any explicit
+    invalidation; they age out of the LRU.
+    """
+    def __init__(self,vector_store,embedding_generator,embedding_cache_size:int=SEARCH_EMBEDDING_CACHE_SIZE,result_cache_size:int=SEARCH_RESULT_CACHE_SIZE):
+        self.vector_store = vector_store
+        self.embedding_generator = embedding_generator
+        self.query_embeddings = LRUCache(embedding_cache_size)
+        self.results = LRUCache(result_cache_size)
+        self.latencies = deque(maxlen=SEARCH_LATENCY_WINDOW)
+        self.requests = 0
+        self.queries = 0
+        self.lexical_queries = 0
+        self.embeddings_skipped = 0
+        register_source("search",self.stats)
+
+    async def _embed(self,queries:List[str]) -> np.ndarray:
+        namespace = self.embedding_generator.cache_namespace
+        vectors = [self.query_embeddings.get((namespace,query)) for query in queries]
+        missing = list(dict.fromkeys(query for query,vector in zip(queries,vectors) if vector is None))
+        if missing:
+            computed = await asyncio.to_thread(self.embedding_generator.embed_texts,missing)
+            for query,vector in zip(missing,computed):
+                self.query_embeddings.put((namespace,query),vector)
+            fresh = dict(zip(missing,computed))
+            vectors = [vector if vector is not None else fresh[query] for query,vector in zip(queries,vectors)]
+        return np.stack(vectors)
+
+    async def search(
+        self,
+        owner:str,
+        repo_name:str,
+        queries:List[str],
+        branch:Optional[str]=None,
+        path_prefix:Optional[str]=None,
+        chunk_type:Optional[str]=None,
+        limit:int=10,
+        mode:str='hybrid',
+        ef:Optional[int]=None,
+    ) -> Optional[List[List[Dict[str,Any]]]]:
+        """Hits for each query, in order; None if the repo (or branch) has never been indexed.
+
+        `ef` overrides the vector store's HNSW beam width for this request: higher finds
+        more of the true nearest neighbours at the cost of latency.
+        """
+        started = time.perf_counter()
+        try:
+            revisions = await get_index_revisions(owner,repo_name,branch)
+            if not revisions:
+                return None
+            versions = {branch_name:index_version for branch_name,(index_version,_) in revisions.items()}
+            scope = (owner,repo_name,tuple(sorted(revisions.items())),path_prefix or '',chunk_type or '',limit,mode,ef)
+            results = [self.results.get(scope + (query,)) for query in queries]
+            pending = list(dict.fromkeys(query for query,result in zip(queries,results) if result is None))
+            if pending:
+                fresh = await self._search(owner,repo_name,versions,pending,path_prefix,chunk_type,limit,mode,ef)
+                for query,hits in fresh.items():
+                    self.results.put(scope + (query,),hits)
+                results = [result if result is not None else fresh[query] for query,result in zip(queries,results)]
+            return results
+        finally:
+            self.requests += 1
+            self.queries += len(queries)
+            self.latencies.append(time.perf_counter() - started)
+
+    async def _search(self,owner,repo_name,versions,queries,path_prefix,chunk_type,limit,mode,ef=None) -> Dict[str,List[Dict[str,Any]]]:
+        lexical = {}
+        if mode != 'vector':
+            lexical = await asyncio.to_thread(
+                lambda: {query:search_symbols(owner,repo_name,versions,query,limit,path_prefix,chunk_type) for query in queries}
+            )
+            self.lexical_queries += len(queries)
+        # Identifier lookups that hit the symbol index don't need a query embedding
+        semantic = [
+            query for query in queries
+            if mode == 'vector' or (mode == 'hybrid' and not (is_identifier_query(query) and lexical[query]))
+        ]
+        self.embeddings_skipped += len(queries) - len(semantic)
+        vector = {}
+        if semantic:
+            vectors = await self._embed(semantic)
+            qdrant_filter = self.vector_store.search_filter(repo_name,owner,list(versions.values()),path_prefix,chunk_type)
+            found = await self.vector_store.query_batch(vectors,qdrant_filter,limit,ef=ef)
+            vector = {query:[_hit(point) for point in points] for query,points in zip(semantic,found)}
+        if mode == 'vector':
+            return vector
+
+        results = {}
+        for query in queries:
+            rankings = {'lexical':lexical[query]}
+            if query in vector:
+                rankings['vector'] = vector[query]
+            results[query] = fuse(rankings,limit)
+        # Symbol index hits carry no code; fetch it for those the vector search didn't return
+        missing = list({hit['id'] for hits in results.values() for hit in hits if 'document' not in hit})
+        documents = await self.vector_store.retrieve_payloads(missing)
+        for hits in results.values():
+            for hit in hits:
+                if 'document' not in hit:
+                    hit['document'] = documents.get(hit['id'],{}).get('document','')
+        return results
+
+    def stats(self) -> Dict[str,Any]:
+        ordered = sorted(self.latencies)
+        latency = {}
+        if ordered:
+            latency = {
+                'p50_ms':round(_percentile(ordered,0.50) * 1000,2),
+                'p99_ms':round(_percentile(ordered,0.99) * 1000,2),
+                'max_ms':round(ordered[-1] * 1000,2),
+                'samples':len(ordered),
+            }
+        return {
+            'requests':self.requests,
+            'queries':self.queries,
+            'lexical_queries':self.lexical_queries,
+            'embeddings_skipped':self.embeddings_skipped,
+            'latency':latency,
+            'query_embedding_cache':self.query_embeddings.stats(),
+            'result_cache':self.results.stats(),
+        }
@@ -1,63 +1,402 @@
 import httpx
 import base64
-from typing import List, Dict, Any
-import re
+import asyncio
+import random
+import hashlib
+import tarfile
+import zlib
+import time
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 import ast
 from pathlib import Path
+from job.chunkers.lines import LineIndex
+from job.chunkers.budget import split_oversized,CHUNK_MAX_CHARS
+from job.chunkers.registry import CHUNKERS
+from githubapi.client import GITHUB_API_URL,get_github_client,auth_headers
+from dotenv import load_dotenv
+load_dotenv(override=True)
 
-async def fetch_entire_repo(username:str,repo_name:str,access_token:str,branch:str="main") -> List[Dict[str,Any]]:
-    files_data = []
-    
-    async with httpx.AsyncClient() as client:
-        tree_response = await client.get(
-            f"https://api.github.com/repos/{username}/{repo_name}/git/trees/{branch}?recursive=1",
-            headers={"Authorization":f"Bearer {access_token}"}
+FETCH_CONCURRENCY = int(os.getenv("GITHUB_FETCH_CONCURRENCY","16"))
+FETCH_MAX_RETRIES = int(os.getenv("GITHUB_FETCH_MAX_RETRIES","3"))
+FETCH_BACKOFF_BASE = float(os.getenv("GITHUB_FETCH_BACKOFF_BASE","0.5"))
+
+CODE_EXTENSIONS = {
+    '.py', '.js', '.ts', '.jsx', '.tsx', '.java', '.cpp', '.c', '.h', 
+    '.cs', '.php', '.rb', '.go', '.rs', '.swift', '.kt', '.scala',
+    '.html', '.css', '.scss', '.sass', '.vue', '.svelte', '.sql',
+    '.md', '.yml', '.yaml', '.json', '.xml', '.toml', '.ini'
+}
+MAX_FILE_SIZE = 1000000  # 1MB limit
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def is_indexable_file(file_path:str,size:int) -> bool:
+    return Path(file_path).suffix.lower() in CODE_EXTENSIONS and size < MAX_FILE_SIZE
+
+def _retry_delay(response:Optional[httpx.Response],attempt:int,backoff_base:float) -> float:
+    if response is not None and response.headers.get("retry-after"):
+        try:
+            return float(response.headers["retry-after"])
+        except ValueError:
+            pass
+    return backoff_base * (2 ** attempt) + random.uniform(0,backoff_base)
+
+async def _fetch_file_content(client:httpx.AsyncClient,url:str,headers:Dict[str,str],max_retries:int,backoff_base:float,stats:Dict[str,Any]) -> Optional[str]:
+    """Fetch and decode one blob from the contents API, retrying transient failures with backoff"""
+    for attempt in range(max_retries + 1):
+        response = None
+        try:
+            response = await client.get(url,headers=headers)
+            if response.status_code == 200:
+                return base64.b64decode(response.json()['content']).decode('utf-8',errors='ignore')
+            rate_limited = response.status_code == 403 and response.headers.get("x-ratelimit-remaining") == "0"
+            if response.status_code not in RETRYABLE_STATUS_CODES and not rate_limited:
+                raise Exception(f"GitHub returned {response.status_code}")
+        except httpx.TransportError:
+            if attempt == max_retries:
+                raise
+        if attempt == max_retries:
+            raise Exception(f"GitHub returned {response.status_code} after {attempt + 1} attempts")
+        stats['retries'] += 1
+        await asyncio.sleep(_retry_delay(response,attempt,backoff_base))
+
+async def iter_repo_files(
+    username:str,
+    repo_name:str,
+    access_token:str,
+    branch:str="main",
+    concurrency:Optional[int]=None,
+    max_retries:Optional[int]=None,
+    backoff_base:Optional[float]=None,
+    skip_shas:Optional[Dict[str,str]]=None,
+    stats:Optional[Dict[str,Any]]=None,
+) -> AsyncIterator[Dict[str,Any]]:
+    """Yield file records in tree order while up to `concurrency` blobs are downloaded at once.
+
+    Files whose blob sha matches `skip_shas[path]` are not downloaded. `stats`, if given, is
+    filled with per-file timings, success/failure/retry/skip counts and the full `tree`
+    ({path: sha} of every indexable blob on the branch).
+    """
+    concurrency = concurrency or FETCH_CONCURRENCY
+    max_retries = FETCH_MAX_RETRIES if max_retries is None else max_retries
+    backoff_base = FETCH_BACKOFF_BASE if backoff_base is None else backoff_base
+    if stats is None:
+        stats = {}
+    skip_shas = skip_shas or {}
+    stats.update({'files_fetched':0,'files_failed':0,'files_skipped':0,'retries':0,'timings':{},'failures':{},'tree':{}})
+    headers = auth_headers(access_token)
+    started = time.perf_counter()
+
+    # Blob downloads share the app-wide pool; `concurrency` bounds how many are in flight
+    client = get_github_client()
+    tree_response = await client.get(
+        f"{GITHUB_API_URL}/repos/{username}/{repo_name}/git/trees/{branch}?recursive=1",
+        headers=headers
+    )
+    if tree_response.status_code != 200:
+        raise Exception(f"Failed to fetch repository tree: {tree_response.status_code}")
+    tree = tree_response.json()
+    items = []
+    for item in tree["tree"]:
+        if item["type"] != "blob" or not is_indexable_file(item["path"],item.get('size',0)):
+            continue
+        stats['tree'][item["path"]] = item["sha"]
+        if skip_shas.get(item["path"]) == item["sha"]:
+            stats['files_skipped'] += 1
+        else:
+            items.append(item)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_one(item:Dict[str,Any]) -> Optional[Dict[str,Any]]:
+        file_path = item["path"]
+        async with semaphore:
+            file_started = time.perf_counter()
+            try:
+                content = await _fetch_file_content(
+                    client,
+                    f"{GITHUB_API_URL}/repos/{username}/{repo_name}/contents/{file_path}?ref={branch}",
+                    headers,max_retries,backoff_base,stats
+                )
+            except Exception as e:
+                print(f"Error fetching {file_path}: {e}")
+                stats['files_failed'] += 1
+                stats['failures'][file_path] = str(e)
+                return None
+            finally:
+                stats['timings'][file_path] = time.perf_counter() - file_started
+        stats['files_fetched'] += 1
+        return {
+            'path':file_path,
+            'content':content,
+            'size':item.get('size',0),
+            'extension':Path(file_path).suffix.lower(),
+            'sha':item['sha']
+        }
+
+    # Keep a bounded window of scheduled downloads and hand them out in tree order.
+    window = deque()
+    pending = iter(items)
+    try:
+        for item in pending:
+            window.append(asyncio.create_task(fetch_one(item)))
+            if len(window) >= concurrency * 2:
+                file_data = await window.popleft()
+                if file_data:
+                    yield file_data
+        while window:
+            file_data = await window.popleft()
+            if file_data:
+                yield file_data
+    finally:
+        for task in window:
+            task.cancel()
+        stats['elapsed'] = time.perf_counter() - started
+        print(
+            f"Fetched {stats['files_fetched']} files from {username}/{repo_name}@{branch} "
+            f"in {stats['elapsed']:.2f}s ({stats['files_failed']} failed, {stats['files_skipped']} unchanged, {stats['retries']} retries)"
+        )
+
+async def fetch_entire_repo(
+    username:str,
+    repo_name:str,
+    access_token:str,
+    branch:str="main",
+    concurrency:Optional[int]=None,
+    max_retries:Optional[int]=None,
+    backoff_base:Optional[float]=None,
+    skip_shas:Optional[Dict[str,str]]=None,
+    stats:Optional[Dict[str,Any]]=None,
+) -> List[Dict[str,Any]]:
+    return [
+        file_data async for file_data in iter_repo_files(
+            username,repo_name,access_token,branch,
+            concurrency=concurrency,max_retries=max_retries,backoff_base=backoff_base,skip_shas=skip_shas,stats=stats,
         )
-        if tree_response.status_code != 200:
-            return Exception(f"Failed to fetch repository tree: {tree_response.status_code}")
-        tree = tree_response.json()
-        code_extensions = {
-                '.py', '.js', '.ts', '.jsx', '.tsx', '.java', '.cpp', '.c', '.h', 
-                '.cs', '.php', '.rb', '.go', '.rs', '.swift', '.kt', '.scala',
-                '.html', '.css', '.scss', '.sass', '.vue', '.svelte', '.sql',
-                '.md', '.yml', '.yaml', '.json', '.xml', '.toml', '.ini'
-            }
-        for item in tree["tree"]:
-            if item["type"] == "blob":
-                file_path = item["path"]
-                file_extension = Path(file_path).suffix.lower()
-                if file_extension in code_extensions and item.get('size', 0) < 1000000:  # 1MB limit
-                    try:
-                        file_response = await client.get(
-                            f"https://api.github.com/repos/{username}/{repo_name}/contents/{file_path}",
-                            headers={"Authorization":f"Bearer {access_token}"}
-                        )
-                        
-                        if file_response.status_code == 200:
-                            file_data = file_response.json()
-                            content = base64.b64decode(file_data['content']).decode('utf-8',errors='ignore')
-                            
-                            files_data.append({
-                                'path':file_path,
-                                'content':content,
-                                'size':item.get('size',0),
-                                'extension':file_extension,
-                                'sha':item['sha']
-                            })
-                    except Exception as e:
-                        print(f"Error fetching {file_path}: {e}")
-                        continue
-    return files_data
+    ]
+
+class _TarStreamReader:
+    """Incremental ustar/pax reader fed with decompressed bytes as they arrive.
+
+    Only members that pass `is_indexable_file` are buffered; everything else is skipped
+    block by block, so memory use is bounded by the largest accepted file.
+    """
+    BLOCK = 512
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.member = None
+        self.remaining = 0
+        self.padding = 0
+        self.data = None
+        self.pax_path = None
+        self.long_name = None
+
+    def _member_path(self,info:tarfile.TarInfo) -> str:
+        path = self.pax_path or self.long_name or info.name
+        self.pax_path = None
+        self.long_name = None
+        # GitHub archives nest everything under "<owner>-<repo>-<sha>/"
+        return path.split('/',1)[1] if '/' in path else ''
+
+    def _parse_pax(self,data:bytes):
+        pos = 0
+        while pos < len(data):
+            space = data.index(b' ',pos)
+            length = int(data[pos:space])
+            key,_,value = data[space + 1:pos + length - 1].partition(b'=')
+            if key == b'path':
+                self.pax_path = value.decode('utf-8','surrogateescape')
+            pos += length
+
+    def _finish_member(self) -> Optional[Tuple[str,bytes]]:
+        kind,path = self.member
+        data = bytes(self.data) if self.data is not None else None
+        self.member = None
+        self.data = None
+        if kind == 'pax':
+            self._parse_pax(data)
+        elif kind == 'longname':
+            self.long_name = data.rstrip(b'\0').decode('utf-8','surrogateescape')
+        elif kind == 'file':
+            return path,data
+        return None
+
+    def feed(self,chunk:bytes) -> List[Tuple[str,bytes]]:
+        self.buffer.extend(chunk)
+        files = []
+        while True:
+            if self.member is not None:
+                take = min(self.remaining,len(self.buffer))
+                if self.data is not None:
+                    self.data.extend(self.buffer[:take])
+                del self.buffer[:take]
+                self.remaining -= take
+                if self.remaining:
+                    break
+                if len(self.buffer) < self.padding:
+                    break
+                del self.buffer[:self.padding]
+                finished = self._finish_member()
+                if finished:
+                    files.append(finished)
+                continue
+            if len(self.buffer) < self.BLOCK:
+                break
+            block = bytes(self.buffer[:self.BLOCK])
+            del self.buffer[:self.BLOCK]
+            if block.count(0) == self.BLOCK:
+                continue
+            info = tarfile.TarInfo.frombuf(block,'utf-8','surrogateescape')
+            if info.type in (tarfile.XHDTYPE,tarfile.SOLARIS_XHDTYPE):
+                kind,path = 'pax',None
+            elif info.type == tarfile.GNUTYPE_LONGNAME:
+                kind,path = 'longname',None
+            elif info.type == tarfile.XGLTYPE:
+                kind,path = 'skip',None
+            elif info.type in tarfile.REGULAR_TYPES:
+                path = self._member_path(info)
+                kind = 'file' if path and is_indexable_file(path,info.size) else 'skip'
+            else:
+                self._member_path(info)
+                kind,path = 'skip',None
+            self.member = (kind,path)
+            self.remaining = info.size
+            self.padding = -info.size % self.BLOCK
+            self.data = bytearray() if kind != 'skip' else None
+        return files
+
+def git_blob_sha(data:bytes) -> str:
+    """SHA git assigns to a blob with this content, matching the tree API's `sha`"""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+def _archive_record(file_path:str,data:bytes) -> Dict[str,Any]:
+    return {
+        'path':file_path,
+        'content':data.decode('utf-8',errors='ignore'),
+        'size':len(data),
+        'extension':Path(file_path).suffix.lower(),
+        'sha':git_blob_sha(data)
+    }
+
+async def iter_repo_archive(
+    username:str,
+    repo_name:str,
+    access_token:str,
+    branch:str="main",
+    api_url:Optional[str]=None,
+    skip_shas:Optional[Dict[str,str]]=None,
+    stats:Optional[Dict[str,Any]]=None,
+) -> AsyncIterator[Dict[str,Any]]:
+    """Yield file records from a single streamed tarball download of `branch`.
+
+    Records have the same shape as `iter_repo_files` (the blob `sha` is recomputed from
+    the content), so they can be passed straight to `CodePreprocessor.preprocess_file`.
+    `skip_shas` and `stats` behave as in `iter_repo_files`, except that unchanged files
+    still travel inside the archive and are only dropped after hashing.
+    """
+    api_url = api_url or GITHUB_API_URL
+    skip_shas = skip_shas or {}
+    if stats is None:
+        stats = {}
+    stats.update({'files_fetched':0,'files_failed':0,'files_skipped':0,'retries':0,'bytes_downloaded':0,'tree':{}})
+
+    def accept(record:Dict[str,Any]) -> bool:
+        stats['tree'][record['path']] = record['sha']
+        if skip_shas.get(record['path']) == record['sha']:
+            stats['files_skipped'] += 1
+            return False
+        stats['files_fetched'] += 1
+        return True
+
+    started = time.perf_counter()
+    reader = _TarStreamReader()
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    # The tarball endpoint redirects to codeload.github.com
+    async with get_github_client().stream(
+        "GET",
+        f"{api_url}/repos/{username}/{repo_name}/tarball/{branch}",
+        headers=auth_headers(access_token),
+        follow_redirects=True,
+        timeout=httpx.Timeout(60.0,connect=10.0),
+    ) as response:
+        if response.status_code != 200:
+            raise Exception(f"Failed to download repository archive: {response.status_code}")
+        try:
+            async for raw in response.aiter_raw():
+                stats['bytes_downloaded'] += len(raw)
+                for file_path,data in reader.feed(decompressor.decompress(raw)):
+                    record = _archive_record(file_path,data)
+                    if accept(record):
+                        yield record
+            for file_path,data in reader.feed(decompressor.flush()):
+                record = _archive_record(file_path,data)
+                if accept(record):
+                    yield record
+        finally:
+            stats['elapsed'] = time.perf_counter() - started
+            print(
+                f"Extracted {stats['files_fetched']} files from {username}/{repo_name}@{branch} archive "
+                f"({stats['bytes_downloaded']} bytes) in {stats['elapsed']:.2f}s"
+            )
+
+def _python_node_name(node:ast.AST) -> str:
+    if isinstance(node,ast.Name):
+        return node.id
+    if isinstance(node,ast.Attribute):
+        return f"{_python_node_name(node.value)}.{node.attr}"
+    if isinstance(node,ast.Call):
+        return _python_node_name(node.func)
+    return ast.unparse(node)
+
+def _python_first_line(node:ast.AST) -> int:
+    """First line of a def or class, decorators included"""
+    return node.decorator_list[0].lineno if getattr(node,'decorator_list',None) else node.lineno
+
+def _python_header(node:ast.AST,lines:LineIndex) -> str:
+    """Decorators and signature of a def or class with its body replaced by `...`"""
+    start = _python_first_line(node)
+    body = node.body[0]
+    body_line = lines.slice(body.lineno,body.lineno)
+    # col_offset counts UTF-8 bytes
+    before_body = body_line.encode('utf-8')[:body.col_offset].decode('utf-8',errors='ignore')
+    above = [lines.slice(start,body.lineno - 1)] if body.lineno > start else []
+    if before_body.strip():
+        # The body shares its line with the header: `def name(self): return self._name`
+        return '\n'.join(above + [before_body.rstrip() + " ..."])
+    return '\n'.join(above + [before_body + "..."])
+
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS","0")) or os.cpu_count() or 1
+PARALLEL_PARSE_MIN_BYTES = int(os.getenv("PARALLEL_PARSE_MIN_BYTES","8192"))
+
+_parse_executor: Optional[ProcessPoolExecutor] = None
+_worker_processor = None
+
+def get_parse_executor() -> Optional[ProcessPoolExecutor]:
+    """Process pool shared by every CodePreprocessor, created on first use"""
+    global _parse_executor
+    if _parse_executor is None and PARSE_WORKERS > 1:
+        _parse_executor = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+    return _parse_executor
+
+def shutdown_parse_executor():
+    global _parse_executor
+    if _parse_executor is not None:
+        _parse_executor.shutdown(cancel_futures=True)
+        _parse_executor = None
+
+def _preprocess_in_worker(file_data:Dict[str,Any]) -> List[Dict[str,Any]]:
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = CodePreprocessor()
+    return _worker_processor.preprocess_file(file_data)
 
 class CodePreprocessor:
     def __init__(self):
-        self.language_parsers = {
-            '.py':self.parse_python,
-            '.js':self.parse_javascript,
-            '.ts':self.parse_javascript,
-            '.jsx':self.parse_javascript,
-            '.tsx':self.parse_javascript,
-        }
+        # Structure-aware chunkers come from the registry; Python needs the ast-based parser below
+        self.language_parsers = {**CHUNKERS,'.py':self.parse_python}
     
     def preprocess_file(self,file_data:Dict[str,Any]) -> List[Dict[str,Any]]:
         content = file_data['content']
@@ -68,120 +407,186 @@ class CodePreprocessor:
         
         if extension in self.language_parsers:
             chunks = self.language_parsers[extension](content,file_path)
-        else:
+        if not chunks:
             chunks = self.generic_chunk(content,file_path)
+        # Position within the file; part of the point id, since chunks can share a line span
+        for ordinal,chunk in enumerate(chunks):
+            chunk['ordinal'] = ordinal
         return chunks
     
+    async def preprocess_stream(self,files:AsyncIterator[Dict[str,Any]],max_in_flight:Optional[int]=None) -> AsyncIterator[Tuple[Dict[str,Any],List[Dict[str,Any]]]]:
+        """Yield (file_data, chunks) in input order, parsing up to `max_in_flight` files at once.
+
+        Files of at least PARALLEL_PARSE_MIN_BYTES go to the shared process pool, or to a
+        thread when there is no pool (PARSE_WORKERS=1), so the event loop never parses them;
+        smaller ones are cheaper to parse in-process than to hand off.
+        """
+        loop = asyncio.get_running_loop()
+        executor = get_parse_executor()
+        max_in_flight = max_in_flight or PARSE_WORKERS * 2
+        window = deque()
+
+        def submit(file_data:Dict[str,Any]) -> asyncio.Future:
+            if len(file_data['content']) < PARALLEL_PARSE_MIN_BYTES:
+                future = loop.create_future()
+                future.set_result(self.preprocess_file(file_data))
+                return future
+            if executor is None:
+                return asyncio.ensure_future(asyncio.to_thread(self.preprocess_file,file_data))
+            return loop.run_in_executor(executor,_preprocess_in_worker,file_data)
+
+        try:
+            async for file_data in files:
+                window.append((file_data,submit(file_data)))
+                if len(window) >= max_in_flight:
+                    done_file,future = window.popleft()
+                    yield done_file,await future
+            while window:
+                done_file,future = window.popleft()
+                yield done_file,await future
+        finally:
+            for _,future in window:
+                future.cancel()
+    
     def parse_python(self,content:str,file_path:str) -> List[Dict[str,Any]]:
-        chunks = []
+        """Chunk a Python module in one pass over its top-level and class-level statements.
+
+        Top-level functions are emitted whole, decorators included (nested defs stay inside
+        them). A class becomes a skeleton chunk (decorators, header, docstring, attributes and
+        method signatures with `...` for bodies) plus one chunk per method, so only signature
+        lines are embedded twice. Imports and the docstring are summarised in a module chunk,
+        and each run of other top-level statements (constants, `if __name__ == ...`) is a
+        statements chunk. Functions and statements over CHUNK_MAX_CHARS are split.
+        """
         try:
             tree = ast.parse(content)
-            
-            for node in ast.walk(tree):
-                if isinstance(node,(ast.FunctionDef,ast.AsyncFunctionDef)):
-                    func_lines = content.split('\n')[node.lineno-1:node.end_lineno]
-                    func_content = '\n'.join(func_lines)
-                    
-                    docstring = ast.get_docstring(node) or ""
-                    
-                    chunks.append({
-                        "type":"function",
-                        "name":node.name,
-                        "content":func_content,
-                        "docstring":docstring,
-                        "file_path":file_path,
-                        "line_start":node.lineno,
-                        "line_end":node.end_lineno,
-                        "metadata":{
-                            'args':[arg.arg for arg in node.args.args],
-                            'decorators':[d.id if hasattr(d,'id') else str(d) for d in node.decorator_list]
-                            
-                        }
-                    })
-                elif isinstance(node,ast.ClassDef):
-                    class_lines = content.split('\n')[node.lineno-1:node.end_lineno]
-                    class_content = '\n'.join(class_lines)
-                    
-                    docstring = ast.get_docstring(node) or ""
-                    
-                    chunks.append({
-                        'type': 'class',
-                        'name': node.name,
-                        'content': class_content,
-                        'docstring': docstring,
-                        'file_path': file_path,
-                        'line_start': node.lineno,
-                        'line_end': node.end_lineno,
-                        'metadata': {
-                            'base_classes': [base.id if hasattr(base, 'id') else str(base) for base in node.bases],
-                            'decorators': [d.id if hasattr(d, 'id') else str(d) for d in node.decorator_list]
-                        }
-                    })
-            
-            imports = []
-            module_docstring = ""
-            
-            for node in tree.body:
-                if isinstance(node,(ast.Import,ast.ImportFrom)):
-                    imports.append(ast.unparse(node))
-                elif isinstance(node,ast.Expr) and isinstance(node.value, ast.Constant):
-                    if isinstance(node.value.value, str) and not module_docstring:
-                        module_docstring = node.value.value
-            
-            if imports or module_docstring:
-                chunks.append({
-                    'type': 'module',
-                    'name': file_path,
-                    'content': f"# Imports:\n" + '\n'.join(imports) + f"\n\n# Module docstring:\n{module_docstring}",
-                    'file_path': file_path,
-                    'metadata': {
-                        'imports': imports,
-                        'docstring': module_docstring
-                    }
-                })
-                
         except SyntaxError:
             return self.generic_chunk(content, file_path)
         
-        return chunks
-    
-    def parse_javascript(self, content: str, file_path: str) -> List[Dict[str, Any]]:
-        """Parse JavaScript/TypeScript code into semantic chunks"""
+        lines = LineIndex(content)
         chunks = []
+        imports = []
+        module_docstring = ""
+        statements = []
+
+        def flush_statements():
+            if statements:
+                chunks.append(self._python_statements_chunk(statements,lines,file_path))
+                statements.clear()
         
-        function_pattern = r'(?:function\s+(\w+)|(\w+)\s*[:=]\s*(?:async\s+)?function|(?:async\s+)?(\w+)\s*\([^)]*\)\s*(?:=>\s*)?{)'
-        class_pattern = r'class\s+(\w+)(?:\s+extends\s+\w+)?\s*{'
+        for node in tree.body:
+            if isinstance(node,(ast.FunctionDef,ast.AsyncFunctionDef)):
+                flush_statements()
+                chunks.append(self._python_function_chunk(node,lines,file_path))
+            elif isinstance(node,ast.ClassDef):
+                flush_statements()
+                self._python_class_chunks(node,lines,file_path,chunks)
+            elif isinstance(node,(ast.Import,ast.ImportFrom)):
+                imports.append(lines.slice(node.lineno,node.end_lineno).strip())
+            elif (
+                node is tree.body[0] and isinstance(node,ast.Expr)
+                and isinstance(node.value,ast.Constant) and isinstance(node.value.value,str)
+            ):
+                module_docstring = node.value.value
+            else:
+                statements.append(node)
+        flush_statements()
+        chunks = [
+            part for chunk in chunks
+            for part in (split_oversized(chunk,lines,CHUNK_MAX_CHARS) if chunk['type'] in ('function','statements') else [chunk])
+        ]
         
-        lines = content.split('\n')
+        if imports or module_docstring:
+            chunks.append({
+                'type': 'module',
+                'name': file_path,
+                'content': f"# Imports:\n" + '\n'.join(imports) + f"\n\n# Module docstring:\n{module_docstring}",
+                'file_path': file_path,
+                'metadata': {
+                    'imports': imports,
+                    'docstring': module_docstring
+                }
+            })
         
-        for i, line in enumerate(lines):
-            func_match = re.search(function_pattern, line)
-            if func_match:
-                func_name = func_match.group(1) or func_match.group(2) or func_match.group(3)
-                
-                # Find function end (simple brace matching)
-                brace_count = line.count('{') - line.count('}')
-                end_line = i
-                
-                for j in range(i + 1, len(lines)):
-                    brace_count += lines[j].count('{') - lines[j].count('}')
-                    if brace_count <= 0:
-                        end_line = j
-                        break
-                
-                func_content = '\n'.join(lines[i:end_line + 1])
-                
-                chunks.append({
-                    'type': 'function',
-                    'name': func_name,
-                    'content': func_content,
-                    'file_path': file_path,
-                    'line_start': i + 1,
-                    'line_end': end_line + 1,
-                    'metadata': {}
-                })
+        return chunks
+    
+    def _python_function_chunk(self,node:ast.AST,lines:LineIndex,file_path:str,class_name:Optional[str]=None) -> Dict[str,Any]:
+        metadata = {
+            'args':[arg.arg for arg in node.args.args],
+            'decorators':[_python_node_name(d) for d in node.decorator_list]
+        }
+        # A method's decorators are in its class skeleton; a function's stay with it
+        line_start = node.lineno
+        if class_name:
+            metadata['class_name'] = class_name
+        else:
+            line_start = _python_first_line(node)
+        return {
+            "type":"function",
+            "name":node.name,
+            "content":lines.slice(line_start,node.end_lineno),
+            "docstring":ast.get_docstring(node) or "",
+            "file_path":file_path,
+            "line_start":line_start,
+            "line_end":node.end_lineno,
+            "metadata":metadata
+        }
+
+    def _python_statements_chunk(self,nodes:List[ast.stmt],lines:LineIndex,file_path:str) -> Dict[str,Any]:
+        names = [
+            target.id for node in nodes if isinstance(node,(ast.Assign,ast.AnnAssign,ast.AugAssign))
+            for target in (node.targets if isinstance(node,ast.Assign) else [node.target]) if isinstance(target,ast.Name)
+        ]
+        return {
+            "type":"statements",
+            "name":f"{file_path}:{nodes[0].lineno}",
+            "content":lines.slice(nodes[0].lineno,nodes[-1].end_lineno),
+            "file_path":file_path,
+            "line_start":nodes[0].lineno,
+            "line_end":nodes[-1].end_lineno,
+            "metadata":{'names':names}
+        }
+    
+    def _python_class_chunks(self,node:ast.ClassDef,lines:LineIndex,file_path:str,chunks:List[Dict[str,Any]],outer:Optional[str]=None):
+        qualified_name = f"{outer}.{node.name}" if outer else node.name
+        line_start = _python_first_line(node)
+        # Header runs up to the first body statement (covers multi-line bases and one-liners)
+        first_body_line = node.body[0].lineno
+        header_end = first_body_line - 1 if first_body_line > node.lineno else node.lineno
+        skeleton = [lines.slice(line_start,header_end)]
+        members = []
+        methods = []
         
-        return chunks if chunks else self.generic_chunk(content, file_path)
+        for child in node.body:
+            if isinstance(child,(ast.FunctionDef,ast.AsyncFunctionDef)):
+                skeleton.append(_python_header(child,lines))
+                members.append(self._python_function_chunk(child,lines,file_path,class_name=qualified_name))
+                methods.append(child.name)
+            elif isinstance(child,ast.ClassDef):
+                skeleton.append(_python_header(child,lines))
+                self._python_class_chunks(child,lines,file_path,members,outer=qualified_name)
+            elif child.lineno > header_end:
+                skeleton.append(lines.slice(child.lineno,child.end_lineno))
+        
+        metadata = {
+            'base_classes': [_python_node_name(base) for base in node.bases],
+            'decorators': [_python_node_name(d) for d in node.decorator_list],
+            'methods': methods
+        }
+        if outer:
+            metadata['class_name'] = outer
+        chunks.append({
+            'type': 'class',
+            'name': node.name,
+            'content': '\n'.join(skeleton),
+            'docstring': ast.get_docstring(node) or "",
+            'file_path': file_path,
+            'line_start': line_start,
+            'line_end': node.end_lineno,
+            'metadata': metadata
+        })
+        chunks.extend(members)
+    
     
     def generic_chunk(self, content: str, file_path: str, chunk_size: int = 1000) -> List[Dict[str, Any]]:
         """Generic chunking for non-parseable files"""
@@ -208,6 +613,8 @@ class CodePreprocessor:
                 current_chunk = []
                 current_size = 0
         
-        return chunks
+        # A single line can be far over the size on its own (minified files, dumps)
+        lines_index = LineIndex(content)
+        return [part for chunk in chunks for part in split_oversized(chunk,lines_index,CHUNK_MAX_CHARS)]
             
         
\ No newline at end of file
@@ -0,0 +1,266 @@
+import glob
+import hashlib
+import math
+import os
+import re
+import sqlite3
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+from job.vectorstore import point_id
+from dotenv import load_dotenv
+load_dotenv(override=True)
+
+SYMBOL_INDEX_DIR = os.getenv("SYMBOL_INDEX_DIR","./symbol_index")
+# Indexed terms a prefix lookup may expand to
+PREFIX_EXPANSION_LIMIT = 64
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Term frequency weight of each field
+NAME_WEIGHT = 5
+PATH_WEIGHT = 3
+METADATA_WEIGHT = 2
+CONTENT_WEIGHT = 1
+# Added to the BM25 score when a chunk's name (or its file path) is exactly the query
+EXACT_NAME_BOOST = 25.0
+EXACT_PATH_BOOST = 15.0
+
+_IDENTIFIER = re.compile(r'[A-Za-z_$][A-Za-z0-9_$]*')
+_SUBWORD = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+')
+_IDENTIFIER_QUERY = re.compile(r'[\w$][\w$.:/\\-]*')
+
+def identifier_terms(identifier:str) -> List[str]:
+    """The identifier itself plus its camelCase/snake_case parts: getUserName -> getusername, get, user, name"""
+    terms = [identifier.lower()]
+    parts = [part.lower() for part in _SUBWORD.findall(identifier)]
+    if len(parts) > 1:
+        terms.extend(part for part in parts if len(part) > 1)
+    return terms
+
+def text_terms(text:str) -> List[str]:
+    terms = []
+    for identifier in _IDENTIFIER.findall(text):
+        terms.extend(identifier_terms(identifier))
+    return terms
+
+def path_terms(file_path:str) -> List[str]:
+    """Full path, file name and every path component's identifiers"""
+    path = file_path.strip('/').lower()
+    name = path.rsplit('/',1)[-1]
+    return [path,name] + text_terms(file_path)
+
+def query_terms(query:str) -> List[str]:
+    terms = []
+    for token in query.split():
+        if '/' in token or re.search(r'\.\w+$',token):
+            terms.extend(path_terms(token))
+        else:
+            terms.extend(text_terms(token))
+    return list(dict.fromkeys(terms))
+
+def is_identifier_query(query:str) -> bool:
+    """Single token made of identifier/path characters: a symbol or file name, not prose"""
+    return bool(_IDENTIFIER_QUERY.fullmatch(query.strip())) and any(c.isalpha() for c in query)
+
+def chunk_terms(chunk:Dict[str,Any]) -> Counter:
+    terms = Counter()
+    metadata = chunk.get('metadata',{})
+    for term in text_terms(chunk.get('name','')):
+        terms[term] += NAME_WEIGHT
+    for term in path_terms(chunk['file_path']):
+        terms[term] += PATH_WEIGHT
+    for key in ('class_name','args','base_classes','methods'):
+        value = metadata.get(key)
+        for item in ([value] if isinstance(value,str) else value or []):
+            for term in text_terms(str(item)):
+                terms[term] += METADATA_WEIGHT
+    for term in text_terms(chunk.get('content','')):
+        terms[term] += CONTENT_WEIGHT
+    return terms
+
+def _index_key(owner:str,repo_name:str,branch:str) -> str:
+    return hashlib.sha1(f"{owner}/{repo_name}@{branch}".encode('utf-8')).hexdigest()[:20]
+
+def symbol_index_path(owner:str,repo_name:str,branch:str,index_version:str) -> str:
+    return os.path.join(SYMBOL_INDEX_DIR,f"{_index_key(owner,repo_name,branch)}-{index_version}.sqlite3")
+
+def _connect(path:str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path,check_same_thread=False,isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+class SymbolIndexWriter:
+    """Builds or updates the inverted index of one index version of a repo branch.
+
+    All changes happen in one SQLite transaction, so searches keep seeing the previous
+    state until commit(). A fresh build writes a new file; discard() removes it again.
+    """
+    def __init__(self,owner:str,repo_name:str,branch:str,index_version:str,fresh:bool):
+        self.owner = owner
+        self.repo_name = repo_name
+        self.branch = branch
+        self.index_version = index_version
+        self.fresh = fresh
+        self.path = symbol_index_path(owner,repo_name,branch,index_version)
+        os.makedirs(SYMBOL_INDEX_DIR,exist_ok=True)
+        if fresh and os.path.exists(self.path):
+            os.remove(self.path)
+        self.conn = _connect(self.path)
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            "id INTEGER PRIMARY KEY, point_id TEXT NOT NULL, file_path TEXT NOT NULL, name TEXT, type TEXT,"
+            "line_start INTEGER, line_end INTEGER, length INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS docs_file_path ON docs(file_path);"
+            "CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, doc_id INTEGER NOT NULL, tf INTEGER NOT NULL,"
+            "PRIMARY KEY (term, doc_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS postings_doc ON postings(doc_id);"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL);"
+        )
+        self.conn.execute("BEGIN")
+
+    def add_chunks(self,chunks:Iterable[Dict[str,Any]]):
+        for chunk in chunks:
+            terms = chunk_terms(chunk)
+            cursor = self.conn.execute(
+                "INSERT INTO docs(point_id,file_path,name,type,line_start,line_end,length) VALUES (?,?,?,?,?,?,?)",
+                (
+                    point_id(self.owner,self.repo_name,self.branch,self.index_version,chunk),
+                    chunk['file_path'],chunk.get('name',''),chunk.get('type','generic'),
+                    chunk.get('line_start',0),chunk.get('line_end',0),sum(terms.values()),
+                )
+            )
+            doc_id = cursor.lastrowid
+            self.conn.executemany("INSERT INTO postings(term,doc_id,tf) VALUES (?,?,?)",[(term,doc_id,tf) for term,tf in terms.items()])
+
+    def remove_files(self,file_paths:List[str]):
+        for i in range(0,len(file_paths),500):
+            batch = file_paths[i:i + 500]
+            placeholders = ','.join('?' * len(batch))
+            self.conn.execute(f"DELETE FROM postings WHERE doc_id IN (SELECT id FROM docs WHERE file_path IN ({placeholders}))",batch)
+            self.conn.execute(f"DELETE FROM docs WHERE file_path IN ({placeholders})",batch)
+
+    def commit(self):
+        count,average = self.conn.execute("SELECT COUNT(*),COALESCE(AVG(length),0) FROM docs").fetchone()
+        self.conn.executemany("INSERT OR REPLACE INTO meta(key,value) VALUES (?,?)",[('doc_count',count),('average_length',average)])
+        self.conn.execute("COMMIT")
+        self.conn.close()
+
+    def discard(self):
+        try:
+            self.conn.execute("ROLLBACK")
+        finally:
+            self.conn.close()
+        if self.fresh:
+            _remove_index_file(self.path)
+
+def _remove_index_file(path:str):
+    for suffix in ('','-wal','-shm'):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+def drop_other_versions(owner:str,repo_name:str,branch:str,index_version:str):
+    """Remove every index file of this repo branch except `index_version`'s"""
+    keep = symbol_index_path(owner,repo_name,branch,index_version)
+    for path in glob.glob(os.path.join(SYMBOL_INDEX_DIR,f"{_index_key(owner,repo_name,branch)}-*.sqlite3")):
+        if path != keep:
+            _remove_index_file(path)
+
+def _bm25(conn:sqlite3.Connection,terms:List[str],prefix:Optional[str]) -> Dict[int,float]:
+    meta = dict(conn.execute("SELECT key,value FROM meta").fetchall())
+    doc_count = meta.get('doc_count',0)
+    average_length = meta.get('average_length',0) or 1
+    if not doc_count:
+        return {}
+    weighted_terms = {term:1.0 for term in terms}
+    if prefix and len(prefix) >= 3:
+        # Prefix lookups expand through the term index; expansions count a little less than exact terms
+        rows = conn.execute(
+            "SELECT DISTINCT term FROM postings WHERE term > ? AND term < ? LIMIT ?",
+            (prefix,prefix + '\uffff',PREFIX_EXPANSION_LIMIT)
+        ).fetchall()
+        for (term,) in rows:
+            weighted_terms.setdefault(term,0.5)
+    postings = {}
+    for term in weighted_terms:
+        postings[term] = conn.execute("SELECT doc_id,tf FROM postings WHERE term=?",(term,)).fetchall()
+    doc_ids = {doc_id for rows in postings.values() for doc_id,_ in rows}
+    if not doc_ids:
+        return {}
+    lengths = {}
+    doc_list = list(doc_ids)
+    for i in range(0,len(doc_list),500):
+        batch = doc_list[i:i + 500]
+        lengths.update(conn.execute(f"SELECT id,length FROM docs WHERE id IN ({','.join('?' * len(batch))})",batch).fetchall())
+    scores: Dict[int,float] = {}
+    for term,rows in postings.items():
+        if not rows:
+            continue
+        idf = math.log(1 + (doc_count - len(rows) + 0.5) / (len(rows) + 0.5))
+        for doc_id,tf in rows:
+            norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_id] / average_length)
+            scores[doc_id] = scores.get(doc_id,0.0) + weighted_terms[term] * idf * tf * (BM25_K1 + 1) / norm
+    return scores
+
+def search_symbols(
+    owner:str,
+    repo_name:str,
+    versions:Dict[str,str],
+    query:str,
+    limit:int=10,
+    path_prefix:Optional[str]=None,
+    chunk_type:Optional[str]=None,
+) -> List[Dict[str,Any]]:
+    """BM25 over names, paths, signatures and code tokens of each branch's live index version.
+
+    Exact name/path matches are boosted, and an identifier query also matches indexed terms
+    it is a prefix of. No embedding is involved.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+    needle = query.strip().lower()
+    prefix = needle if is_identifier_query(query) else None
+    normalized_prefix = path_prefix.strip('/') if path_prefix and path_prefix.strip('/') else None
+    hits = []
+    for branch,index_version in versions.items():
+        path = symbol_index_path(owner,repo_name,branch,index_version)
+        if not os.path.exists(path):
+            continue
+        # Connections are cheap to open and can't be shared between search threads
+        conn = sqlite3.connect(path)
+        try:
+            scores = _bm25(conn,terms,prefix)
+            if not scores:
+                continue
+            # Boosts and filters need the doc rows; look at a generous slice of the best scores
+            candidates = sorted(scores,key=scores.get,reverse=True)[:max(limit * 20,200)]
+            rows = conn.execute(
+                f"SELECT id,point_id,file_path,name,type,line_start,line_end FROM docs WHERE id IN ({','.join('?' * len(candidates))})",
+                candidates
+            ).fetchall()
+        finally:
+            conn.close()
+        for doc_id,point,file_path,name,chunk_type_value,line_start,line_end in rows:
+            if normalized_prefix and file_path != normalized_prefix and not file_path.startswith(normalized_prefix + '/'):
+                continue
+            if chunk_type and chunk_type_value != chunk_type:
+                continue
+            score = scores[doc_id]
+            if name and name.lower() == needle or (name or '').lower().endswith('.' + needle):
+                score += EXACT_NAME_BOOST
+            if file_path.lower() == needle or file_path.lower().endswith('/' + needle):
+                score += EXACT_PATH_BOOST
+            hits.append({
+                'id':point,
+                'score':score,
+                'file_path':file_path,
+                'branch':branch,
+                'type':chunk_type_value,
+                'name':name,
+                'line_start':line_start,
+                'line_end':line_end,
+            })
+    hits.sort(key=lambda hit:hit['score'],reverse=True)
+    return hits[:limit]
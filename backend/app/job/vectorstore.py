@@ -1,19 +1,216 @@
 import os
-import json
-from typing import List, Dict, Any, Optional
-from qdrant_client import QdrantClient
+import uuid
+import asyncio
+import numpy as np
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.http.models import (
+    Batch,
     VectorParams,
     Distance,
-    PointStruct,
     Filter,
     FieldCondition,
     MatchValue,
+    MatchAny,
+    FilterSelector,
+    PayloadSchemaType,
+    QueryRequest,
+    ScoredPoint,
+    HnswConfigDiff,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    SearchParams,
+    QuantizationSearchParams,
 )
 from dotenv import load_dotenv
 load_dotenv(override=True)
 
+if TYPE_CHECKING:
+    from job.embeddings import EmbeddingBatch
+
+# qdrant, or local for the embedded memory-mapped index in job.local_vectorstore
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant")
+VECTOR_DB_DIR = os.getenv("VECTOR_DB_DIR", "./vector_db")
 QDRANT_URL = os.getenv("QDRANT_URL")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+QDRANT_UPSERT_BATCH_SIZE = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "256"))
+QDRANT_UPSERT_PARALLELISM = int(os.getenv("QDRANT_UPSERT_PARALLELISM", "4"))
+# Collection layout, applied when the collection is created: none, int8 or binary
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none")
+# Keep the original float32 vectors on disk (only the quantized copy stays in RAM)
+QDRANT_VECTORS_ON_DISK = os.getenv("QDRANT_VECTORS_ON_DISK", "false").lower() == "true"
+# HNSW graph degree and build-time beam width; unset keeps Qdrant's defaults (16 / 100)
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", "0")) or None
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "0")) or None
+# Per-query search settings; unset ef uses Qdrant's default
+QDRANT_SEARCH_EF = int(os.getenv("QDRANT_SEARCH_EF", "0")) or None
+QDRANT_RESCORE = os.getenv("QDRANT_RESCORE", "true").lower() == "true"
+# Quantized candidates fetched per requested hit before rescoring with the original vectors
+QDRANT_OVERSAMPLING = float(os.getenv("QDRANT_OVERSAMPLING", "2.0"))
+QUANTIZATION_KINDS = ('none', 'int8', 'binary')
+# Fixed namespace so the same chunk always maps to the same point id
+POINT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "github-automation/code-chunks")
+# Keyword indexes every filter in this module relies on
+PAYLOAD_INDEXES = ('owner', 'repo_name', 'branch', 'index_version', 'file_path', 'path_prefixes', 'type')
+
+def path_prefixes(file_path: str) -> List[str]:
+    """Every ancestor directory of `file_path` plus the path itself, so a path-prefix filter is
+    one keyword match: "src/api/app.py" -> ["src", "src/api", "src/api/app.py"]"""
+    parts = file_path.strip('/').split('/')
+    return ['/'.join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+def quantization_config(kind: str):
+    """Qdrant quantization settings for `kind`; the quantized vectors always stay in RAM"""
+    if kind not in QUANTIZATION_KINDS:
+        raise ValueError(f"Unknown quantization {kind!r}, expected one of {', '.join(QUANTIZATION_KINDS)}")
+    if kind == 'int8':
+        # Clip the outermost 1% of values so outliers don't stretch the int8 range
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True))
+    if kind == 'binary':
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    return None
+
+def search_params(ef: Optional[int], quantized: bool, rescore: bool, oversampling: float) -> Optional[SearchParams]:
+    """Per-query HNSW beam width and, on a quantized collection, rescoring of the oversampled candidates"""
+    quantization = QuantizationSearchParams(rescore=rescore, oversampling=oversampling) if quantized else None
+    if ef is None and quantization is None:
+        return None
+    return SearchParams(hnsw_ef=ef, quantization=quantization)
+
+def point_id(owner: str, repo_name: str, branch: str, index_version: str, chunk: Dict[str, Any]) -> str:
+    """Deterministic UUIDv5 of the index version, owner/repo@branch:path, the chunk's span and its
+    position among the file's chunks (several chunks can share a line, e.g. in minified code).
+    Re-indexing into the same version overwrites in place; a new version never touches the live one."""
+    key = (
+        f"{index_version}/{owner}/{repo_name}@{branch}:{chunk['file_path']}"
+        f":{chunk.get('line_start', 0)}-{chunk.get('line_end', 0)}:{chunk.get('type', 'generic')}"
+        f"#{chunk.get('ordinal', 0)}"
+    )
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, key))
+
+class PointWriter:
+    """Streams points into a collection without waiting for each write to be applied.
+
+    Rows are buffered into requests of `batch_size` and up to `parallelism` upserts are in
+    flight at once, each sent with wait=False. The last request is held back until close(),
+    which sends it with wait=True: updates are applied in order, so once it has been applied
+    every earlier write has been too.
+    """
+    def __init__(self, client: AsyncQdrantClient, collection_name: str, batch_size: int, parallelism: int):
+        self.client = client
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.semaphore = asyncio.Semaphore(parallelism)
+        self.in_flight = set()
+        self.ids: List[str] = []
+        self.vectors: List[np.ndarray] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self.held: Optional[Batch] = None
+        self.points_written = 0
+
+    def _check(self):
+        for task in [task for task in self.in_flight if task.done()]:
+            self.in_flight.discard(task)
+            task.result()
+
+    async def _upsert(self, points: Batch, wait: bool):
+        try:
+            await self.client.upsert(collection_name=self.collection_name, points=points, wait=wait)
+            self.points_written += len(points.ids)
+        finally:
+            self.semaphore.release()
+
+    async def _send(self, points: Batch):
+        # Keep one request back for close(); send the one held before it
+        points, self.held = self.held, points
+        if points is None:
+            return
+        await self.semaphore.acquire()
+        self._check()
+        self.in_flight.add(asyncio.create_task(self._upsert(points, wait=False)))
+
+    def _take(self, count: int) -> Batch:
+        rows = np.concatenate(self.vectors) if len(self.vectors) > 1 else self.vectors[0]
+        # Vectors stay float32 until the wire; only one request's worth is boxed into lists at a time
+        points = Batch(ids=self.ids[:count], vectors=rows[:count].tolist(), payloads=self.payloads[:count])
+        self.ids, self.payloads = self.ids[count:], self.payloads[count:]
+        self.vectors = [rows[count:]] if count < len(rows) else []
+        return points
+
+    async def write(self, ids: List[str], vectors: np.ndarray, payloads: List[Dict[str, Any]]):
+        self.ids.extend(ids)
+        self.vectors.append(vectors)
+        self.payloads.extend(payloads)
+        while len(self.ids) >= self.batch_size:
+            await self._send(self._take(self.batch_size))
+
+    async def close(self):
+        try:
+            if self.ids:
+                await self._send(self._take(len(self.ids)))
+            if self.in_flight:
+                await asyncio.gather(*self.in_flight)
+                self.in_flight.clear()
+            if self.held is not None:
+                held, self.held = self.held, None
+                await self.semaphore.acquire()
+                await self._upsert(held, wait=True)
+        finally:
+            self.abort()
+
+    def abort(self):
+        """Drop buffered rows and cancel writes still in flight"""
+        self.ids, self.vectors, self.payloads = [], [], []
+        self.held = None
+        for task in self.in_flight:
+            task.cancel()
+        self.in_flight.clear()
+
+class ChunkWriter:
+    """PointWriter for embedded chunks of one version of a repository branch's index"""
+    def __init__(self, writer: PointWriter, repo_name: str, owner: str, branch: str, index_version: str):
+        self.writer = writer
+        self.repo_name = repo_name
+        self.owner = owner
+        self.branch = branch
+        self.index_version = index_version
+
+    async def write(self, batch: "EmbeddingBatch"):
+        if not len(batch):
+            return
+        ids = []
+        payloads = []
+        for chunk, enhanced_text in zip(batch.chunks, batch.texts):
+            chunk_id = point_id(self.owner, self.repo_name, self.branch, self.index_version, chunk)
+            ids.append(chunk_id)
+            payloads.append({
+                'id': chunk_id,
+                'owner': self.owner,
+                'repo_name': self.repo_name,
+                'branch': self.branch,
+                'index_version': self.index_version,
+                'file_path': chunk['file_path'],
+                'path_prefixes': path_prefixes(chunk['file_path']),
+                'type': chunk.get('type', 'generic'),
+                'name': chunk.get('name', ''),
+                'line_start': chunk.get('line_start', 0),
+                'line_end': chunk.get('line_end', 0),
+                'document': enhanced_text,
+            })
+        if len(set(ids)) != len(ids):
+            # Points with the same id overwrite each other without any error from Qdrant
+            duplicate = next(chunk for chunk, chunk_id in zip(batch.chunks, ids) if ids.count(chunk_id) > 1)
+            raise ValueError(f"Duplicate point id for a chunk of {duplicate['file_path']} at line {duplicate.get('line_start', 0)}")
+        await self.writer.write(ids, batch.vectors, payloads)
+
+    async def close(self):
+        await self.writer.close()
+
+    def abort(self):
+        self.writer.abort()
 
 class CodeVectorStore:
     def __init__(
@@ -22,72 +219,114 @@ class CodeVectorStore:
         persist_directory: str = "./vector_db",
         api_key: Optional[str] = None,
         dimension: int = 768,
+        upsert_batch_size: int = QDRANT_UPSERT_BATCH_SIZE,
+        upsert_parallelism: int = QDRANT_UPSERT_PARALLELISM,
+        location: Optional[str] = None,
+        quantization: str = QDRANT_QUANTIZATION,
+        vectors_on_disk: bool = QDRANT_VECTORS_ON_DISK,
+        hnsw_m: Optional[int] = QDRANT_HNSW_M,
+        hnsw_ef_construct: Optional[int] = QDRANT_HNSW_EF_CONSTRUCT,
+        search_ef: Optional[int] = QDRANT_SEARCH_EF,
+        rescore: bool = QDRANT_RESCORE,
+        oversampling: float = QDRANT_OVERSAMPLING,
     ):
         self.collection_name = collection_name
+        self.upsert_batch_size = upsert_batch_size
+        self.upsert_parallelism = upsert_parallelism
         self.persist_directory = persist_directory
         self.dimension = dimension
+        self.quantization = quantization_config(quantization)
+        self.vectors_on_disk = vectors_on_disk
+        self.hnsw_config = HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct) if hnsw_m or hnsw_ef_construct else None
+        self.rescore = rescore
+        self.oversampling = oversampling
+        self.search_params = search_params(search_ef, self.quantization is not None, rescore, oversampling)
+        self.ready = False
 
         os.makedirs(persist_directory, exist_ok=True)
 
-        self.qdrant_client = QdrantClient(url=QDRANT_URL or "http://localhost:6333")
+        # `location` is a URL or ":memory:" for an in-process instance
+        self.qdrant_client = AsyncQdrantClient(
+            location=location or QDRANT_URL or "http://localhost:6333",
+            api_key=api_key or QDRANT_API_KEY,
+        )
 
-        try:
-            self.qdrant_client.get_collection(collection_name=self.collection_name)
-        except Exception:
-            self.qdrant_client.recreate_collection(
-                collection_name=self.collection_name,
-                vectors_config=VectorParams(size=self.dimension, distance=Distance.COSINE),
-            )
+    async def ensure_collection(self):
+        """Create the collection and its payload indexes if missing; a no-op once it has succeeded.
 
-    def store_embeddings(self, chunks_with_embeddings: List[Dict[str, Any]], repo_name: str):
-        """Store embeddings in Qdrant collection"""
-        points: List[PointStruct] = []
+        Quantization, on-disk vectors and HNSW settings only apply to a newly created
+        collection; an existing one keeps the layout it was created with.
+        """
+        if self.ready:
+            return
+        if not await self.qdrant_client.collection_exists(collection_name=self.collection_name):
+            await self._create_collection()
+        await self._create_payload_indexes()
+        self.ready = True
 
-        for chunk in chunks_with_embeddings:
-            chunk_id = f"{repo_name}_{chunk['file_path']}_{chunk.get('line_start', 0)}"
+    async def _create_collection(self):
+        await self.qdrant_client.create_collection(
+            collection_name=self.collection_name,
+            vectors_config=VectorParams(size=self.dimension, distance=Distance.COSINE, on_disk=self.vectors_on_disk or None),
+            hnsw_config=self.hnsw_config,
+            quantization_config=self.quantization,
+        )
 
-            # Prepare metadata
-            payload = {
-                'id': chunk_id,
-                'repo_name': repo_name,
-                'file_path': chunk['file_path'],
-                'type': chunk.get('type', 'generic'),
-                'name': chunk.get('name', ''),
-                'line_start': chunk.get('line_start', 0),
-                'line_end': chunk.get('line_end', 0),
-                'document': chunk.get('enhanced_text', ''),
-            }
+    async def _create_payload_indexes(self):
+        # Creating an index that already exists is accepted, so older collections get them too
+        for field_name in PAYLOAD_INDEXES:
+            await self.qdrant_client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field_name,
+                field_schema=PayloadSchemaType.KEYWORD,
+            )
 
-            vector = [float(x) for x in chunk['embedding']]
+    def _search_params(self, ef: Optional[int]) -> Optional[SearchParams]:
+        """The store's search settings, with the HNSW beam width overridden for one query if `ef` is given"""
+        if ef is None:
+            return self.search_params
+        return search_params(ef, self.quantization is not None, self.rescore, self.oversampling)
 
-            # Use chunk_id as point id to enable easy deletes by repo
-            points.append(PointStruct(id=chunk_id, vector=vector, payload=payload))
+    async def health(self) -> Dict[str, Any]:
+        """Reachability of Qdrant and the collection, for the health endpoint"""
+        try:
+            await self.ensure_collection()
+            info = await self.qdrant_client.get_collection(collection_name=self.collection_name)
+        except Exception as e:
+            return {'ok': False, 'backend': 'qdrant', 'error': str(e)}
+        return {'ok': True, 'backend': 'qdrant', 'collection': self.collection_name, 'status': str(info.status), 'points': info.points_count}
 
-        if points:
-            # Upsert points
-            self.qdrant_client.upsert(collection_name=self.collection_name, points=points)
+    def open_writer(self, repo_name: str, owner: str, branch: str, index_version: str) -> ChunkWriter:
+        """Writer that streams embedded chunks in batched, parallel, non-blocking upserts; close() it to wait for them"""
+        writer = PointWriter(self.qdrant_client, self.collection_name, self.upsert_batch_size, self.upsert_parallelism)
+        return ChunkWriter(writer, repo_name, owner, branch, index_version)
 
-    def search_similar_code(self, query: str, n_results: int = 10, repo_name: str = None) -> Dict[str, Any]:
-        """Search for similar code chunks using Qdrant"""
-        # Lazy import embedding generator to avoid circular import at module load
-        from .embeddings import CodeEmbeddingGenerator
+    async def store_embeddings(self, batch: "EmbeddingBatch", repo_name: str, owner: str, branch: str, index_version: str):
+        """Store a batch of embedded chunks in the Qdrant collection"""
+        writer = self.open_writer(repo_name, owner, branch, index_version)
+        try:
+            await writer.write(batch)
+        finally:
+            await writer.close()
 
-        embedding_generator = CodeEmbeddingGenerator()
-        query_embedding = embedding_generator.model.encode([query])[0].tolist()
+    async def search_similar_code(self, query: str, embedding_generator, n_results: int = 10, repo_name: str = None, index_version: str = None, ef: Optional[int] = None) -> Dict[str, Any]:
+        """Search for similar code chunks using Qdrant"""
+        query_embedding = (await asyncio.to_thread(embedding_generator.embed_texts, [query]))[0].tolist()
 
         # Build filter if repo_name provided
         qdrant_filter = None
         if repo_name:
-            qdrant_filter = Filter(must=[FieldCondition(key="repo_name", match=MatchValue(value=repo_name))])
+            qdrant_filter = Filter(must=self._scope(repo_name, index_version=index_version))
 
-        search_result = self.qdrant_client.search(
+        search_result = (await self.qdrant_client.query_points(
             collection_name=self.collection_name,
-            query_vector=query_embedding,
+            query=query_embedding,
             limit=n_results,
             with_payload=True,
-            with_vector=False,
+            with_vectors=False,
             query_filter=qdrant_filter,
-        )
+            search_params=self._search_params(ef),
+        )).points
 
         results = {'ids': [[]], 'distances': [[]], 'documents': [[]], 'metadatas': [[]]}
 
@@ -100,52 +339,91 @@ class CodeVectorStore:
 
         return results
 
-    def delete_by_repo(self, repo_name: str):
-        """Delete all embeddings for a specific repository using a filter on payload.repo_name"""
-        # Qdrant doesn't support delete by filter in older clients; use scroll + delete
-        try:
-            # Collect IDs to delete
-            hits = self.qdrant_client.search(
-                collection_name=self.collection_name,
-                query_vector=[0.0] * self.dimension,
-                limit=1,
-                with_payload=True,
-                query_filter=Filter(must=[FieldCondition(key="repo_name", match=MatchValue(value=repo_name))]),
-            )
-        except Exception:
-            # Fallback: use search with no query vector to retrieve by filter
-            hits = []
-
-        # Retrieve all ids by scrolling via search with a small dummy vector and pagination
-        offset = 0
-        batch = 100
-        ids_to_delete = []
-        while True:
-            resp = self.qdrant_client.scroll(collection_name=self.collection_name, limit=batch, offset=offset, filter=Filter(must=[FieldCondition(key="repo_name", match=MatchValue(value=repo_name))]))
-            if not resp or not resp[0].payload:
-                break
-            for point in resp:
-                ids_to_delete.append(point.id)
-            if len(resp) < batch:
-                break
-            offset += batch
-
-        if ids_to_delete:
-            # Delete by ids
-            self.qdrant_client.delete(collection_name=self.collection_name, points=ids_to_delete)
-
-    def get_stats(self) -> Dict[str, Any]:
+    def search_filter(self, repo_name: str, owner: str, index_versions: List[str], path_prefix: Optional[str] = None, chunk_type: Optional[str] = None) -> Filter:
+        """Live chunks of one owner's repo (any of `index_versions`, one per branch), optionally narrowed
+        to a directory/file prefix and a chunk type"""
+        conditions = self._scope(repo_name, owner)
+        conditions.append(FieldCondition(key="index_version", match=MatchAny(any=index_versions)))
+        if path_prefix and path_prefix.strip('/'):
+            conditions.append(FieldCondition(key="path_prefixes", match=MatchValue(value=path_prefix.strip('/'))))
+        if chunk_type:
+            conditions.append(FieldCondition(key="type", match=MatchValue(value=chunk_type)))
+        return Filter(must=conditions)
+
+    async def query_batch(self, vectors: np.ndarray, qdrant_filter: Filter, limit: int, ef: Optional[int] = None) -> List[List[ScoredPoint]]:
+        """Nearest neighbours of each row of `vectors`, all in one request; `ef` trades speed for recall per query"""
+        params = self._search_params(ef)
+        requests = [
+            QueryRequest(query=vector, filter=qdrant_filter, params=params, limit=limit, with_payload=True, with_vector=False)
+            for vector in vectors.tolist()
+        ]
+        responses = await self.qdrant_client.query_batch_points(collection_name=self.collection_name, requests=requests)
+        return [response.points for response in responses]
+
+    async def retrieve_payloads(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Payloads of the given point ids, keyed by id; missing points are left out"""
+        if not ids:
+            return {}
+        records = await self.qdrant_client.retrieve(collection_name=self.collection_name, ids=ids, with_payload=True, with_vectors=False)
+        return {str(record.id): record.payload or {} for record in records}
+
+    def _scope(self, repo_name: str, owner: Optional[str] = None, branch: Optional[str] = None, index_version: Optional[str] = None) -> List[FieldCondition]:
+        conditions = [FieldCondition(key="repo_name", match=MatchValue(value=repo_name))]
+        for key, value in (("owner", owner), ("branch", branch), ("index_version", index_version)):
+            if value:
+                conditions.append(FieldCondition(key=key, match=MatchValue(value=value)))
+        return conditions
+
+    async def _delete(self, points_filter: Filter):
+        await self.qdrant_client.delete(collection_name=self.collection_name, points_selector=FilterSelector(filter=points_filter))
+
+    async def delete_by_repo(self, repo_name: str, owner: Optional[str] = None, branch: Optional[str] = None):
+        """Delete all embeddings for a repository (optionally one owner's, one branch) in a single filtered delete"""
+        await self._delete(Filter(must=self._scope(repo_name, owner, branch)))
+
+    async def delete_index_version(self, repo_name: str, owner: str, branch: str, index_version: str):
+        """Drop every point of one index version, e.g. a rebuild that didn't finish"""
+        await self._delete(Filter(must=self._scope(repo_name, owner, branch, index_version)))
+
+    async def delete_other_versions(self, repo_name: str, owner: str, branch: str, index_version: str):
+        """Drop every point of this repo and branch that isn't part of `index_version`"""
+        await self._delete(Filter(
+            must=self._scope(repo_name, owner, branch),
+            must_not=[FieldCondition(key="index_version", match=MatchValue(value=index_version))],
+        ))
+
+    async def delete_by_files(self, repo_name: str, file_paths: List[str], owner: Optional[str] = None, branch: Optional[str] = None, index_version: Optional[str] = None, batch_size: int = 500):
+        """Delete every chunk of the given files in a repository with server-side filtered deletes"""
+        scope = self._scope(repo_name, owner, branch, index_version)
+        for i in range(0, len(file_paths), batch_size):
+            await self._delete(Filter(must=scope + [
+                FieldCondition(key="file_path", match=MatchAny(any=file_paths[i:i + batch_size])),
+            ]))
+
+    async def get_stats(self) -> Dict[str, Any]:
         """Get statistics about the Qdrant collection"""
-        info = self.qdrant_client.count(collection_name=self.collection_name)
+        info = await self.qdrant_client.count(collection_name=self.collection_name)
         return {
             'total_embeddings': info.count if hasattr(info, 'count') else info,
             'dimension': self.dimension,
             'index_type': 'Qdrant',
         }
 
-    def clear_all(self):
-        """Clear all data from the vector store (recreate collection)"""
-        self.qdrant_client.recreate_collection(
-            collection_name=self.collection_name,
-            vectors_config=VectorParams(size=self.dimension, distance=Distance.COSINE),
-        )
\ No newline at end of file
+    async def clear_all(self):
+        """Clear all data from the vector store: recreate the collection with its configured layout and payload indexes"""
+        await self.qdrant_client.delete_collection(collection_name=self.collection_name)
+        await self._create_collection()
+        await self._create_payload_indexes()
+        self.ready = True
+
+    async def close(self):
+        await self.qdrant_client.close()
+
+def create_vector_store(backend: str = VECTOR_BACKEND):
+    """The app's vector store: a Qdrant collection or the embedded local index, chosen by VECTOR_BACKEND"""
+    if backend == 'local':
+        from job.local_vectorstore import LocalVectorStore
+        return LocalVectorStore(persist_directory=VECTOR_DB_DIR)
+    if backend != 'qdrant':
+        raise ValueError(f"Unknown VECTOR_BACKEND {backend!r}, expected qdrant or local")
+    return CodeVectorStore(persist_directory=VECTOR_DB_DIR)
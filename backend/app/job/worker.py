@@ -0,0 +1,145 @@
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from job.db import create_index_job,update_index_job,get_index_job,fail_interrupted_index_jobs
+from job.indexer import index_repository
+from dotenv import load_dotenv
+load_dotenv(override=True)
+
+INDEX_WORKERS = int(os.getenv("INDEX_WORKERS","2"))
+PROGRESS_WRITE_INTERVAL = float(os.getenv("INDEX_PROGRESS_WRITE_INTERVAL","1.0"))
+TERMINAL_STATUSES = {"completed","failed","cancelled"}
+
+def progress_from_stages(stages:Dict[str,Any]) -> Dict[str,int]:
+    return {
+        "files_fetched":stages['fetch']['items_out'],
+        "files_parsed":stages['parse']['items_in'],
+        "chunks_created":stages['parse']['items_out'],
+        "chunks_embedded":stages['embed']['items_out'],
+        "chunks_stored":stages['store']['items_out'],
+    }
+
+class IndexJobManager:
+    """In-process queue of indexing jobs drained by a fixed number of worker tasks.
+
+    Job records live in MongoDB; `live` mirrors the latest state of jobs this process
+    is handling so progress feeds don't have to poll the database.
+    """
+    def __init__(self,workers:int=INDEX_WORKERS):
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.worker_tasks: List[asyncio.Task] = []
+        self.running: Dict[str,asyncio.Task] = {}
+        self.cancelled = set()
+        self.live: Dict[str,Dict[str,Any]] = {}
+        self.vector_store = None
+        self.embedding_generator = None
+
+    async def start(self,vector_store,embedding_generator):
+        """Start the workers; every job shares the app's vector store and embedding model"""
+        self.vector_store = vector_store
+        self.embedding_generator = embedding_generator
+        await fail_interrupted_index_jobs()
+        self.worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self.worker_tasks,return_exceptions=True)
+        self.worker_tasks = []
+
+    async def submit(self,username:str,repo_name:str,access_token:str,branch:str,ingest_mode:str,incremental:bool) -> str:
+        job_id = uuid.uuid4().hex
+        record = {
+            "job_id":job_id,
+            "username":username,
+            "repo_name":repo_name,
+            "branch":branch,
+            "ingest_mode":ingest_mode,
+            "incremental":incremental,
+            "status":"queued",
+            "progress":{},
+            "result":None,
+            "error":None,
+        }
+        await create_index_job(dict(record))
+        self.live[job_id] = record
+        # The access token stays in memory only; it is never written to the job record
+        await self.queue.put((job_id,access_token))
+        return job_id
+
+    async def get(self,job_id:str) -> Optional[Dict[str,Any]]:
+        if job_id in self.live:
+            return dict(self.live[job_id])
+        return await get_index_job(job_id)
+
+    async def cancel(self,job_id:str) -> bool:
+        record = await self.get(job_id)
+        if not record or record["status"] in TERMINAL_STATUSES:
+            return False
+        self.cancelled.add(job_id)
+        if job_id in self.running:
+            self.running[job_id].cancel()
+        else:
+            await self._set(job_id,{"status":"cancelled"})
+        return True
+
+    async def _set(self,job_id:str,fields:Dict[str,Any]):
+        if job_id in self.live:
+            self.live[job_id].update(fields)
+        await update_index_job(job_id,fields)
+
+    async def _worker(self):
+        while True:
+            job_id,access_token = await self.queue.get()
+            try:
+                if job_id in self.cancelled:
+                    continue
+                await self._run(job_id,access_token)
+            finally:
+                self.cancelled.discard(job_id)
+                self.live.pop(job_id,None)
+                self.queue.task_done()
+
+    async def _run(self,job_id:str,access_token:str):
+        record = self.live[job_id]
+        last_write = 0.0
+        write_task = None
+
+        def on_progress(stages:Dict[str,Any]):
+            nonlocal last_write,write_task
+            record["progress"] = progress_from_stages(stages)
+            now = time.monotonic()
+            if now - last_write >= PROGRESS_WRITE_INTERVAL and (write_task is None or write_task.done()):
+                last_write = now
+                write_task = asyncio.create_task(update_index_job(job_id,{"progress":record["progress"]}))
+
+        await self._set(job_id,{"status":"running"})
+        task = asyncio.create_task(index_repository(
+            record["username"],record["repo_name"],access_token,self.vector_store,self.embedding_generator,record["branch"],
+            ingest_mode=record["ingest_mode"],incremental=record["incremental"],on_progress=on_progress
+        ))
+        self.running[job_id] = task
+        if job_id in self.cancelled:
+            # cancel() ran while the status was being written and found nothing to cancel
+            task.cancel()
+        try:
+            result = await task
+            await self._set(job_id,{"status":"completed","progress":progress_from_stages(result["stages"]),"result":result})
+        except asyncio.CancelledError:
+            if job_id not in self.cancelled:
+                # The worker itself is shutting down
+                task.cancel()
+                raise
+            await self._set(job_id,{"status":"cancelled","progress":record["progress"]})
+        except Exception as e:
+            print(f"Error indexing repository: {e}")
+            await self._set(job_id,{"status":"failed","progress":record["progress"],"error":str(e)})
+        finally:
+            self.running.pop(job_id,None)
+            if write_task is not None:
+                write_task.cancel()
+
+index_job_manager = IndexJobManager()
@@ -1,20 +1,54 @@
-from fastapi import FastAPI
+from fastapi import FastAPI,Depends
+from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from auth.routes import router as auth_router
 from user.routes import router as user_router
 from githubapp.routes import router as githubapp_router
 from job.routes import router as job_router
+from metrics.routes import router as metrics_router
+from job.worker import index_job_manager
+from job.services import shutdown_parse_executor
+from job.vectorstore import CodeVectorStore,create_vector_store
+from job.embeddings import CodeEmbeddingGenerator
+from job.search import CodeSearch
+from job.dependencies import get_vector_store,get_embedding_generator
+from job.db import client as mongo_client
+from githubapi.client import get_github_client,close_github_client
+import asyncio
 import uvicorn
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app:FastAPI):
+    # One pooled GitHub connection set for every route, service and index job
+    get_github_client()
+    # One vector store (Qdrant client or local index) and one embedding model for the whole process
+    app.state.vector_store = create_vector_store()
+    try:
+        await app.state.vector_store.ensure_collection()
+    except Exception as e:
+        # Keep serving; /health reports it and indexing retries the setup
+        print(f"Vector store setup failed: {e}")
+    # Loading a local model can take a while; keep the event loop free
+    app.state.embedding_generator = await asyncio.to_thread(CodeEmbeddingGenerator)
+    app.state.code_search = CodeSearch(app.state.vector_store,app.state.embedding_generator)
+    await index_job_manager.start(app.state.vector_store,app.state.embedding_generator)
+    yield
+    await index_job_manager.stop()
+    await app.state.vector_store.close()
+    await close_github_client()
+    shutdown_parse_executor()
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(auth_router)
 app.include_router(user_router)
 app.include_router(githubapp_router)
 app.include_router(job_router)
+app.include_router(metrics_router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,6 +62,21 @@ app.add_middleware(
 async def index():
     return {"message":"Welcome to Forklift"}
 
+@app.get("/health")
+async def health(
+    vector_store:CodeVectorStore = Depends(get_vector_store),
+    embedding_generator:CodeEmbeddingGenerator = Depends(get_embedding_generator),
+):
+    checks = {"vector_store":await vector_store.health()}
+    try:
+        await asyncio.wait_for(mongo_client.admin.command("ping"),timeout=2)
+        checks["mongodb"] = {"ok":True}
+    except Exception as e:
+        checks["mongodb"] = {"ok":False,"error":str(e)}
+    checks["embeddings"] = {"ok":True,"backend":embedding_generator.backend,"model":embedding_generator.model_name}
+    healthy = all(check["ok"] for check in checks.values())
+    return JSONResponse(status_code=200 if healthy else 503,content={"status":"ok" if healthy else "degraded","checks":checks})
+
 
 
 if __name__ == "__main__":
@@ -0,0 +1,16 @@
+from typing import Any, Callable, Dict
+
+_sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+def register_source(name: str, source: Callable[[], Dict[str, Any]]):
+    """Expose `source()` under `name` in the instrumentation snapshot"""
+    _sources[name] = source
+
+def snapshot() -> Dict[str, Any]:
+    result = {}
+    for name, source in _sources.items():
+        try:
+            result[name] = source()
+        except Exception as e:
+            result[name] = {"error": str(e)}
+    return result
@@ -0,0 +1,9 @@
+from fastapi.routing import APIRouter
+from fastapi.responses import JSONResponse
+from metrics.registry import snapshot
+
+router = APIRouter(prefix="/metrics",tags=["metrics"])
+
+@router.get("")
+async def get_metrics():
+    return JSONResponse(content=snapshot())
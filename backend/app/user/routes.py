@@ -3,7 +3,11 @@ from user.db import get_user_access_token
 from auth.security import verify_token
 from auth.schemas import UserTokenInfo
 from githubapp.db import get_installation_id
-from githubapp.services import generate_jwt_for_githubapp_access,get_githubapp_installation_token,get_repos_with_app_access
+from githubapp.services import installation_repositories
+from githubapi.cache import cached_get
+from githubapi.pagination import paginate,stream_json_array
+from fastapi.responses import StreamingResponse
+import asyncio
 import httpx
 router = APIRouter(prefix="/user", tags=["user"])
 
@@ -15,40 +19,34 @@ async def get_user_repos(request:Request):
         print("///////////////////////")
         print(access_token)
         print("///////////////////////")
-        async with httpx.AsyncClient() as client:
-            repo_response = await client.get(
-                "https://api.github.com/user/repos?per_page=100",
-                headers={
-                    "Authorization": f"Bearer {access_token}"
-                }
-            )
-            
-        if repo_response.status_code != 200:
+        installation_id = await get_installation_id(user_token_info.username)
+
+        async def installed_names():
+            if not installation_id:
+                return set()
+            repositories = await installation_repositories(installation_id,user_token_info.username)
+            return set((repositories or {}).values())
+
+        # The first page of the user's repos and the installation's (complete) list load together
+        try:
+            all_repos,cleaned_repo_names = await asyncio.gather(paginate("/user/repos",access_token),installed_names())
+        except httpx.HTTPStatusError as e:
             raise HTTPException(
-                status_code=repo_response.status_code,
+                status_code=e.response.status_code,
                 detail="Failed to fetch repositories from GitHub"
             )
-        installation_id = await get_installation_id(user_token_info.username)
-        all_repos = repo_response.json()
-        if installation_id:
-            jwt_token = await generate_jwt_for_githubapp_access()
-            github_app_installation_token = await get_githubapp_installation_token(installation_id,jwt_token,user_token_info.username)
-            if github_app_installation_token:
-                cleaned_repos = await get_repos_with_app_access(github_app_installation_token)
-                print(cleaned_repos)
-                cleaned_repo_names = {repo["name"] for repo in cleaned_repos}
 
-                for repo in all_repos:
-                    repo["app_access"] = repo["name"] in cleaned_repo_names
-            else:
-                for repo in all_repos:
-                    repo["app_access"] = False 
-        else:
-            for repo in all_repos:
-                repo["app_access"] = False 
-        
-        return all_repos
-            
+        async def annotated():
+            async for repo in all_repos:
+                repo["app_access"] = repo["name"] in cleaned_repo_names
+                yield repo
+
+        # Remaining pages are fetched concurrently and streamed out as they arrive; if one fails
+        # the connection is aborted rather than the array closed early (see stream_json_array)
+        return StreamingResponse(stream_json_array(annotated()),media_type="application/json")
+
+    except HTTPException:
+        raise
     except httpx.RequestError as e:
         raise HTTPException(status_code=500, detail=f"Error connecting to GitHub API: {str(e)}")
     except Exception as e:
@@ -60,13 +58,7 @@ async def get_issues(repo:str,user_token_info:UserTokenInfo = Depends(verify_tok
         username = user_token_info.username
         access_token = await get_user_access_token(user_token_info)
         
-        async with httpx.AsyncClient() as client:
-            issue_response = await client.get(
-                f"https://api.github.com/repos/{username}/{repo}/issues",
-                headers={
-                    "Authorization": f"Bearer {access_token}"
-                }
-            )
+        issue_response = await cached_get(f"/repos/{username}/{repo}/issues",access_token)
         print("[[[[[[[[[[[[[[[[]]]]]]]]]]]]]]]]")
         print(access_token)
         print("[[[[[[[[[[[[[[[[]]]]]]]]]]]]]]]]")
@@ -91,8 +83,7 @@ async def get_issues(repo:str,user_token_info:UserTokenInfo = Depends(verify_tok
     
 @router.get("/check-repo/{username}/{repo}")
 async def check_if_user_exist(username:str,repo:str):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"https://api.github.com/repos/{username}/{repo}")
+    response = await cached_get(f"/repos/{username}/{repo}")
     
     if response.status_code == 200:
         return {"exists":True,"message":"Repository exists!"}
@@ -106,12 +97,7 @@ async def get_branch(repo:str,user_token_info:UserTokenInfo = Depends(verify_tok
     try:
         username = user_token_info.username
         access_token = await get_user_access_token(user_token_info)
-        async with httpx.AsyncClient() as client:
-            branch_response = await client.get(f"https://api.github.com/repos/{username}/{repo}/branches",
-                headers={
-                    "Authorization": f"Bearer {access_token}"
-                }
-            )
+        branch_response = await cached_get(f"/repos/{username}/{repo}/branches",access_token)
         if branch_response.status_code != 200:
                 raise HTTPException(
                     status_code=branch_response.status_code,
@@ -126,17 +112,12 @@ async def get_files(branch:str,repo:str,user_token_info:UserTokenInfo = Depends(
     try:
         username = user_token_info.username
         access_token = await get_user_access_token(user_token_info)
-        async with httpx.AsyncClient() as client:
-            files_response = await client.get(f"https://api.github.com/repos/{username}/{repo}/git/trees/{branch}?recursive=1",
-                    headers={
-                        "Authorization": f"Bearer {access_token}"
-                    }
-                )
-            if files_response.status_code != 200:
-                raise HTTPException(
-                    status_code=files_response.status_code,
-                    detail=f"Failed to fetch issues for {repo} from GitHub"
-                )
-            return files_response.json()
+        files_response = await cached_get(f"/repos/{username}/{repo}/git/trees/{branch}?recursive=1",access_token)
+        if files_response.status_code != 200:
+            raise HTTPException(
+                status_code=files_response.status_code,
+                detail=f"Failed to fetch issues for {repo} from GitHub"
+            )
+        return files_response.json()
     except Exception as e:
         raise HTTPException(status_code=500,detail=f"{e}")
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""Compare embedding throughput of the hosted endpoint and the local CPU backend.
+
+Usage: python benchmarks/bench_embeddings.py [--limit N] [--runtimes torch,int8,onnx] [path ...]
+
+Chunks every indexable file under the given paths (default: the backend app itself),
+builds the same enhanced texts the indexer embeds and times each backend on them,
+bypassing the embedding cache. The remote backend is skipped when HF_TOKEN is unset;
+local runtimes whose dependencies are missing are reported and skipped.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from job.services import CodePreprocessor, is_indexable_file
+from job.embeddings import CodeEmbeddingGenerator, HF_TOKEN, CHARS_PER_TOKEN
+
+
+def load_texts(paths, limit):
+    processor = CodePreprocessor()
+    # create_enhanced_text needs no model; skip __init__ so no backend is loaded here
+    generator = CodeEmbeddingGenerator.__new__(CodeEmbeddingGenerator)
+    texts = []
+    for root in paths:
+        for path in sorted(Path(root).rglob("*")):
+            if not path.is_file() or not is_indexable_file(str(path), path.stat().st_size):
+                continue
+            try:
+                content = path.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError):
+                continue
+            file_data = {'path': str(path), 'content': content, 'extension': path.suffix.lower()}
+            for chunk in processor.preprocess_file(file_data):
+                texts.append(generator.create_enhanced_text(chunk))
+                if len(texts) >= limit:
+                    return texts
+    return texts
+
+
+def run(label, make_generator, texts, reference):
+    try:
+        started = time.perf_counter()
+        generator = make_generator()
+        load_seconds = time.perf_counter() - started
+    except Exception as e:
+        print(f"{label:<14} skipped: {e}")
+        return None
+    started = time.perf_counter()
+    vectors = np.stack(generator.embed_texts(texts))
+    seconds = time.perf_counter() - started
+    tokens = sum(len(text) for text in texts) // CHARS_PER_TOKEN
+    line = (f"{label:<14} load {load_seconds:6.1f}s  embed {seconds:7.2f}s  "
+            f"{len(texts) / seconds:8.1f} texts/s  {tokens / seconds:9.0f} tokens/s")
+    if reference is not None and reference.shape == vectors.shape:
+        a = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+        b = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        line += f"  min cosine vs first {float(np.min(np.sum(a * b, axis=1))):.4f}"
+    print(line)
+    return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="*", default=[os.path.join(os.path.dirname(__file__), "..", "app")])
+    parser.add_argument("--limit", type=int, default=512)
+    parser.add_argument("--runtimes", default="torch,int8,onnx")
+    parser.add_argument("--model", default="microsoft/codebert-base")
+    args = parser.parse_args()
+
+    texts = load_texts(args.paths, args.limit)
+    if not texts:
+        print("no indexable files found")
+        return
+    print(f"{len(texts)} texts, {sum(len(t) for t in texts) / len(texts):.0f} chars on average\n")
+
+    reference = None
+    if HF_TOKEN:
+        reference = run("remote", lambda: CodeEmbeddingGenerator(args.model, backend="remote"), texts, None)
+    else:
+        print(f"{'remote':<14} skipped: HF_TOKEN is not set")
+    for runtime in args.runtimes.split(","):
+        def make_generator(runtime=runtime):
+            return CodeEmbeddingGenerator(args.model, backend="local", local_runtime=runtime)
+        vectors = run(f"local/{runtime}", make_generator, texts, reference)
+        if reference is None:
+            reference = vectors
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Throughput of the tokenizing JS/TS chunker against the previous regex + brace-count one.
+
+Usage: python benchmarks/bench_javascript_chunks.py [path ...]
+
+Without paths a synthetic corpus is generated in readable and minified form; with paths
+every .js/.ts/.jsx/.tsx file under them is used as-is. "current" is the production path,
+CodePreprocessor.preprocess_file: minified input falls back to budget-sized generic chunks,
+while the legacy chunker finds at most one match per line there.
+"""
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from job.services import CodePreprocessor
+
+PROCESSOR = CodePreprocessor()
+
+
+def legacy_parse_javascript(content, file_path):
+    """The chunker this repo used before: a regex per line plus a forward brace count per match"""
+    chunks = []
+    function_pattern = r'(?:function\s+(\w+)|(\w+)\s*[:=]\s*(?:async\s+)?function|(?:async\s+)?(\w+)\s*\([^)]*\)\s*(?:=>\s*)?{)'
+    lines = content.split('\n')
+    for i, line in enumerate(lines):
+        func_match = re.search(function_pattern, line)
+        if func_match:
+            brace_count = line.count('{') - line.count('}')
+            end_line = i
+            for j in range(i + 1, len(lines)):
+                brace_count += lines[j].count('{') - lines[j].count('}')
+                if brace_count <= 0:
+                    end_line = j
+                    break
+            chunks.append({'content': '\n'.join(lines[i:end_line + 1]), 'file_path': file_path})
+    return chunks
+
+
+def synthetic_source(modules=150, functions=20):
+    # `const open = "{"` is enough to throw a line-based brace count off for the rest of the file
+    out = []
+    for m in range(modules):
+        out.append(f"/** Module {m}. */")
+        out.append(f"export class Widget{m} extends Base {{")
+        for f in range(functions):
+            out.append(f"  async method{f}(a, b) {{")
+            out.append("    const label = `widget ${a} {${b}}`;")
+            out.append("    const open = \"{\";")
+            out.append("    if (a > b) { return a / 2; }")
+            out.append("    for (let i = 0; i < b; i++) { a += i; }")
+            out.append("    return label.replace(/[{}]/g, '');")
+            out.append("  }")
+        out.append("}")
+        for f in range(functions):
+            out.append(f"export const helper{m}_{f} = (x) => {{")
+            out.append("  // braces in comments } { should not matter")
+            out.append(f"  return {{ value: x * {f} }};")
+            out.append("};")
+    return "\n".join(out)
+
+
+def minify(source):
+    source = re.sub(r"//[^\n]*", "", source)
+    source = re.sub(r"/\*.*?\*/", "", source, flags=re.DOTALL)
+    return re.sub(r"\s*\n\s*", "", source)
+
+
+def load_corpus(paths):
+    if not paths:
+        readable = synthetic_source()
+        return {"readable": [("synthetic.js", readable)], "minified": [("synthetic.min.js", minify(readable))]}
+    files = []
+    for root in paths:
+        for path in Path(root).rglob("*"):
+            if path.suffix in (".js", ".ts", ".jsx", ".tsx") and path.is_file():
+                try:
+                    files.append((str(path), path.read_text(encoding="utf-8")))
+                except (OSError, UnicodeDecodeError):
+                    continue
+    return {"files": files}
+
+
+def preprocess(content, file_path):
+    return PROCESSOR.preprocess_file({"path": file_path, "extension": Path(file_path).suffix, "content": content})
+
+
+def measure(name, parse, sources):
+    size = sum(len(text) for _, text in sources)
+    started = time.perf_counter()
+    chunks = sum(len(parse(text, path)) for path, text in sources)
+    elapsed = time.perf_counter() - started
+    print(f"  {name:>8}: {chunks:7d} chunks {elapsed * 1000:10.1f} ms {size / elapsed / 1e6:8.2f} MB/s")
+    return elapsed
+
+
+def main():
+    for corpus, sources in load_corpus(sys.argv[1:]).items():
+        size = sum(len(text) for _, text in sources)
+        print(f"{corpus}: {len(sources)} files, {size / 1e6:.2f} MB")
+        legacy = measure("legacy", legacy_parse_javascript, sources)
+        current = measure("current", preprocess, sources)
+        print(f"  speedup: {legacy / current:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare the single-pass Python chunker against the previous ast.walk based one.
+
+Usage: python benchmarks/bench_python_chunks.py [path ...]
+
+Without paths a synthetic class-heavy module is used; with paths every .py file under
+them is chunked. Reports wall time and the number of characters that would be embedded.
+"""
+import ast
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from job.services import CodePreprocessor
+
+
+def legacy_parse_python(content, file_path):
+    """The chunker this repo used before: every def/class at any depth, each re-splitting the file"""
+    chunks = []
+    tree = ast.parse(content)
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            chunk_lines = content.split('\n')[node.lineno - 1:node.end_lineno]
+            chunks.append({'content': '\n'.join(chunk_lines), 'file_path': file_path})
+    return chunks
+
+
+def synthetic_module(classes=200, methods=12, body_lines=8):
+    out = ['"""Synthetic class-heavy module."""', 'import os', '']
+    for c in range(classes):
+        out.append(f"class Service{c}(Base):")
+        out.append(f'    """Service number {c}."""')
+        out.append("    retries = 3")
+        for m in range(methods):
+            out.append(f"    def method_{m}(self, value, *args, **kwargs):")
+            out.append(f'        """Handle step {m}."""')
+            out.append("        def helper(x):")
+            out.append("            return x * 2")
+            for b in range(body_lines):
+                out.append(f"        value = helper(value) + {b}")
+            out.append("        return value")
+        out.append("")
+    return "\n".join(out)
+
+
+def load_sources(paths):
+    if not paths:
+        return [("synthetic.py", synthetic_module())]
+    sources = []
+    for root in paths:
+        for path in Path(root).rglob("*.py"):
+            try:
+                text = path.read_text(encoding="utf-8")
+                ast.parse(text)
+            except (OSError, UnicodeDecodeError, SyntaxError, ValueError):
+                continue
+            sources.append((str(path), text))
+    return sources
+
+
+def measure(name, parse, sources):
+    started = time.perf_counter()
+    chunks = [chunk for path, text in sources for chunk in parse(text, path)]
+    elapsed = time.perf_counter() - started
+    volume = sum(len(chunk['content']) for chunk in chunks)
+    print(f"{name:>8}: {len(chunks):7d} chunks {volume:12d} chars embedded {elapsed * 1000:9.1f} ms")
+    return volume, elapsed
+
+
+def main():
+    sources = load_sources(sys.argv[1:])
+    if not sources:
+        sys.exit("no parseable .py files found")
+    source_chars = sum(len(text) for _, text in sources)
+    print(f"{len(sources)} files, {source_chars} source chars")
+    legacy_volume, legacy_time = measure("legacy", legacy_parse_python, sources)
+    current_volume, current_time = measure("current", CodePreprocessor().parse_python, sources)
+    print(f"embedded volume: {current_volume / legacy_volume:.2%} of legacy "
+          f"({current_volume / source_chars:.2f}x source vs {legacy_volume / source_chars:.2f}x)")
+    print(f"speedup: {legacy_time / current_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Recall, latency and memory of CodeVectorStore collection layouts on a synthetic corpus.
+
+Usage: python benchmarks/bench_vector_quantization.py --url http://localhost:6333 [--points N] [--queries Q] [--ef 32,64,128,256]
+
+Builds one collection per layout (float32, int8 and binary quantization with rescoring,
+on-disk originals, a denser HNSW graph), waits for Qdrant to finish indexing it, then runs
+each query on its own at every `ef` and compares the hits with exact cosine top-k computed
+in numpy. The corpus is clustered, normalised Gaussian vectors and the queries are noisy
+copies of corpus points, which is closer to embedded code than uniform noise.
+
+Memory is Qdrant's sizing rule of thumb for what stays resident: original vectors unless
+they are on disk, the quantized copy, and roughly 2*m links per point for the HNSW graph.
+Needs a real server: the client's in-memory mode searches exactly and ignores all of these
+settings, so it only checks that the script runs.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from qdrant_client.http.models import CollectionStatus
+
+from job.vectorstore import CodeVectorStore, PointWriter, search_params
+
+LAYOUTS = [
+    # label, quantization, vectors on disk, hnsw m, hnsw ef_construct
+    ("float32", "none", False, None, None),
+    ("int8", "int8", False, None, None),
+    ("int8 on-disk", "int8", True, None, None),
+    ("binary", "binary", False, None, None),
+    ("binary on-disk", "binary", True, None, None),
+    ("float32 m=32", "none", False, 32, 200),
+]
+
+
+def make_corpus(points, queries, dimension, clusters, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension), dtype=np.float32)
+    vectors = centers[rng.integers(0, clusters, points)] + 0.6 * rng.standard_normal((points, dimension), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    # Noise of norm ~0.5 around random corpus points
+    probes = vectors[rng.integers(0, points, queries)] + 0.5 / np.sqrt(dimension) * rng.standard_normal((queries, dimension), dtype=np.float32)
+    probes /= np.linalg.norm(probes, axis=1, keepdims=True)
+    return vectors, probes
+
+
+def exact_top_k(vectors, probes, k):
+    scores = probes @ vectors.T
+    top = np.argpartition(-scores, k, axis=1)[:, :k]
+    return [set(row.tolist()) for row in top]
+
+
+def resident_mib(points, dimension, quantization, on_disk, m):
+    size = 0 if on_disk else points * dimension * 4
+    size += {"none": 0, "int8": points * dimension, "binary": points * dimension // 8}[quantization]
+    size += points * (m or 16) * 2 * 4
+    return size / 1024 / 1024
+
+
+async def wait_indexed(store, timeout=600):
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        info = await store.qdrant_client.get_collection(store.collection_name)
+        if info.status == CollectionStatus.GREEN:
+            return time.perf_counter() - started
+        await asyncio.sleep(0.5)
+    raise TimeoutError(f"{store.collection_name} still indexing after {timeout}s")
+
+
+async def run_layout(args, vectors, probes, truth, label, quantization, on_disk, m, ef_construct, persist_directory):
+    store = CodeVectorStore(
+        collection_name="bench_quantization", persist_directory=persist_directory, location=args.url,
+        dimension=vectors.shape[1], quantization=quantization, vectors_on_disk=on_disk,
+        hnsw_m=m, hnsw_ef_construct=ef_construct,
+    )
+    try:
+        if await store.qdrant_client.collection_exists(store.collection_name):
+            await store.qdrant_client.delete_collection(store.collection_name)
+        await store.ensure_collection()
+        started = time.perf_counter()
+        writer = PointWriter(store.qdrant_client, store.collection_name, store.upsert_batch_size, store.upsert_parallelism)
+        ids = [f"00000000-0000-0000-0000-{i:012d}" for i in range(len(vectors))]
+        for start in range(0, len(vectors), 1024):
+            end = start + 1024
+            await writer.write(ids[start:end], vectors[start:end], [{} for _ in ids[start:end]])
+        await writer.close()
+        load_seconds = time.perf_counter() - started
+        index_seconds = await wait_indexed(store)
+        memory = resident_mib(len(vectors), vectors.shape[1], quantization, on_disk, m)
+        print(f"\n{label}: load {load_seconds:.1f}s, indexing {index_seconds:.1f}s, ~{memory:.0f} MiB resident")
+
+        for ef in args.ef:
+            store.search_params = search_params(ef, quantization != "none", True, args.oversampling)
+            latencies, recalls = [], []
+            for probe, expected in zip(probes, truth):
+                started = time.perf_counter()
+                points = (await store.query_batch(probe[None, :], None, args.k))[0]
+                latencies.append(time.perf_counter() - started)
+                found = {int(point.id.rsplit("-", 1)[1]) for point in points}
+                recalls.append(len(found & expected) / args.k)
+            latencies.sort()
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+            print(f"  ef={ef:<4} recall@{args.k} {np.mean(recalls):.3f}  p50 {p50:6.2f} ms  p99 {p99:6.2f} ms")
+        await store.qdrant_client.delete_collection(store.collection_name)
+    finally:
+        await store.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=":memory:")
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef", type=lambda value: [int(v) for v in value.split(",")], default=[32, 64, 128, 256])
+    parser.add_argument("--oversampling", type=float, default=2.0)
+    parser.add_argument("--layouts", default=",".join(label for label, *_ in LAYOUTS),
+                        help="comma-separated subset of: " + ", ".join(label for label, *_ in LAYOUTS))
+    args = parser.parse_args()
+
+    if args.url == ":memory:":
+        print("In-memory mode searches exactly and ignores quantization/HNSW settings; pass --url for real numbers")
+    vectors, probes = make_corpus(args.points, args.queries, args.dimension, args.clusters)
+    truth = exact_top_k(vectors, probes, args.k)
+    print(f"{args.points} points x {args.dimension} dims, {args.queries} queries, top {args.k}, oversampling {args.oversampling}")
+    selected = set(args.layouts.split(","))
+    with tempfile.TemporaryDirectory() as persist_directory:
+        for layout in LAYOUTS:
+            if layout[0] in selected:
+                await run_layout(args, vectors, probes, truth, *layout, persist_directory)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""Compare Qdrant write strategies for indexed chunks.
+
+Usage: python benchmarks/bench_vector_upserts.py [--points N] [--url URL] [--batch-size B] [--parallelism P]
+
+Writes N random 768-dim points three ways: one upsert of everything (what
+store_embeddings used to do), sequential batches that each wait to be applied, and the
+PointWriter used by the indexer (batched, several wait=False upserts in flight, one final
+wait=True). Defaults to the client's in-memory mode; pass --url to hit a real server,
+where the non-blocking writes matter most.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import Batch, Distance, VectorParams
+
+from job.vectorstore import PointWriter
+
+COLLECTION = "bench_upserts"
+
+
+def make_points(count, dimension):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((count, dimension), dtype=np.float32)
+    ids = [str(uuid.uuid5(uuid.NAMESPACE_URL, f"bench/{i}")) for i in range(count)]
+    payloads = [{'repo_name': 'bench', 'file_path': f"src/f{i // 20}.py", 'line_start': i} for i in range(count)]
+    return ids, vectors, payloads
+
+
+async def single_request(client, ids, vectors, payloads, args):
+    await client.upsert(collection_name=COLLECTION, points=Batch(ids=ids, vectors=vectors.tolist(), payloads=payloads))
+
+
+async def sequential_batches(client, ids, vectors, payloads, args):
+    for start in range(0, len(ids), args.batch_size):
+        end = start + args.batch_size
+        await client.upsert(
+            collection_name=COLLECTION,
+            points=Batch(ids=ids[start:end], vectors=vectors[start:end].tolist(), payloads=payloads[start:end]),
+        )
+
+
+async def point_writer(client, ids, vectors, payloads, args):
+    writer = PointWriter(client, COLLECTION, args.batch_size, args.parallelism)
+    # Fed in pipeline-sized slices, the way the store stage receives them
+    for start in range(0, len(ids), 128):
+        end = start + 128
+        await writer.write(ids[start:end], vectors[start:end], payloads[start:end])
+    await writer.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--url", default=":memory:")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--parallelism", type=int, default=4)
+    args = parser.parse_args()
+
+    ids, vectors, payloads = make_points(args.points, args.dimension)
+    client = AsyncQdrantClient(location=args.url)
+    print(f"{args.points} points x {args.dimension} dims against {args.url}\n")
+    try:
+        for label, strategy in [("single request", single_request),
+                                ("sequential batches", sequential_batches),
+                                ("PointWriter", point_writer)]:
+            if await client.collection_exists(COLLECTION):
+                await client.delete_collection(COLLECTION)
+            await client.create_collection(COLLECTION, vectors_config=VectorParams(size=args.dimension, distance=Distance.COSINE))
+            started = time.perf_counter()
+            await strategy(client, ids, vectors, payloads, args)
+            seconds = time.perf_counter() - started
+            count = (await client.count(COLLECTION, exact=True)).count
+            print(f"{label:<20} {seconds:7.2f}s  {args.points / seconds:9.0f} points/s  stored {count}")
+        await client.delete_collection(COLLECTION)
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
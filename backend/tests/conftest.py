@@ -0,0 +1,34 @@
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+# The app imports its modules top-level (`from job.x import ...`), as when run from backend/app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+# Settings read at import time; nothing here connects anywhere
+os.environ.setdefault("MONGODB_URI", "mongodb://127.0.0.1:27017")
+os.environ.setdefault("MONGODB_DATABASE_NAME", "test")
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+os.environ.setdefault("JWT_EXPIRATION_HOURS", "1")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("GITHUB_APP_ID", "1")
+
+
+@pytest.fixture
+def http_server():
+    """Start a local HTTP server for a handler class and return its base URL"""
+    servers = []
+
+    def start(handler: type) -> str:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,107 @@
+import asyncio
+import zlib
+
+import httpx
+
+from support import QuietHandler
+from githubapi.cache import GitHubResponseCache
+
+
+class GitHubDouble:
+    """Serves one JSON body per path with an ETag, answering If-None-Match with a 304"""
+
+    def __init__(self):
+        self.bodies = {}
+        self.requests = []
+
+    def handler(self):
+        double = self
+
+        class Handler(QuietHandler):
+            def do_GET(self):
+                double.requests.append((self.path, self.headers.get("Authorization"), self.headers.get("If-None-Match")))
+                body = double.bodies.get(self.path)
+                if body is None:
+                    return self.send_body(404, b"{}")
+                etag = '"%08x"' % zlib.crc32(body)
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    return self.end_headers()
+                self.send_body(200, body, {"Content-Type": "application/json", "ETag": etag, "Cache-Control": "private, max-age=60"})
+
+        return Handler
+
+
+def fetch(base_url: str, cache: GitHubResponseCache, requests):
+    """Run `requests` [(url, token)] one after another through `cache`; the status and body of each"""
+    async def run():
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            responses = []
+            for url, token in requests:
+                response = await cache.get(url, token, client=client)
+                responses.append((response.status_code, response.content))
+            return responses
+
+    return asyncio.run(run())
+
+
+def test_fresh_entries_are_served_without_a_request(http_server):
+    github = GitHubDouble()
+    github.bodies["/user"] = b'{"login": "octo"}'
+    cache = GitHubResponseCache(max_bytes=1 << 20, max_age=60)
+
+    responses = fetch(http_server(github.handler()), cache, [("/user", "t1"), ("/user", "t1")])
+    assert responses == [(200, b'{"login": "octo"}')] * 2
+    assert len(github.requests) == 1
+    assert (cache.misses, cache.hits) == (1, 1)
+
+
+def test_stale_entries_are_revalidated_and_a_304_reuses_the_body(http_server):
+    github = GitHubDouble()
+    github.bodies["/user/repos"] = b"[1, 2, 3]"
+    cache = GitHubResponseCache(max_bytes=1 << 20, max_age=0)
+
+    responses = fetch(http_server(github.handler()), cache, [("/user/repos", "t1"), ("/user/repos", "t1")])
+    assert responses == [(200, b"[1, 2, 3]")] * 2
+    first, second = github.requests
+    assert first[2] is None
+    assert second[1] == "Bearer t1" and second[2] == cache.entries[cache.key("t1", "/user/repos")].headers["etag"]
+    assert (cache.misses, cache.revalidated) == (1, 1)
+
+
+def test_a_changed_resource_replaces_the_entry(http_server):
+    github = GitHubDouble()
+    github.bodies["/user/repos"] = b"[1]"
+    cache = GitHubResponseCache(max_bytes=1 << 20, max_age=0)
+    base_url = http_server(github.handler())
+
+    assert fetch(base_url, cache, [("/user/repos", "t1")]) == [(200, b"[1]")]
+    github.bodies["/user/repos"] = b"[1, 2]"
+    assert fetch(base_url, cache, [("/user/repos", "t1"), ("/user/repos", "t1")]) == [(200, b"[1, 2]")] * 2
+    assert (cache.misses, cache.revalidated) == (2, 1)
+    assert cache.entries[cache.key("t1", "/user/repos")].content == b"[1, 2]"
+
+
+def test_entries_are_kept_per_token(http_server):
+    github = GitHubDouble()
+    github.bodies["/user"] = b'{"login": "octo"}'
+    cache = GitHubResponseCache(max_bytes=1 << 20, max_age=60)
+
+    fetch(http_server(github.handler()), cache, [("/user", "t1"), ("/user", "t2"), ("/user", "t2")])
+    assert [request[1] for request in github.requests] == ["Bearer t1", "Bearer t2"]
+    assert cache.hits == 1
+    assert cache.key("t1", "/user") != cache.key("t2", "/user")
+
+
+def test_least_recently_used_entries_are_evicted(http_server):
+    github = GitHubDouble()
+    for name in "abcde":
+        github.bodies[f"/{name}"] = name.encode() * 200
+    # Room for four of these entries
+    cache = GitHubResponseCache(max_bytes=1200, max_age=60)
+
+    fetch(http_server(github.handler()), cache, [(f"/{name}", "t") for name in "abcdae"])
+    assert [url for _, url in cache.entries] == ["/c", "/d", "/a", "/e"]
+    assert cache.evictions == 1
+    assert cache.bytes == sum(entry.size for entry in cache.entries.values()) <= cache.max_bytes
@@ -0,0 +1,83 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import githubapi.cache as cache
+import githubapi.client as client
+import main
+import user.routes as user_routes
+from auth.schemas import UserTokenInfo
+from support import FakeEmbeddingGenerator, QuietHandler
+
+
+class GitHubUser(QuietHandler):
+    """One page of /user/repos over keep-alive HTTP/1.1 connections"""
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        self.send_body(200, json.dumps([{"name": "repo"}]).encode(), {"Content-Type": "application/json"})
+
+
+class NoVectorStore:
+    async def ensure_collection(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+def test_routes_share_the_lifespan_client(http_server, monkeypatch):
+    handler = type("Handler", (GitHubUser,), {"requests": []})
+    monkeypatch.setattr(client, "GITHUB_API_URL", http_server(handler))
+    monkeypatch.setattr(client, "_client", None)
+    transports = []
+
+    def create_transport():
+        transports.append(original_create_transport())
+        return transports[-1]
+
+    original_create_transport = client.create_transport
+    monkeypatch.setattr(client, "create_transport", create_transport)
+    # Everything the lifespan starts besides the GitHub client
+    monkeypatch.setattr(main, "create_vector_store", NoVectorStore)
+    monkeypatch.setattr(main, "CodeEmbeddingGenerator", FakeEmbeddingGenerator)
+
+    async def nothing(*args):
+        pass
+
+    monkeypatch.setattr(main.index_job_manager, "start", nothing)
+    monkeypatch.setattr(main.index_job_manager, "stop", nothing)
+    monkeypatch.setattr(main, "shutdown_parse_executor", lambda: None)
+
+    async def verify_token(request):
+        return UserTokenInfo(username="octo", name="Octo", id="1", avatar_url="")
+
+    async def get_user_access_token(user_token_info):
+        return "token"
+
+    async def get_installation_id(username):
+        return None
+
+    monkeypatch.setattr(user_routes, "verify_token", verify_token)
+    monkeypatch.setattr(user_routes, "get_user_access_token", get_user_access_token)
+    monkeypatch.setattr(user_routes, "get_installation_id", get_installation_id)
+    # Revalidate every time, so each API call reaches GitHub
+    monkeypatch.setattr(cache, "_cache", cache.GitHubResponseCache(max_age=0))
+
+    with TestClient(main.app) as app:
+        lifespan_client = client._client
+        assert lifespan_client is not None and len(transports) == 1
+        for _ in range(3):
+            response = app.get("/user/repos")
+            assert response.status_code == 200 and response.json() == [{"name": "repo", "app_access": False}]
+        assert client._client is lifespan_client
+    assert lifespan_client.is_closed and client._client is None
+
+    # Every GitHub call went through the one pooled transport, over one kept-alive connection
+    stats = transports[0].stats()
+    assert len(transports) == 1
+    assert stats["requests"] == len(handler.requests) == 3
+    assert (stats["tcp_connects"], stats["tls_handshakes"]) == (1, 0)
+    assert stats["requests_per_connection"] == 3.0
@@ -0,0 +1,80 @@
+import asyncio
+
+from githubapp.membership import InstallationRepositoryIndex
+
+REPOS = {"octo/app": "app"}
+
+
+class Loader:
+    """Returns `result` after `delay` seconds and counts the calls"""
+
+    def __init__(self, result=REPOS, delay=0.0):
+        self.result = result
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return dict(self.result) if self.result is not None else None
+
+
+def test_concurrent_lookups_share_one_load():
+    index = InstallationRepositoryIndex(ttl=300)
+    load = Loader(delay=0.01)
+
+    async def run():
+        return await asyncio.gather(*(index.repositories(7, load) for _ in range(5)))
+
+    assert asyncio.run(run()) == [REPOS] * 5
+    assert load.calls == 1
+    assert index.stats()["shared_loads"] == 4
+
+
+def test_stale_set_is_served_while_one_reload_runs():
+    index = InstallationRepositoryIndex(ttl=0)
+    changed = {"octo/app": "app", "octo/new": "new"}
+
+    async def run():
+        first = await index.repositories(7, Loader())
+        reload = Loader(changed, delay=0.01)
+        stale = [await index.repositories(7, reload), await index.repositories(7, reload)]
+        await asyncio.sleep(0.05)
+        return first, stale, reload.calls, index._sets["7"][0]
+
+    first, stale, calls, current = asyncio.run(run())
+    assert first == REPOS and stale == [REPOS, REPOS]
+    assert calls == 1
+    assert current == changed
+
+
+def test_webhook_during_a_load_is_not_lost():
+    index = InstallationRepositoryIndex(ttl=300)
+
+    async def run():
+        load = asyncio.ensure_future(index.repositories(7, Loader(delay=0.02)))
+        await asyncio.sleep(0.005)
+        index.apply_changes(7, added=[{"full_name": "octo/new", "name": "new"}])
+        await load
+        # The list downloaded before the change isn't trusted: the next lookup reloads it
+        fresh = Loader({"octo/app": "app", "octo/new": "new"})
+        await index.repositories(7, fresh)
+        await asyncio.sleep(0.01)
+        return index._sets["7"][0], fresh.calls
+
+    repositories, calls = asyncio.run(run())
+    assert calls == 1
+    assert repositories == {"octo/app": "app", "octo/new": "new"}
+
+
+def test_failed_loads_are_not_cached():
+    index = InstallationRepositoryIndex(ttl=300)
+
+    async def run():
+        failed = await index.repositories(7, Loader(RuntimeError("rate limited")))
+        return failed, await index.repositories(7, Loader())
+
+    assert asyncio.run(run()) == (None, REPOS)
+    assert index.stats()["load_failures"] == 1
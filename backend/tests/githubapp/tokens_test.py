@@ -0,0 +1,93 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+
+import githubapp.services as services
+import githubapp.tokens as tokens
+from githubapp.tokens import TOKEN_REFRESH_MARGIN, GitHubAppTokenManager
+
+
+def expires_in(seconds):
+    return datetime.fromtimestamp(time.time() + seconds, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class FakeGitHub:
+    """Issues token-1, token-2, ... valid for `lifetime` seconds; API requests answer with the
+    next status in `statuses` (200 once they run out)"""
+
+    def __init__(self, lifetime=3600, statuses=()):
+        self.lifetime = lifetime
+        self.statuses = list(statuses)
+        self.token_posts = []
+        self.requests = []
+
+    async def post(self, url, headers):
+        self.token_posts.append(url)
+        # Let every concurrent caller reach the manager before the token arrives
+        await asyncio.sleep(0.01)
+        body = {"token": f"token-{len(self.token_posts)}", "expires_at": expires_in(self.lifetime)}
+        return httpx.Response(201, json=body)
+
+    async def request(self, method, url, headers, **kwargs):
+        self.requests.append((method, url, headers["Authorization"]))
+        return httpx.Response(self.statuses.pop(0) if self.statuses else 200, json={})
+
+
+@pytest.fixture
+def github(monkeypatch):
+    """A token manager whose GitHub client is a FakeGitHub (and whose app JWT needs no key)"""
+    fake = FakeGitHub()
+    manager = GitHubAppTokenManager("1", "unused")
+    monkeypatch.setattr(manager, "app_jwt", lambda: "app-jwt")
+    monkeypatch.setattr(tokens, "get_github_client", lambda: fake)
+    monkeypatch.setattr(services, "get_github_client", lambda: fake)
+    monkeypatch.setattr(services, "get_token_manager", lambda: manager)
+    return fake, manager
+
+
+def test_concurrent_callers_share_one_token_request(github):
+    fake, manager = github
+
+    async def run():
+        return await asyncio.gather(*(manager.installation_token(42) for _ in range(10)))
+
+    assert asyncio.run(run()) == ["token-1"] * 10
+    assert fake.token_posts == ["/app/installations/42/access_tokens"]
+    assert manager.stats()["shared_refreshes"] == 9
+    # Later callers are served from the cache
+    assert asyncio.run(manager.installation_token("42")) == "token-1"
+    assert len(fake.token_posts) == 1
+
+
+def test_tokens_inside_the_refresh_margin_are_replaced(github):
+    fake, manager = github
+    fake.lifetime = TOKEN_REFRESH_MARGIN - 10
+    assert asyncio.run(manager.installation_token(42)) == "token-1"
+
+    fake.lifetime = 3600
+    assert asyncio.run(manager.installation_token(42)) == "token-2"
+    assert asyncio.run(manager.installation_token(42)) == "token-2"
+    assert len(fake.token_posts) == 2
+
+
+def test_a_401_invalidates_the_token_and_retries_once(github):
+    fake, manager = github
+    fake.statuses = [401]
+    response = asyncio.run(services.installation_request("POST", "/repos/octo/app/issues", 42, "octo", json={}))
+    assert response.status_code == 200
+    assert fake.requests == [
+        ("POST", "/repos/octo/app/issues", "Bearer token-1"),
+        ("POST", "/repos/octo/app/issues", "Bearer token-2"),
+    ]
+    assert manager.stats()["invalidations"] == 1
+
+
+def test_a_second_401_is_returned_without_another_retry(github):
+    fake, manager = github
+    fake.statuses = [401, 401, 401]
+    response = asyncio.run(services.installation_request("POST", "/repos/octo/app/issues", 42, "octo", json={}))
+    assert response.status_code == 401
+    assert len(fake.requests) == 2 and len(fake.token_posts) == 2
@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+import hmac
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import githubapp.routes as routes
+from githubapp.membership import InstallationRepositoryIndex
+
+SECRET = "webhook-secret"
+REPOS = {"octo/app": "app", "octo/lib": "lib"}
+
+
+@pytest.fixture
+def webhook(monkeypatch):
+    """POST deliveries to the webhook route against an index that already holds installation 7"""
+    index = InstallationRepositoryIndex(ttl=300)
+
+    async def load():
+        return dict(REPOS)
+
+    asyncio.run(index.repositories(7, load))
+    monkeypatch.setattr(routes, "get_repository_index", lambda: index)
+    app = FastAPI()
+    app.include_router(routes.router)
+    client = TestClient(app)
+
+    def post(event: str, payload, secret: str = None):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        headers = {"X-GitHub-Event": event, "Content-Type": "application/json"}
+        if secret:
+            headers["X-Hub-Signature-256"] = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        return client.post("/githubapp/webhooks/github", content=body, headers=headers)
+
+    post.index = index
+    return post
+
+
+ADDED = {
+    "installation": {"id": 7},
+    "repositories_added": [{"full_name": "evil/repo", "name": "repo"}],
+    "repositories_removed": [{"full_name": "octo/lib", "name": "lib"}],
+}
+
+
+def cached(index, installation_id="7"):
+    entry = index._sets.get(installation_id)
+    return entry[0] if entry else None
+
+
+def test_signed_delivery_updates_the_set(webhook, monkeypatch):
+    monkeypatch.setattr(routes, "GITHUB_WEBHOOK_SECRET", SECRET)
+    assert webhook("installation_repositories", ADDED, SECRET).status_code == 200
+    assert cached(webhook.index) == {"octo/app": "app", "evil/repo": "repo"}
+
+
+def test_badly_signed_delivery_is_rejected(webhook, monkeypatch):
+    monkeypatch.setattr(routes, "GITHUB_WEBHOOK_SECRET", SECRET)
+    assert webhook("installation_repositories", ADDED).status_code == 401
+    assert webhook("installation_repositories", ADDED, "wrong-secret").status_code == 401
+    assert cached(webhook.index) == REPOS
+
+
+def test_without_a_secret_deliveries_only_invalidate(webhook, monkeypatch):
+    monkeypatch.setattr(routes, "GITHUB_WEBHOOK_SECRET", None)
+    assert webhook("installation_repositories", ADDED).status_code == 200
+    # Nothing from the unsigned payload is applied; the next lookup reloads from GitHub
+    assert cached(webhook.index) is None
+    assert webhook.index.stats()["webhook_updates"] == 0
+
+
+def test_installation_event_drops_the_set(webhook, monkeypatch):
+    monkeypatch.setattr(routes, "GITHUB_WEBHOOK_SECRET", SECRET)
+    assert webhook("installation", {"action": "suspend", "installation": {"id": 7}}, SECRET).status_code == 200
+    assert cached(webhook.index) is None
+
+
+def test_unknown_installations_are_not_recorded(webhook, monkeypatch):
+    monkeypatch.setattr(routes, "GITHUB_WEBHOOK_SECRET", None)
+    for installation_id in range(100, 110):
+        webhook("installation", {"installation": {"id": installation_id}})
+    assert set(webhook.index._changed) == set()
+
+
+@pytest.mark.parametrize("body", [b"{not json", b"\xff\xfe", b"[7]"])
+def test_malformed_delivery_is_a_bad_request(webhook, monkeypatch, body):
+    monkeypatch.setattr(routes, "GITHUB_WEBHOOK_SECRET", SECRET)
+    response = webhook("installation", body, SECRET)
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Malformed webhook payload"}
+    assert cached(webhook.index) == REPOS
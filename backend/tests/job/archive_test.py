@@ -0,0 +1,101 @@
+import asyncio
+import gzip
+import io
+import tarfile
+
+import pytest
+
+from support import QuietHandler
+from githubapi.client import close_github_client
+from job.services import MAX_FILE_SIZE, _TarStreamReader, git_blob_sha, iter_repo_archive
+
+ROOT = "octo-repo-0123abc"
+LONG_PATH = "src/" + "/".join(["very_long_directory_name_%d" % i for i in range(6)]) + "/module.py"
+
+
+def build_tarball(files: dict, format: int = tarfile.PAX_FORMAT) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w", format=format) as tar:
+        root = tarfile.TarInfo(ROOT)
+        root.type = tarfile.DIRTYPE
+        tar.addfile(root)
+        for path, data in files.items():
+            info = tarfile.TarInfo(f"{ROOT}/{path}")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return gzip.compress(buffer.getvalue())
+
+
+FILES = {
+    "main.py": b"def main():\n    return 1\n",
+    LONG_PATH: b"class Deep:\n    pass\n",
+    "logo.png": b"\x89PNG not code",
+    "big.py": b"x = 1\n" * (MAX_FILE_SIZE // 6 + 1),
+    "docs/readme.md": b"hello\n",
+}
+
+
+def serve_tarball(http_server, tarball: bytes, requests: list) -> str:
+    class Handler(QuietHandler):
+        def do_GET(self):
+            requests.append((self.path, self.headers.get("Authorization")))
+            if self.path != "/repos/octo/repo/tarball/main":
+                return self.send_body(404, b"{}")
+            self.send_body(200, tarball, {"Content-Type": "application/x-gzip"})
+
+    return http_server(Handler)
+
+
+def collect(api_url: str, **kwargs):
+    async def run():
+        try:
+            return [record async for record in iter_repo_archive("octo", "repo", "token", "main", api_url=api_url, **kwargs)]
+        finally:
+            await close_github_client()
+
+    return asyncio.run(run())
+
+
+def test_archive_records_pax_long_names_and_filters(http_server):
+    assert len(f"{ROOT}/{LONG_PATH}") > 100
+    requests = []
+    api_url = serve_tarball(http_server, build_tarball(FILES), requests)
+    stats = {}
+    records = {record["path"]: record for record in collect(api_url, stats=stats)}
+
+    # The archive's top-level directory is stripped; binaries and oversized files are filtered
+    assert set(records) == {"main.py", LONG_PATH, "docs/readme.md"}
+    assert records[LONG_PATH]["content"] == "class Deep:\n    pass\n"
+    assert records["main.py"]["extension"] == ".py"
+    assert records["main.py"]["size"] == len(FILES["main.py"])
+    assert stats["files_fetched"] == 3
+    assert set(stats["tree"]) == set(records)
+    assert requests == [("/repos/octo/repo/tarball/main", "Bearer token")]
+
+
+def test_archive_blob_shas_match_git_and_skip_unchanged(http_server):
+    api_url = serve_tarball(http_server, build_tarball(FILES), [])
+    # `printf 'hello\n' | git hash-object --stdin`
+    assert git_blob_sha(b"hello\n") == "ce013625030ba8dba906f756967f9e9ca394464a"
+
+    stats = {}
+    records = collect(api_url, skip_shas={"main.py": git_blob_sha(FILES["main.py"])}, stats=stats)
+    assert {record["path"] for record in records} == {LONG_PATH, "docs/readme.md"}
+    assert all(record["sha"] == git_blob_sha(FILES[record["path"]]) for record in records)
+    assert stats["files_skipped"] == 1
+    assert stats["tree"]["main.py"] == git_blob_sha(FILES["main.py"])
+
+
+def test_reader_handles_gnu_long_names_fed_in_small_chunks():
+    data = gzip.decompress(build_tarball({LONG_PATH: b"x = 1\n", "a.js": b"let a;\n"}, format=tarfile.GNU_FORMAT))
+    reader = _TarStreamReader()
+    files = []
+    for start in range(0, len(data), 7):
+        files.extend(reader.feed(data[start:start + 7]))
+    assert files == [(LONG_PATH, b"x = 1\n"), ("a.js", b"let a;\n")]
+
+
+def test_archive_error_status_raises(http_server):
+    api_url = serve_tarball(http_server, b"", [])
+    with pytest.raises(Exception, match="404"):
+        collect(api_url + "/missing")
@@ -0,0 +1,46 @@
+import json
+
+from job.chunkers.budget import enforce_budget, make_chunk
+from job.chunkers.lines import LineIndex
+from job.chunkers.structural import brace_chunker
+from job.services import CodePreprocessor
+
+
+def test_single_overlong_line_is_split_by_character_offset():
+    content = "x" * 2500 + "\nshort line\n" + "y" * 700
+    lines = LineIndex(content)
+    chunk = make_chunk("generic", "blob", lines, 1, 3, "dump.sql")
+    parts = enforce_budget([chunk], lines, max_chars=1000, min_chars=1)
+
+    assert all(len(part["content"]) <= 1000 for part in parts)
+    assert "".join(part["content"] for part in parts[:3]) == "x" * 2500
+    assert [(part["line_start"], part["line_end"]) for part in parts] == [(1, 1), (1, 1), (1, 1), (2, 3)]
+    assert parts[-1]["content"] == "short line\n" + "y" * 700
+    assert [part["metadata"]["part"] for part in parts] == [1, 2, 3, 4]
+
+
+def test_minified_json_respects_the_budget():
+    content = json.dumps({f"key_{i}": "v" * 50 for i in range(2000)})
+    chunks = CodePreprocessor().preprocess_file({"path": "data.json", "extension": ".json", "content": content})
+    assert len(chunks) > 1
+    assert max(len(chunk["content"]) for chunk in chunks) <= 3000
+    assert "".join(chunk["content"] for chunk in chunks) == content
+
+
+def test_generic_fallback_splits_long_lines():
+    content = "a" * 10000
+    chunks = CodePreprocessor().generic_chunk(content, "bundle.min.css")
+    assert max(len(chunk["content"]) for chunk in chunks) <= 3000
+    assert "".join(chunk["content"] for chunk in chunks) == content
+
+
+def test_rust_impl_with_lifetime_is_a_class_chunk():
+    content = (
+        "impl<'a> Parser<'a> {\n"
+        + "".join(f"    fn step_{i}(&mut self) -> usize {{\n" + "        self.pos += 1;\n" * 40 + "        self.pos\n    }\n" for i in range(6))
+        + "}\n"
+    )
+    chunks = brace_chunker("c_like")(content, "src/parser.rs")
+    container = [chunk for chunk in chunks if chunk["name"] == "Parser"]
+    assert container and container[0]["type"] == "class"
+    assert {chunk["metadata"].get("class_name") for chunk in chunks if chunk["type"] == "function"} == {"Parser"}
@@ -0,0 +1,98 @@
+import asyncio
+import hashlib
+from pathlib import Path
+
+import pytest
+
+import job.indexer as indexer
+import job.search as search
+import job.symbol_index as symbol_index
+from support import FakeEmbeddingGenerator
+from job.vectorstore import CodeVectorStore
+
+
+def blob_sha(content: str) -> str:
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+class IndexingHarness:
+    """index_repository against an in-memory Qdrant collection, a dict of repo files and
+    in-memory manifests in place of GitHub and MongoDB"""
+
+    def __init__(self, tmp_path):
+        self.tmp_path = tmp_path
+        self.files = {}
+        self.manifests = {}
+        self.saves = 0
+        self.fail_after = None
+        self.embedding_generator = FakeEmbeddingGenerator()
+        self.store = None
+        self.loop = None
+
+    async def get_index_version(self, username, repo_name, branch):
+        manifest = self.manifests.get((username, repo_name, branch))
+        return manifest["index_version"] if manifest else None
+
+    async def get_index_manifest(self, username, repo_name, branch):
+        manifest = self.manifests.get((username, repo_name, branch))
+        return dict(manifest["files"]) if manifest else {}
+
+    async def save_index_manifest(self, username, repo_name, branch, files, index_version):
+        self.saves += 1
+        self.manifests[(username, repo_name, branch)] = {
+            "files": dict(files),
+            "index_version": index_version,
+            "revision": self.saves,
+        }
+
+    async def get_index_revisions(self, username, repo_name, branch=None):
+        return {
+            key[2]: (manifest["index_version"], manifest["revision"])
+            for key, manifest in self.manifests.items()
+            if key[:2] == (username, repo_name) and (branch is None or key[2] == branch)
+        }
+
+    async def iter_repo_files(self, username, repo_name, access_token, branch="main", skip_shas=None, stats=None, **kwargs):
+        skip_shas = skip_shas or {}
+        stats.update({"files_fetched": 0, "files_failed": 0, "files_skipped": 0, "retries": 0, "failures": {}, "tree": {}, "elapsed": 0.0})
+        for path, content in self.files.items():
+            sha = blob_sha(content)
+            stats["tree"][path] = sha
+            if skip_shas.get(path) == sha:
+                stats["files_skipped"] += 1
+                continue
+            if self.fail_after is not None and stats["files_fetched"] >= self.fail_after:
+                raise RuntimeError("connection reset")
+            stats["files_fetched"] += 1
+            yield {"path": path, "content": content, "size": len(content), "extension": Path(path).suffix, "sha": sha}
+
+    def index(self, incremental: bool = False, branch: str = "main"):
+        return self.run(indexer.index_repository(
+            "octo", "repo", "token", self.store, self.embedding_generator, branch, incremental=incremental,
+        ))
+
+    def run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def points(self, **match):
+        """Payloads of every stored point whose payload matches `match`"""
+        records, _ = self.run(self.store.qdrant_client.scroll(collection_name=self.store.collection_name, limit=10000, with_payload=True))
+        return [record.payload for record in records if all(record.payload.get(key) == value for key, value in match.items())]
+
+
+@pytest.fixture
+def indexing(monkeypatch, tmp_path):
+    harness = IndexingHarness(tmp_path)
+    monkeypatch.setattr(symbol_index, "SYMBOL_INDEX_DIR", str(tmp_path / "symbols"))
+    for name in ("get_index_version", "get_index_manifest", "save_index_manifest", "iter_repo_files"):
+        monkeypatch.setattr(indexer, name, getattr(harness, name))
+    monkeypatch.setattr(search, "get_index_revisions", harness.get_index_revisions)
+    # The pipeline's process pool would pickle files across; these are tiny
+    monkeypatch.setattr("job.services.get_parse_executor", lambda: None)
+
+    harness.loop = asyncio.new_event_loop()
+    harness.store = CodeVectorStore(location=":memory:", persist_directory=str(tmp_path / "vectors"), dimension=8)
+    harness.run(harness.store.ensure_collection())
+    yield harness
+    harness.run(harness.store.close())
+    harness.loop.close()
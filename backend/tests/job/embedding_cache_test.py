@@ -0,0 +1,70 @@
+import itertools
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import job.embedding_cache as embedding_cache
+from job.embedding_cache import EmbeddingCache
+
+DIM = 8
+VECTOR_BYTES = DIM * 4
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Every read of the cache's clock is one second later than the last"""
+    ticks = itertools.count(1)
+    monkeypatch.setattr(embedding_cache, "time", SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def vector(i):
+    return [float(i)] * DIM
+
+
+def cached(cache, texts):
+    return [text for text, found in zip(texts, cache.get_many("m", texts)) if found is not None]
+
+
+def test_hits_and_misses(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_bytes=1 << 20)
+    cache.put_many("m", ["a", "b"], [vector(1), vector(2)])
+
+    a, missing, b, again = cache.get_many("m", ["a", "c", "b", "a"])
+    assert missing is None
+    assert a.dtype == np.float32 and a.tolist() == vector(1) and b.tolist() == vector(2)
+    assert again.tolist() == vector(1)
+    # The model is part of the key
+    assert cache.get_many("other", ["a"]) == [None]
+    assert (cache.hits, cache.misses) == (3, 2)
+
+
+def test_entries_survive_reopening_and_replacing_does_not_double_count(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache(path, max_bytes=1 << 20)
+    cache.put_many("m", ["a", "b"], [vector(1), vector(2)])
+    cache.put_many("m", ["a"], [vector(3)])
+    assert (cache.entries, cache.total_bytes) == (2, 2 * VECTOR_BYTES)
+
+    reopened = EmbeddingCache(path, max_bytes=1 << 20)
+    assert (reopened.entries, reopened.total_bytes) == (2, 2 * VECTOR_BYTES)
+    assert reopened.get_many("m", ["a"])[0].tolist() == vector(3)
+
+
+def test_lookups_refresh_recency_and_eviction_stops_at_the_low_water_mark(tmp_path, clock):
+    # Room for exactly ten vectors
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_bytes=10 * VECTOR_BYTES)
+    texts = [f"t{i}" for i in range(10)]
+    for i, text in enumerate(texts):
+        cache.put_many("m", [text], [vector(i)])
+    assert cache.evictions == 0 and cache.total_bytes == cache.max_bytes
+
+    # t0 and t1 are the oldest writes, but were just read
+    assert cached(cache, ["t0", "t1"]) == ["t0", "t1"]
+    cache.put_many("m", ["t10"], [vector(10)])
+
+    # 11 vectors are over the cap; the two least recently used go, leaving 90% of it
+    assert cache.evictions == 2
+    assert cache.total_bytes == 9 * VECTOR_BYTES == int(cache.max_bytes * 0.9)
+    assert cached(cache, texts + ["t10"]) == ["t0", "t1"] + texts[4:] + ["t10"]
+    assert cache.stats()["entries"] == 9
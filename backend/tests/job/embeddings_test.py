@@ -0,0 +1,108 @@
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import job.embeddings as embeddings
+from job.embedding_cache import EmbeddingCache
+from job.embeddings import EMBEDDING_STATS, CodeEmbeddingGenerator, make_batches
+
+
+class FlakyModel:
+    """Hosted-endpoint double: fails the first `failures` requests, and a request for text
+    "t<i>" takes `delay(i)` seconds, so batches can be made to finish out of order"""
+
+    def __init__(self, failures=0, delay=lambda i: 0):
+        self.failures = failures
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self.lock:
+            self.requests.append(list(texts))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            failing = len(self.requests) <= self.failures
+        try:
+            time.sleep(self.delay(int(texts[0][1:])))
+            if failing:
+                raise RuntimeError("503 Service Unavailable")
+            return [[float(text[1:]), 1.0] for text in texts]
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    """CodeEmbeddingGenerator on the remote backend, with the endpoint replaced by `model`"""
+    delays = []
+    monkeypatch.setattr(embeddings, "time", SimpleNamespace(perf_counter=time.perf_counter, sleep=delays.append))
+    monkeypatch.setattr(embeddings, "random", SimpleNamespace(random=lambda: 1.0))
+
+    def make(model, **kwargs):
+        endpoint = SimpleNamespace(HuggingFaceEndpointEmbeddings=lambda **_: model)
+        monkeypatch.setitem(sys.modules, "langchain_huggingface", endpoint)
+        instance = CodeEmbeddingGenerator(cache=EmbeddingCache(":memory:"), backend="remote", **kwargs)
+        instance.delays = delays
+        return instance
+
+    return make
+
+
+def texts(count):
+    return [f"t{i}" for i in range(count)]
+
+
+def test_batches_are_bounded_by_count():
+    assert make_batches(["a"] * 5, max_count=2, max_chars=100) == [[0, 1], [2, 3], [4]]
+
+
+def test_batches_are_bounded_by_characters():
+    # A text over the limit gets a batch of its own
+    assert make_batches(["aaaa", "bb", "cc", "dddddd", "e"], max_count=10, max_chars=5) == [[0], [1, 2], [3], [4]]
+    assert make_batches([], max_count=10, max_chars=5) == []
+
+
+def test_failed_requests_are_retried_with_backoff(generator):
+    model = FlakyModel(failures=2)
+    retries = EMBEDDING_STATS.retries
+    instance = generator(model, max_retries=3, backoff_base=0.5)
+    vectors = instance.embed_texts(texts(3))
+    assert vectors.tolist() == [[0.0, 1.0], [1.0, 1.0], [2.0, 1.0]]
+    assert model.requests == [texts(3)] * 3
+    assert instance.delays == [0.5, 1.0]
+    assert EMBEDDING_STATS.retries - retries == 2
+
+
+def test_backoff_doubles_and_the_last_failure_is_raised(generator):
+    model = FlakyModel(failures=10)
+    instance = generator(model, max_retries=3, backoff_base=0.5)
+    failures = EMBEDDING_STATS.failures
+    with pytest.raises(RuntimeError, match="503"):
+        instance.embed_texts(texts(2))
+    assert len(model.requests) == 4
+    assert instance.delays == [0.5, 1.0, 2.0]
+    assert EMBEDDING_STATS.failures - failures == 1
+
+
+def test_batches_in_flight_are_bounded_and_reassembled_in_order(generator):
+    # Earlier batches take longest, so they finish last
+    model = FlakyModel(delay=lambda i: 0.01 * (16 - i))
+    instance = generator(model, batch_size=2, max_in_flight=3)
+    vectors = instance.embed_texts(texts(16))
+    assert [row[0] for row in vectors.tolist()] == [float(i) for i in range(16)]
+    assert sorted(map(tuple, model.requests)) == sorted(tuple(texts(16)[i:i + 2]) for i in range(0, 16, 2))
+    assert model.max_in_flight == 3
+
+
+def test_a_wrong_number_of_vectors_is_an_error(generator):
+    model = FlakyModel()
+    model.embed_documents = lambda batch: [[1.0, 1.0]]
+    with pytest.raises(ValueError, match="1 vectors for 2 texts"):
+        generator(model).embed_texts(texts(2))
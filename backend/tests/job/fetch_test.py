@@ -0,0 +1,116 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+from support import QuietHandler
+import job.services as services
+from githubapi.client import close_github_client
+from job.services import fetch_entire_repo
+
+
+class GitHubContents(QuietHandler):
+    """Tree and contents API for `files` {path: content}; `script` {path: [(status, headers), ...]}
+    is answered in order before the file is served, and `delays` {path: seconds} slows a file down"""
+    files = {}
+    script = {}
+    delays = {}
+    requests = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        with self.lock:
+            self.requests.append((url.path, time.monotonic()))
+        if url.path == "/repos/octo/repo/git/trees/main":
+            tree = [{"path": path, "type": "blob", "sha": f"sha-{path}", "size": len(content)} for path, content in self.files.items()]
+            return self.send_body(200, json.dumps({"tree": tree}).encode())
+        path = url.path[len("/repos/octo/repo/contents/"):]
+        with self.lock:
+            steps = self.script.get(path)
+            step = steps.pop(0) if steps else None
+        if step is not None:
+            return self.send_body(step[0], b"{}", step[1])
+        if path not in self.files:
+            return self.send_body(404, b'{"message": "Not Found"}')
+        time.sleep(self.delays.get(path, 0))
+        content = base64.b64encode(self.files[path].encode()).decode()
+        self.send_body(200, json.dumps({"content": content}).encode())
+
+
+def serve(http_server, monkeypatch, files, script=None, delays=None):
+    handler = type("Handler", (GitHubContents,), {"files": files, "script": script or {}, "delays": delays or {}, "requests": []})
+    monkeypatch.setattr(services, "GITHUB_API_URL", http_server(handler))
+    return handler
+
+
+def fetch(**kwargs):
+    stats = {}
+
+    async def run():
+        try:
+            return await fetch_entire_repo("octo", "repo", "token", "main", stats=stats, **kwargs)
+        finally:
+            await close_github_client()
+
+    return asyncio.run(run()), stats
+
+
+def contents_requests(handler, path):
+    return [at for requested, at in handler.requests if requested == f"/repos/octo/repo/contents/{path}"]
+
+
+def test_server_errors_are_retried(http_server, monkeypatch):
+    handler = serve(http_server, monkeypatch, {"a.py": "a = 1\n"}, script={"a.py": [(503, {}), (502, {})]})
+    records, stats = fetch(max_retries=3, backoff_base=0.001)
+    assert [record["content"] for record in records] == ["a = 1\n"]
+    assert len(contents_requests(handler, "a.py")) == 3
+    assert (stats["retries"], stats["files_fetched"], stats["files_failed"]) == (2, 1, 0)
+
+
+def test_retry_limit_is_forwarded(http_server, monkeypatch):
+    handler = serve(http_server, monkeypatch, {"a.py": "a = 1\n"}, script={"a.py": [(503, {})] * 5})
+    records, stats = fetch(max_retries=1, backoff_base=0.001)
+    assert records == []
+    assert len(contents_requests(handler, "a.py")) == 2
+    assert (stats["retries"], stats["files_failed"]) == (1, 1)
+
+
+def test_retry_after_is_honoured(http_server, monkeypatch):
+    handler = serve(http_server, monkeypatch, {"a.py": "a = 1\n", "b.py": "b = 2\n"}, script={
+        "a.py": [(429, {"Retry-After": "0.3"})],
+        # A primary rate limit is a 403 with no requests left
+        "b.py": [(403, {"X-RateLimit-Remaining": "0", "Retry-After": "0.3"})],
+    })
+    records, stats = fetch(max_retries=1, backoff_base=0.001)
+    assert [record["path"] for record in records] == ["a.py", "b.py"]
+    for path in ("a.py", "b.py"):
+        first, second = contents_requests(handler, path)
+        assert second - first >= 0.3
+    assert stats["retries"] == 2
+
+
+def test_missing_file_is_counted_without_aborting(http_server, monkeypatch):
+    handler = serve(http_server, monkeypatch, {"a.py": "a = 1\n", "gone.py": "x\n", "c.py": "c = 3\n"}, script={
+        "gone.py": [(404, {})],
+    })
+    records, stats = fetch(max_retries=3, backoff_base=0.001)
+    assert [record["path"] for record in records] == ["a.py", "c.py"]
+    # A 404 is not retried
+    assert len(contents_requests(handler, "gone.py")) == 1
+    assert (stats["files_fetched"], stats["files_failed"]) == (2, 1)
+    assert "404" in stats["failures"]["gone.py"]
+
+
+def test_output_keeps_tree_order_with_concurrent_downloads(http_server, monkeypatch):
+    files = {f"f{i}.py": f"x = {i}\n" for i in range(8)}
+    # Earlier files finish last
+    serve(http_server, monkeypatch, files, delays={f"f{i}.py": 0.02 * (8 - i) for i in range(8)})
+    started = time.monotonic()
+    records, stats = fetch(concurrency=8)
+    assert [record["path"] for record in records] == list(files)
+    assert stats["files_fetched"] == 8
+    # Downloaded side by side, not one after another
+    assert time.monotonic() - started < sum(0.02 * (8 - i) for i in range(8))
@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from job.symbol_index import symbol_index_path
+
+FILES = {
+    "app/models.py": "class User:\n    def full_name(self):\n        return self.name\n",
+    "app/views.py": "def index(request):\n    return render(request)\n",
+    "README.md": "# Demo\n\nA demo repository.\n",
+}
+
+
+def test_full_rebuild_swaps_versions_and_drops_the_old_one(indexing):
+    indexing.files = dict(FILES)
+    first = indexing.index()
+    assert first["rebuilt"]
+    first_points = indexing.points(index_version=first["index_version"])
+    assert {point["file_path"] for point in first_points} == set(FILES)
+
+    second = indexing.index()
+    assert second["index_version"] != first["index_version"]
+    assert indexing.manifests[("octo", "repo", "main")]["index_version"] == second["index_version"]
+    # Every point of the previous version is gone once the manifest points at the new one
+    assert not indexing.points(index_version=first["index_version"])
+    assert len(indexing.points(index_version=second["index_version"])) == len(first_points)
+    assert not os.path.exists(symbol_index_path("octo", "repo", "main", first["index_version"]))
+
+
+def test_failed_rebuild_leaves_the_live_version_untouched(indexing):
+    indexing.files = dict(FILES)
+    live = indexing.index()
+    live_ids = sorted(point["id"] for point in indexing.points())
+
+    indexing.fail_after = 1
+    with pytest.raises(RuntimeError, match="connection reset"):
+        indexing.index()
+    assert indexing.manifests[("octo", "repo", "main")]["index_version"] == live["index_version"]
+    # The unfinished version's points and symbol file are removed
+    assert sorted(point["id"] for point in indexing.points()) == live_ids
+    assert os.path.exists(symbol_index_path("octo", "repo", "main", live["index_version"]))
+    assert all(live["index_version"] in name for name in os.listdir(indexing.tmp_path / "symbols"))
+
+
+def test_incremental_run_replaces_changed_and_removes_deleted_files(indexing):
+    indexing.files = dict(FILES)
+    live = indexing.index()
+
+    indexing.files["app/views.py"] = "def index(request):\n    return redirect('/home')\n"
+    del indexing.files["README.md"]
+    result = indexing.index(incremental=True)
+
+    assert not result["rebuilt"]
+    assert result["index_version"] == live["index_version"]
+    assert result["files_processed"] == 1
+    assert result["files_skipped"] == 1
+    assert result["files_deleted"] == 1
+    points = indexing.points(index_version=live["index_version"])
+    assert {point["file_path"] for point in points} == {"app/models.py", "app/views.py"}
+    views = [point["document"] for point in points if point["file_path"] == "app/views.py"]
+    assert views and all("redirect" in document for document in views)
+
+
+def test_delete_by_files_stays_inside_its_scope(indexing):
+    indexing.files = dict(FILES)
+    main = indexing.index(branch="main")
+    dev = indexing.index(branch="dev")
+
+    indexing.run(indexing.store.delete_by_files("repo", ["app/models.py"], owner="octo", branch="dev", index_version=dev["index_version"]))
+    assert {point["file_path"] for point in indexing.points(branch="dev")} == {"app/views.py", "README.md"}
+    assert {point["file_path"] for point in indexing.points(branch="main", index_version=main["index_version"])} == set(FILES)
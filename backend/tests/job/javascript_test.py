@@ -0,0 +1,137 @@
+import pytest
+
+from job.chunkers.javascript import chunk_javascript, tokenize
+from job.services import CodePreprocessor
+
+CLASS_SOURCE = """\
+/**
+ * Keeps widgets.
+ */
+export class Store extends Base {
+  items = [];
+
+  /** Adds one. */
+  add(item) {
+    if (item) {
+      this.items.push(item);
+    }
+    return this;
+  }
+
+  remove = (item) => {
+    this.items = this.items.filter((x) => x !== item);
+  };
+
+  static async load(url) {
+    for (const part of url.split("/")) {
+      while (part) { break; }
+    }
+  }
+}
+
+function helper(a, b) {
+  return a / b;
+}
+"""
+
+
+@pytest.fixture(autouse=True)
+def no_merging(monkeypatch):
+    # Keep every function its own chunk, so the structure can be checked
+    monkeypatch.setattr("job.chunkers.budget.CHUNK_MIN_CHARS", 1)
+
+
+def values(tokens, kind):
+    return [value for token_kind, value, _, _ in tokens if token_kind == kind]
+
+
+def test_braces_in_strings_templates_and_regexes_are_not_code():
+    source = 'const a = "{"; const b = \'}\'; const c = `x ${ {k: `${y}}`}.k } {`; const d = /[{}]/g; f(a / b / c);'
+    tokens, _ = tokenize(source)
+    assert values(tokens, "string") == ['"{"', "'}'"]
+    assert values(tokens, "regex") == ["/[{}]/g"]
+    # Only the object literal inside the template's `${}` is code
+    assert [value for _, value, _, _ in tokens if value in "{}"] == ["{", "}"]
+    # Division after a name or `)` is an operator, not a regex
+    assert values(tokens, "punct").count("/") == 2
+
+
+def test_regex_after_keywords_and_jsdoc_collection():
+    tokens, jsdoc = tokenize("/** Doc. */\nfunction f(x) { return /}/.test(x) ? 1 : x / 2; }")
+    assert values(tokens, "regex") == ["/}/"]
+    assert list(jsdoc.values()) == ["/** Doc. */"]
+
+
+def test_class_skeleton_methods_and_line_ranges():
+    chunks = chunk_javascript(CLASS_SOURCE, "store.js")
+    assert [(chunk["type"], chunk["name"], chunk["line_start"], chunk["line_end"]) for chunk in chunks] == [
+        ("class", "Store", 4, 24),
+        ("function", "add", 8, 13),
+        ("function", "remove", 15, 17),
+        ("function", "load", 19, 23),
+        ("function", "helper", 26, 28),
+    ]
+    store, add, remove, load, helper = chunks
+    assert store["docstring"] == "Keeps widgets."
+    assert store["metadata"]["base_classes"] == ["Base"]
+    assert store["metadata"]["methods"] == ["add", "remove", "load"]
+    # Method bodies are collapsed in the skeleton and kept in their own chunks
+    assert "this.items.push" not in store["content"]
+    assert "add(item) { ... }" in store["content"]
+    assert add["docstring"] == "Adds one."
+    assert add["metadata"] == {"args": ["item"], "class_name": "Store"}
+    assert load["content"].startswith("static async load(url) {")
+    assert helper["metadata"] == {"args": ["a", "b"]}
+
+
+def test_control_blocks_are_not_functions():
+    chunks = chunk_javascript(CLASS_SOURCE, "store.js")
+    names = {chunk["name"] for chunk in chunks}
+    assert not names & {"if", "for", "while", "filter", "split"}
+
+
+def test_arrow_function_fields_and_assignments():
+    source = (
+        "class View {\n"
+        "  onClick = async (event) => {\n    this.open(event);\n  };\n"
+        "  render() {\n    return 1;\n  }\n"
+        "}\n"
+        "export const format = (value, unit) => {\n  return value + unit;\n};\n"
+    )
+    chunks = {chunk["name"]: chunk for chunk in chunk_javascript(source, "view.ts")}
+    assert chunks["View"]["metadata"]["methods"] == ["onClick", "render"]
+    assert chunks["onClick"]["metadata"] == {"args": ["event"], "class_name": "View"}
+    assert (chunks["onClick"]["line_start"], chunks["onClick"]["line_end"]) == (2, 4)
+    assert chunks["format"]["content"].startswith("export const format = (value, unit) => {")
+    assert chunks["format"]["metadata"] == {"args": ["value", "unit"]}
+
+
+def test_small_neighbouring_functions_are_merged(monkeypatch):
+    monkeypatch.setattr("job.chunkers.budget.CHUNK_MIN_CHARS", 200)
+    source = "".join(f"function f{i}() {{\n  return {i};\n}}\n" for i in range(5))
+    chunks = chunk_javascript(source, "small.js")
+    assert len(chunks) == 1
+    assert chunks[0]["metadata"]["names"] == [f"f{i}" for i in range(5)]
+
+
+def test_oversized_functions_are_split_within_the_budget(monkeypatch):
+    monkeypatch.setattr("job.chunkers.budget.CHUNK_MAX_CHARS", 500)
+    body = "".join(f"  total += step({i});\n" for i in range(100))
+    source = f"const x = 1; function big(step) {{\n  let total = 0;\n{body}  return total;\n}}\n"
+    chunks = chunk_javascript(source, "big.js")
+    assert len(chunks) > 1
+    assert all(len(chunk["content"]) <= 500 for chunk in chunks)
+    # Parts are exact pieces of the function, which starts mid-line
+    assert "\n".join(chunk["content"] for chunk in chunks) == source[len("const x = 1; "):].rstrip("\n")
+    assert chunks[0]["line_start"] == 1 and chunks[-1]["line_end"] == source.count("\n")
+
+
+def test_minified_bundle_falls_back_to_budget_sized_chunks():
+    source = "".join(
+        f"function f{i}(a){{if(a){{return a/{i}}}return`${{a}}`}}class C{i}{{m(){{return /x/g}}}}" for i in range(2000)
+    )
+    assert "\n" not in source and len(source) > 100000
+    chunks = CodePreprocessor().preprocess_file({"path": "dist/app.min.js", "extension": ".js", "content": source})
+    assert max(len(chunk["content"]) for chunk in chunks) <= 3000
+    assert len(chunks) <= len(source) // 3000 + 1
+    assert "".join(chunk["content"] for chunk in chunks) == source
@@ -0,0 +1,60 @@
+import asyncio
+
+import numpy as np
+
+from support import FakeEmbeddingGenerator
+from job.local_vectorstore import LocalVectorStore
+from job.services import CodePreprocessor
+
+
+def payload(file_path: str, content: str, version: str = "v1") -> dict:
+    return {
+        "owner": "octo", "repo_name": "repo", "branch": "main", "index_version": version,
+        "file_path": file_path, "type": "generic", "document": content,
+    }
+
+
+def vectors(*texts: str) -> np.ndarray:
+    return FakeEmbeddingGenerator().embed_texts(list(texts))
+
+
+def scope(version: str = "v1") -> dict:
+    return {"repo_name": "repo", "owner": "octo", "index_versions": [version]}
+
+
+def test_duplicate_id_in_a_batch_keeps_the_last_and_one_row(tmp_path):
+    store = LocalVectorStore(persist_directory=str(tmp_path), dimension=8)
+
+    async def run():
+        await store.ensure_collection()
+        await asyncio.to_thread(
+            store._upsert, ["a", "b", "a"], vectors("first", "other", "second"),
+            [payload("a.py", "first"), payload("b.py", "other"), payload("a.py", "second")],
+        )
+        hits = (await store.query_batch(vectors("second"), scope(), 10))[0]
+        await store.delete_index_version("repo", "octo", "main", "v1")
+        after = (await store.query_batch(vectors("second"), scope(), 10))[0]
+        return hits, after
+
+    hits, after = asyncio.run(run())
+    assert sorted(hit.id for hit in hits) == ["a", "b"]
+    assert {hit.id: hit.payload["document"] for hit in hits}["a"] == "second"
+    assert hits[0].id == "a" and hits[0].score > 0.999
+    assert after == []
+    assert store.rows_by_id == {}
+    assert sorted(store.free) == [0, 1]
+
+
+def test_methods_sharing_a_line_are_all_stored(tmp_path):
+    source = "class Store{load(){return 1}save(){return 2}}\nconst api={get(a){return a+1},put(a){return a+2}};\n"
+    chunks = CodePreprocessor().preprocess_file({"path": "dist/app.min.js", "extension": ".js", "content": source})
+    store = LocalVectorStore(persist_directory=str(tmp_path), dimension=8)
+
+    async def run():
+        await store.store_embeddings(FakeEmbeddingGenerator().generate_embeddings(chunks), "repo", "octo", "main", "v1")
+        return (await store.query_batch(vectors("anything"), scope(), 100))[0]
+
+    hits = asyncio.run(run())
+    assert len(chunks) > 2
+    assert len(hits) == len(chunks)
+    assert len({hit.id for hit in hits}) == len(chunks)
@@ -0,0 +1,122 @@
+import pytest
+
+from job.chunkers.markup import markdown_chunker, section_chunker, sql_chunker, yaml_chunker
+from job.chunkers.registry import get_chunker
+from job.chunkers.structural import indent_chunker
+from job.services import CodePreprocessor
+
+
+@pytest.fixture(autouse=True)
+def no_merging(monkeypatch):
+    # Keep every section its own chunk, so the boundaries can be checked
+    monkeypatch.setattr("job.chunkers.budget.CHUNK_MIN_CHARS", 1)
+
+
+def spans(chunks):
+    return [(chunk["name"], chunk["line_start"], chunk["line_end"]) for chunk in chunks]
+
+
+def test_markdown_splits_on_headings_outside_code_fences():
+    source = (
+        "Intro text.\n"
+        "\n"
+        "# Setup\n"
+        "Install it.\n"
+        "\n"
+        "## Linux\n"
+        "```sh\n"
+        "# not a heading\n"
+        "```\n"
+        "\n"
+        "# Usage ##\n"
+        "Run it.\n"
+    )
+    chunks = markdown_chunker(source, "README.md")
+    assert spans(chunks) == [("README.md", 1, 1), ("Setup", 3, 4), ("Linux", 6, 9), ("Usage", 11, 12)]
+    assert [chunk["metadata"]["headings"] for chunk in chunks] == [[], ["Setup"], ["Setup", "Linux"], ["Usage"]]
+    assert chunks[2]["content"] == "## Linux\n```sh\n# not a heading\n```"
+
+
+def test_yaml_splits_on_top_level_keys_with_their_comments():
+    source = (
+        "---\n"
+        "# Service name\n"
+        "name: api\n"
+        "\n"
+        "services:\n"
+        "  web:\n"
+        "    image: nginx\n"
+        "  db: {}\n"
+        '"on": push\n'
+    )
+    chunks = yaml_chunker(source, "compose.yml")
+    assert spans(chunks) == [("name", 2, 3), ("services", 5, 8), ("on", 9, 9)]
+    assert chunks[0]["content"] == "# Service name\nname: api"
+    assert all(chunk["type"] == "key" for chunk in chunks)
+
+
+def test_sql_splits_on_statement_boundaries_only():
+    source = (
+        "-- users; and their names\n"
+        "CREATE TABLE users (\n"
+        "  name TEXT DEFAULT 'a;b'\n"
+        ");\n"
+        "INSERT INTO users VALUES ('x'); /* ; */ SELECT 1;\n"
+        "CREATE FUNCTION f() RETURNS int AS $$ SELECT 1; $$ LANGUAGE sql;\n"
+        "DROP TABLE users\n"
+    )
+    chunks = sql_chunker(source, "schema.sql")
+    assert spans(chunks) == [
+        ("CREATE TABLE users (", 1, 4),
+        ("INSERT INTO users VALUES", 5, 5),
+        ("SELECT 1;", 5, 5),
+        ("CREATE FUNCTION f() RETURNS", 6, 6),
+        ("DROP TABLE users", 7, 7),
+    ]
+    assert all(chunk["type"] == "statement" for chunk in chunks)
+
+
+def test_ini_and_toml_split_on_sections():
+    source = "; defaults\nroot = true\n\n[server]\nport = 80\n\n[[plugins]]\nname = \"x\"\n"
+    chunks = section_chunker(source, "setup.ini")
+    assert spans(chunks) == [("setup.ini", 1, 2), ("server", 4, 5), ("plugins", 7, 8)]
+    assert section_chunker("a = 1\n", "setup.ini") == []
+
+
+def test_indent_chunker_splits_top_level_units():
+    source = (
+        "require 'json'\n"
+        "\n"
+        "# Parses things\n"
+        "class Parser\n"
+        "  def parse(text)\n"
+        "    JSON.parse(text)\n"
+        "  end\n"
+        "end\n"
+        "\n"
+        "def self.helper\n"
+        "  1\n"
+        "end\n"
+    )
+    chunks = indent_chunker(source, "parser.rb")
+    assert [(chunk["type"], *span) for chunk, span in zip(chunks, spans(chunks))] == [
+        ("declarations", "parser.rb:1", 1, 1),
+        ("class", "Parser", 3, 8),
+        ("function", "helper", 10, 12),
+    ]
+
+
+def test_oversized_indented_classes_are_split_into_methods(monkeypatch):
+    monkeypatch.setattr("job.chunkers.structural.CHUNK_MAX_CHARS", 60)
+    source = "class Store\n  def add(item)\n    items << item\n  end\n\n  def clear\n    items.clear\n  end\nend\n"
+    chunks = indent_chunker(source, "store.rb")
+    assert spans(chunks) == [("Store", 1, 1), ("add", 2, 4), ("clear", 6, 8)]
+    assert [chunk["metadata"] for chunk in chunks[1:]] == [{"class_name": "Store"}] * 2
+
+
+def test_javascript_is_routed_through_the_registry():
+    source = "function add(a, b) {\n  return a + b;\n}\n"
+    processor = CodePreprocessor()
+    assert processor.language_parsers[".tsx"] is get_chunker(".tsx")
+    chunks = processor.preprocess_file({"path": "add.js", "extension": ".js", "content": source})
+    assert [(chunk["type"], chunk["name"]) for chunk in chunks] == [("function", "add")]
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from support import FakeEmbeddingGenerator
+from job.pipeline import IndexingPipeline
+from job.vectorstore import CodeVectorStore
+
+
+class FakeProcessor:
+    """One chunk per line of each file"""
+
+    async def preprocess_stream(self, files):
+        async for file_data in files:
+            lines = file_data["content"].splitlines()
+            yield file_data, [
+                {"file_path": file_data["path"], "content": line, "type": "generic", "line_start": i + 1, "line_end": i + 1}
+                for i, line in enumerate(lines)
+            ]
+
+
+class FailingEmbeddingGenerator(FakeEmbeddingGenerator):
+    def generate_embeddings(self, chunks):
+        raise RuntimeError("model unavailable")
+
+
+async def files(count: int, lines: int, produced: list = None):
+    for i in range(count):
+        if produced is not None:
+            produced.append(i)
+        yield {"path": f"src/file_{i}.py", "content": "\n".join(f"x_{i}_{j} = {j}" for j in range(lines))}
+
+
+def make_store(tmp_path) -> CodeVectorStore:
+    return CodeVectorStore(location=":memory:", persist_directory=str(tmp_path), dimension=8, upsert_batch_size=16)
+
+
+def make_pipeline(store, embedding_generator, **kwargs) -> IndexingPipeline:
+    return IndexingPipeline(FakeProcessor(), embedding_generator, store, "repo", "octo", "main", "v1", **kwargs)
+
+
+def test_pipeline_stores_every_chunk(tmp_path):
+    async def run():
+        store = make_store(tmp_path)
+        await store.ensure_collection()
+        stats = await make_pipeline(store, FakeEmbeddingGenerator(), queue_size=4, embed_batch_size=8).run(files(30, 5))
+        count = (await store.qdrant_client.count(collection_name=store.collection_name)).count
+        await store.close()
+        return stats, count
+
+    stats, count = asyncio.run(run())
+    assert stats["fetch"]["items_out"] == 30
+    assert stats["parse"]["items_out"] == 150
+    assert stats["embed"]["items_out"] == 150
+    assert stats["store"]["items_out"] == 150
+    assert count == 150
+
+
+def test_failing_stage_cancels_the_others_without_hanging(tmp_path):
+    produced = []
+
+    async def run():
+        store = make_store(tmp_path)
+        await store.ensure_collection()
+        pipeline = make_pipeline(store, FailingEmbeddingGenerator(), queue_size=2, embed_batch_size=2)
+        try:
+            with pytest.raises(RuntimeError, match="model unavailable"):
+                await asyncio.wait_for(pipeline.run(files(1000, 3, produced)), timeout=10)
+        finally:
+            await store.close()
+
+    asyncio.run(run())
+    # The bounded queues stop the fetch stage long before it reads the whole input
+    assert len(produced) < 100
+
+
+def test_cancelled_run_does_not_hang(tmp_path):
+    async def slow_files():
+        async for file_data in files(1000, 3):
+            await asyncio.sleep(0.001)
+            yield file_data
+
+    async def run():
+        store = make_store(tmp_path)
+        await store.ensure_collection()
+        task = asyncio.create_task(make_pipeline(store, FakeEmbeddingGenerator(), queue_size=2, embed_batch_size=2).run(slow_files()))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(task, timeout=10)
+        await store.close()
+
+    asyncio.run(run())
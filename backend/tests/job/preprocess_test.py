@@ -0,0 +1,36 @@
+import asyncio
+import threading
+
+import job.services as services
+from job.services import PARALLEL_PARSE_MIN_BYTES, CodePreprocessor
+
+
+class RecordingPreprocessor(CodePreprocessor):
+    def __init__(self):
+        super().__init__()
+        self.threads = {}
+
+    def preprocess_file(self, file_data):
+        self.threads[file_data["path"]] = threading.current_thread() is threading.main_thread()
+        return super().preprocess_file(file_data)
+
+
+async def as_stream(files):
+    for file_data in files:
+        yield file_data
+
+
+def test_without_a_pool_large_files_parse_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(services, "get_parse_executor", lambda: None)
+    small = {"path": "small.py", "extension": ".py", "content": "def f():\n    return 1\n"}
+    large = {"path": "large.py", "extension": ".py", "content": "def g():\n    return 2\n" * (PARALLEL_PARSE_MIN_BYTES // 10)}
+    processor = RecordingPreprocessor()
+
+    async def run():
+        return [(file_data["path"], chunks) async for file_data, chunks in processor.preprocess_stream(as_stream([small, large, small]))]
+
+    results = asyncio.run(run())
+    assert [path for path, _ in results] == ["small.py", "large.py", "small.py"]
+    assert all(chunks for _, chunks in results)
+    # Tiny files stay inline; anything larger goes to a thread
+    assert processor.threads == {"small.py": True, "large.py": False}
@@ -0,0 +1,109 @@
+from job.services import CodePreprocessor
+
+SOURCE = '''"""Accounts."""
+import os
+from typing import Optional
+
+LIMIT = int(os.getenv("LIMIT", "10"))
+
+
+@dataclass
+class Account(Base):
+    """A user account."""
+    name: str = ""
+
+    @property
+    def label(self) -> str:
+        return self.name.title()
+
+    async def fetch(self, y): return y
+
+    def rename(self,
+               name):
+        self.name = name
+
+
+@cache
+def lookup(name):
+    return Account(name)
+
+
+if __name__ == "__main__":
+    print(lookup("octo"))
+'''
+
+
+def parse(source: str = SOURCE):
+    return CodePreprocessor().parse_python(source, "accounts.py")
+
+
+def by_name(chunks):
+    return {chunk["name"]: chunk for chunk in chunks}
+
+
+def test_class_skeleton_keeps_decorators_and_elides_every_body():
+    skeleton = by_name(parse())["Account"]
+    assert skeleton["content"] == (
+        '@dataclass\n'
+        'class Account(Base):\n'
+        '    """A user account."""\n'
+        '    name: str = ""\n'
+        '    @property\n'
+        '    def label(self) -> str:\n'
+        '        ...\n'
+        '    async def fetch(self, y): ...\n'
+        '    def rename(self,\n'
+        '               name):\n'
+        '        ...'
+    )
+    assert (skeleton["line_start"], skeleton["line_end"]) == (8, 21)
+    assert skeleton["metadata"]["methods"] == ["label", "fetch", "rename"]
+
+
+def test_method_chunks_hold_each_body_once():
+    chunks = by_name(parse())
+    assert chunks["label"]["content"] == "    def label(self) -> str:\n        return self.name.title()"
+    assert chunks["label"]["metadata"] == {"args": ["self"], "decorators": ["property"], "class_name": "Account"}
+    assert chunks["fetch"]["content"] == "    async def fetch(self, y): return y"
+    assert chunks["rename"]["content"] == "    def rename(self,\n               name):\n        self.name = name"
+    # No method body line is copied into the skeleton
+    skeleton = chunks["Account"]["content"]
+    for body in ("return self.name.title()", "return y", "self.name = name"):
+        assert body not in skeleton
+
+
+def test_module_level_code_is_kept():
+    chunks = parse()
+    assert [(chunk["type"], chunk["name"]) for chunk in chunks] == [
+        ("statements", "accounts.py:5"),
+        ("class", "Account"),
+        ("function", "label"),
+        ("function", "fetch"),
+        ("function", "rename"),
+        ("function", "lookup"),
+        ("statements", "accounts.py:29"),
+        ("module", "accounts.py"),
+    ]
+    chunks = by_name(chunks)
+    assert chunks["accounts.py:5"]["content"] == 'LIMIT = int(os.getenv("LIMIT", "10"))'
+    assert chunks["accounts.py:5"]["metadata"] == {"names": ["LIMIT"]}
+    assert chunks["accounts.py:29"]["content"] == 'if __name__ == "__main__":\n    print(lookup("octo"))'
+    assert chunks["lookup"]["content"] == "@cache\ndef lookup(name):\n    return Account(name)"
+    assert chunks["accounts.py"]["metadata"] == {"imports": ["import os", "from typing import Optional"], "docstring": "Accounts."}
+
+
+def test_nested_classes_and_one_line_classes():
+    chunks = by_name(parse("class Outer:\n    class Inner: pass\n\n    def run(self): return 1\n"))
+    assert chunks["Outer"]["content"] == "class Outer:\n    class Inner: ...\n    def run(self): ..."
+    assert chunks["Inner"]["content"] == "    class Inner: pass"
+    assert chunks["Inner"]["metadata"]["class_name"] == "Outer"
+    assert chunks["run"]["content"] == "    def run(self): return 1"
+
+
+def test_long_module_level_tables_are_split(monkeypatch):
+    monkeypatch.setattr("job.services.CHUNK_MAX_CHARS", 200)
+    source = "TABLE = {\n" + "".join(f"    'key_{i}': {i},\n" for i in range(100)) + "}\n"
+    parts = parse(source)
+    assert len(parts) > 1
+    assert all(len(part["content"]) <= 200 for part in parts)
+    assert "\n".join(part["content"] for part in parts) == source.rstrip("\n")
@@ -0,0 +1,50 @@
+from job.search import CodeSearch
+
+FILES = {
+    "app/views.py": "def index(request):\n    return render_page(request)\n",
+    "app/models.py": "class User:\n    def full_name(self):\n        return self.name\n",
+}
+
+
+def search(indexing, code_search, query, mode="lexical"):
+    return indexing.run(code_search.search("octo", "repo", [query], mode=mode))[0]
+
+
+def test_results_are_not_served_from_cache_after_an_incremental_reindex(indexing):
+    indexing.files = dict(FILES)
+    live = indexing.index()
+    code_search = CodeSearch(indexing.store, indexing.embedding_generator)
+
+    assert [hit["file_path"] for hit in search(indexing, code_search, "render_page")] == ["app/views.py"]
+    assert code_search.results.hits == 0
+    search(indexing, code_search, "render_page")
+    assert code_search.results.hits == 1
+
+    indexing.files["app/views.py"] = "def index(request):\n    return redirect(request)\n"
+    result = indexing.index(incremental=True)
+    # Same version, new manifest revision
+    assert result["index_version"] == live["index_version"]
+    assert search(indexing, code_search, "render_page") == []
+    assert [hit["file_path"] for hit in search(indexing, code_search, "redirect")] == ["app/views.py"]
+
+
+def test_unindexed_repo_returns_none(indexing):
+    code_search = CodeSearch(indexing.store, indexing.embedding_generator)
+    assert indexing.run(code_search.search("octo", "repo", ["anything"])) is None
+
+
+def test_per_query_ef_reaches_the_vector_store_and_keys_the_cache(indexing):
+    indexing.files = dict(FILES)
+    indexing.index()
+    code_search = CodeSearch(indexing.store, indexing.embedding_generator)
+    seen = []
+    query_batch = indexing.store.query_batch
+
+    async def spy(vectors, qdrant_filter, limit, ef=None):
+        seen.append(ef)
+        return await query_batch(vectors, qdrant_filter, limit, ef=ef)
+
+    indexing.store.query_batch = spy
+    for ef in (None, 128, 128):
+        indexing.run(code_search.search("octo", "repo", ["user name"], mode="vector", ef=ef))
+    assert seen == [None, 128]
@@ -0,0 +1,73 @@
+from job.search import CodeSearch, fuse
+from job.symbol_index import identifier_terms, is_identifier_query, search_symbols
+
+FILES = {
+    "src/auth/tokens.py": "def refreshAccessToken(token):\n    return issue(token)\n",
+    "src/auth/session.py": "class SessionStore:\n    def load(self, key):\n        return self.backend.get(key)\n",
+    "docs/guide.md": "# Tokens\n\nHow access tokens are refreshed.\n",
+}
+
+
+def test_identifier_terms_split_camel_and_snake_case():
+    assert identifier_terms("getUserName") == ["getusername", "get", "user", "name"]
+    assert identifier_terms("parse_http_url") == ["parse_http_url", "parse", "http", "url"]
+    assert is_identifier_query("SessionStore")
+    assert not is_identifier_query("where are tokens refreshed")
+
+
+def test_exact_identifier_ranks_first_and_filters_apply(indexing):
+    indexing.files = dict(FILES)
+    live = indexing.index()
+    versions = {"main": live["index_version"]}
+
+    hits = search_symbols("octo", "repo", versions, "refreshAccessToken")
+    assert hits[0]["name"] == "refreshAccessToken"
+    assert hits[0]["file_path"] == "src/auth/tokens.py"
+    # Prefix of an indexed identifier
+    assert search_symbols("octo", "repo", versions, "SessionSt")[0]["name"] == "SessionStore"
+    docs = search_symbols("octo", "repo", versions, "tokens", path_prefix="docs")
+    assert docs and all(hit["file_path"].startswith("docs/") for hit in docs)
+    classes = search_symbols("octo", "repo", versions, "SessionStore", chunk_type="class")
+    assert classes and all(hit["type"] == "class" for hit in classes)
+
+
+def test_symbol_hits_use_the_vector_point_ids(indexing):
+    indexing.files = dict(FILES)
+    live = indexing.index()
+    stored = {point["id"] for point in indexing.points(index_version=live["index_version"])}
+    hits = search_symbols("octo", "repo", {"main": live["index_version"]}, "refreshAccessToken")
+    assert hits and {hit["id"] for hit in hits} <= stored
+
+
+def test_identifier_query_with_symbol_hits_skips_the_embedding(indexing):
+    indexing.files = dict(FILES)
+    indexing.index()
+    code_search = CodeSearch(indexing.store, indexing.embedding_generator)
+    calls = indexing.embedding_generator.calls
+
+    hits = indexing.run(code_search.search("octo", "repo", ["refreshAccessToken"]))[0]
+    assert hits[0]["name"] == "refreshAccessToken"
+    assert "issue(token)" in hits[0]["document"]
+    assert indexing.embedding_generator.calls == calls
+    assert code_search.embeddings_skipped == 1
+
+    # Natural-language queries are embedded and fused with the lexical ranking
+    indexing.run(code_search.search("octo", "repo", ["how are tokens refreshed"]))
+    assert indexing.embedding_generator.calls == calls + 1
+
+
+def test_incremental_run_removes_deleted_files_from_the_symbol_index(indexing):
+    indexing.files = dict(FILES)
+    live = indexing.index()
+    del indexing.files["src/auth/session.py"]
+    indexing.index(incremental=True)
+    assert search_symbols("octo", "repo", {"main": live["index_version"]}, "SessionStore") == []
+
+
+def test_fuse_rewards_hits_found_by_both_rankings():
+    lexical = [{"id": "a"}, {"id": "b"}]
+    vector = [{"id": "b", "document": "b"}, {"id": "c", "document": "c"}]
+    fused = fuse({"lexical": lexical, "vector": vector}, limit=3)
+    assert [hit["id"] for hit in fused] == ["b", "a", "c"]
+    assert fused[0]["sources"] == ["lexical", "vector"]
+    assert fused[0]["document"] == "b"
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from support import FakeEmbeddingGenerator
+from job.services import CodePreprocessor
+from job.vectorstore import CodeVectorStore, point_id
+
+MINIFIED_JS = (
+    "const api={get(a){return a+1},put(a){return a+2},del(a){return a+3}};"
+    "class Store{load(){return 1}save(){return 2}}\n"
+)
+
+
+def make_store(tmp_path) -> CodeVectorStore:
+    return CodeVectorStore(location=":memory:", persist_directory=str(tmp_path), dimension=8)
+
+
+def test_chunks_sharing_a_line_get_distinct_point_ids():
+    chunks = CodePreprocessor().preprocess_file({"path": "dist/app.min.js", "extension": ".js", "content": MINIFIED_JS})
+    spans = [(chunk["line_start"], chunk["line_end"], chunk["type"]) for chunk in chunks]
+    assert len(set(spans)) < len(spans)
+    ids = [point_id("octo", "repo", "main", "v1", chunk) for chunk in chunks]
+    assert len(set(ids)) == len(ids)
+    # Stable across runs, so re-indexing a version overwrites in place
+    assert ids == [point_id("octo", "repo", "main", "v1", chunk) for chunk in CodePreprocessor().preprocess_file(
+        {"path": "dist/app.min.js", "extension": ".js", "content": MINIFIED_JS}
+    )]
+
+
+def test_every_parsed_chunk_is_stored(tmp_path):
+    chunks = CodePreprocessor().preprocess_file({"path": "dist/app.min.js", "extension": ".js", "content": MINIFIED_JS})
+
+    async def run():
+        store = make_store(tmp_path)
+        await store.ensure_collection()
+        await store.store_embeddings(FakeEmbeddingGenerator().generate_embeddings(chunks), "repo", "octo", "main", "v1")
+        count = (await store.qdrant_client.count(collection_name=store.collection_name)).count
+        await store.close()
+        return count
+
+    assert asyncio.run(run()) == len(chunks)
+
+
+def test_duplicate_ids_in_a_batch_are_rejected(tmp_path):
+    chunk = {"file_path": "a.py", "content": "x = 1", "type": "generic", "line_start": 1, "line_end": 1}
+    batch = FakeEmbeddingGenerator().generate_embeddings([chunk, dict(chunk)])
+
+    async def run():
+        store = make_store(tmp_path)
+        await store.ensure_collection()
+        try:
+            with pytest.raises(ValueError, match="Duplicate point id"):
+                await store.store_embeddings(batch, "repo", "octo", "main", "v1")
+        finally:
+            await store.close()
+
+    asyncio.run(run())
+
+
+def test_per_query_ef_overrides_only_that_query(tmp_path):
+    store = CodeVectorStore(location=":memory:", persist_directory=str(tmp_path), dimension=8, quantization="int8", search_ef=64)
+    assert store._search_params(None).hnsw_ef == 64
+    params = store._search_params(256)
+    assert params.hnsw_ef == 256
+    assert params.quantization.rescore == store.search_params.quantization.rescore
+    assert store.search_params.hnsw_ef == 64
+
+    chunk = {"file_path": "a.py", "content": "x = 1", "type": "generic", "line_start": 1, "line_end": 1}
+    batch = FakeEmbeddingGenerator().generate_embeddings([chunk])
+
+    async def run():
+        await store.ensure_collection()
+        await store.store_embeddings(batch, "repo", "octo", "main", "v1")
+        found = await store.query_batch(batch.vectors, store.search_filter("repo", "octo", ["v1"]), 5, ef=256)
+        await store.close()
+        return found
+
+    assert [point.payload["file_path"] for point in asyncio.run(run())[0]] == ["a.py"]
+
+
+def test_clear_all_keeps_the_collection_layout(tmp_path):
+    # The local Qdrant doesn't report quantization or payload indexes back, so record the calls
+    calls = []
+
+    async def run():
+        store = CodeVectorStore(location=":memory:", persist_directory=str(tmp_path), dimension=8, quantization="int8", vectors_on_disk=True)
+        client = store.qdrant_client
+        for name in ("create_collection", "create_payload_index"):
+            def record(*args, _name=name, _call=getattr(client, name), **kwargs):
+                calls.append((_name, kwargs))
+                return _call(*args, **kwargs)
+            setattr(client, name, record)
+        await store.ensure_collection()
+        chunk = {"file_path": "a.py", "content": "x = 1", "type": "generic", "line_start": 1, "line_end": 1}
+        await store.store_embeddings(FakeEmbeddingGenerator().generate_embeddings([chunk]), "repo", "octo", "main", "v1")
+        created = len(calls)
+        await store.clear_all()
+        count = (await client.count(collection_name=store.collection_name)).count
+        await store.close()
+        return created, count
+
+    created, count = asyncio.run(run())
+    assert count == 0
+    assert calls[0][0] == "create_collection"
+    assert calls[0][1]["quantization_config"] is not None
+    assert calls[0][1]["vectors_config"].on_disk is True
+    # Recreated exactly as ensure_collection first created it, payload indexes included
+    assert calls[created:] == calls[:created]
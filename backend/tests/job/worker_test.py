@@ -0,0 +1,42 @@
+import asyncio
+
+import job.worker as worker
+from job.worker import IndexJobManager
+
+
+def test_cancel_while_marking_running_stops_the_job(monkeypatch):
+    records = {}
+    started = []
+
+    async def create_index_job(record):
+        records[record["job_id"]] = dict(record)
+
+    async def update_index_job(job_id, fields):
+        records[job_id].update(fields)
+        if fields.get("status") == "running":
+            # Let the cancel request run while this write is in flight
+            await asyncio.sleep(0.01)
+
+    async def index_repository(*args, **kwargs):
+        started.append(True)
+        await asyncio.sleep(0)
+        return {"stages": {}}
+
+    monkeypatch.setattr(worker, "create_index_job", create_index_job)
+    monkeypatch.setattr(worker, "update_index_job", update_index_job)
+    monkeypatch.setattr(worker, "index_repository", index_repository)
+
+    async def run():
+        manager = IndexJobManager(workers=1)
+        manager.worker_tasks = [asyncio.create_task(manager._worker())]
+        job_id = await manager.submit("octo", "repo", "token", "main", "archive", False)
+        while records[job_id]["status"] != "running":
+            await asyncio.sleep(0)
+        assert await manager.cancel(job_id)
+        await asyncio.wait_for(manager.queue.join(), timeout=5)
+        await manager.stop()
+        return records[job_id]
+
+    record = asyncio.run(run())
+    assert record["status"] == "cancelled"
+    assert not started
@@ -0,0 +1,56 @@
+"""Test doubles shared by the test modules (conftest.py only holds fixtures)"""
+import hashlib
+from http.server import BaseHTTPRequestHandler
+
+import numpy as np
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status: int, body: bytes, headers: dict = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeBatch:
+    """Same shape as job.embeddings.EmbeddingBatch"""
+
+    def __init__(self, chunks, texts, vectors):
+        self.chunks = chunks
+        self.texts = texts
+        self.vectors = vectors
+
+    def __len__(self):
+        return len(self.chunks)
+
+
+class FakeEmbeddingGenerator:
+    """Deterministic unit vectors derived from each text's hash"""
+
+    cache_namespace = "fake"
+
+    def __init__(self, dimension: int = 8):
+        self.dimension = dimension
+        self.calls = 0
+
+    def create_enhanced_text(self, chunk):
+        return f"File: {chunk['file_path']}\n{chunk['content']}"
+
+    def embed_texts(self, texts):
+        self.calls += 1
+        rows = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+            row = np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+            rows.append(row / np.linalg.norm(row))
+        return np.array(rows, dtype=np.float32).reshape(len(texts), self.dimension)
+
+    def generate_embeddings(self, chunks):
+        texts = [self.create_enhanced_text(chunk) for chunk in chunks]
+        return FakeBatch(chunks, texts, self.embed_texts(texts))
@@ -0,0 +1,95 @@
+import json
+import socket
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import pytest
+import uvicorn
+from fastapi import FastAPI
+
+import githubapi.cache as cache
+import githubapi.client as client
+import user.routes as routes
+from auth.schemas import UserTokenInfo
+from support import QuietHandler
+
+PAGES = 4
+PER_PAGE = 2
+
+
+class GitHubRepos(QuietHandler):
+    """/user/repos in PAGES pages of PER_PAGE; pages listed in `failing` answer 500"""
+    failing = ()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        page = int(parse_qs(url.query).get("page", ["1"])[0])
+        if url.path != "/user/repos" or page in self.failing:
+            return self.send_body(500, b'{"message": "Server Error"}')
+        repos = [{"name": f"repo-{page}-{i}"} for i in range(PER_PAGE)]
+        link = f'<{url.path}?page={page + 1}>; rel="next", <{url.path}?page={PAGES}>; rel="last"' if page < PAGES else ""
+        self.send_body(200, json.dumps(repos).encode(), {"Content-Type": "application/json", "Link": link})
+
+
+@pytest.fixture
+def serve_repos(http_server, monkeypatch):
+    """Serve the /user router with uvicorn against a fake GitHub that fails the given pages"""
+    servers = []
+
+    async def verify_token(request):
+        return UserTokenInfo(username="octo", name="Octo", id="1", avatar_url="")
+
+    async def get_user_access_token(user_token_info):
+        return "token"
+
+    async def get_installation_id(username):
+        return None
+
+    monkeypatch.setattr(routes, "verify_token", verify_token)
+    monkeypatch.setattr(routes, "get_user_access_token", get_user_access_token)
+    monkeypatch.setattr(routes, "get_installation_id", get_installation_id)
+    monkeypatch.setattr(cache, "_cache", cache.GitHubResponseCache())
+
+    def start(failing=()) -> str:
+        handler = type("Handler", (GitHubRepos,), {"failing": tuple(failing)})
+        monkeypatch.setattr(client, "GITHUB_API_URL", http_server(handler))
+        monkeypatch.setattr(client, "_client", None)
+        app = FastAPI()
+        app.include_router(routes.router)
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        server = uvicorn.Server(uvicorn.Config(app, log_level="critical", lifespan="off"))
+        threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+        while not server.started:
+            time.sleep(0.01)
+        servers.append(server)
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+    yield start
+    for server in servers:
+        server.should_exit = True
+
+
+def test_every_page_is_streamed_as_one_array(serve_repos):
+    repos = httpx.get(serve_repos() + "/user/repos").json()
+    assert sorted(repo["name"] for repo in repos) == sorted(f"repo-{page}-{i}" for page in range(1, PAGES + 1) for i in range(PER_PAGE))
+    assert all(repo["app_access"] is False for repo in repos)
+
+
+def test_first_page_failure_is_an_error_status(serve_repos):
+    response = httpx.get(serve_repos(failing=[1]) + "/user/repos")
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Failed to fetch repositories from GitHub"}
+
+
+def test_later_page_failure_aborts_the_response(serve_repos):
+    with httpx.stream("GET", serve_repos(failing=[3]) + "/user/repos") as response:
+        assert response.status_code == 200
+        body = b""
+        with pytest.raises(httpx.RemoteProtocolError):
+            for chunk in response.iter_bytes():
+                body += chunk
+    # Never closed into a valid (but incomplete) array
+    assert body.startswith(b"[") and not body.endswith(b"]")
@@ -552,19 +552,25 @@ async function createJob() {
             installCommand: installCommand,
             commands: commands,
         };
+        let indexJobId = null;
         try{
             const response = await fetch("http://localhost:8000/job/index-repository",{
                 method:'POST',
                 credentials:'include',
                 body:JSON.stringify(jobData)
             })
+            if (response.ok) {
+                const data = await response.json();
+                indexJobId = data.job_id;
+            }
         } catch(error){
             console.log(`Error indexing repo ${error}`)
         }
         console.log("Job created:", jobData);
 
-        // Redirect to jobs page with success message
-        window.location.href = `jobs.html?success=Job created successfully for ${repoName}`;
+        // Redirect to jobs page with success message; the jobs page follows indexing progress
+        const indexParam = indexJobId ? `&index_job=${encodeURIComponent(indexJobId)}` : "";
+        window.location.href = `jobs.html?success=Job created successfully for ${repoName}${indexParam}`;
     } catch (error) {
         createBtn.disabled = false;
         createBtn.innerHTML = `
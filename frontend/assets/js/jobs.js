@@ -117,6 +117,86 @@ class AIJobsManager {
         });
     }
 
+    renderJobs() {
+        const indexJobId = new URLSearchParams(window.location.search).get("index_job");
+        if (!indexJobId) return;
+
+        const jobGrid = document.getElementById("jobGrid");
+        const card = document.createElement("div");
+        card.className = "job-card";
+        card.id = `index-job-${indexJobId}`;
+        jobGrid.prepend(card);
+        this.renderIndexJob(card, { status: "queued", progress: {} });
+        this.watchIndexJob(indexJobId, card);
+    }
+
+    watchIndexJob(jobId, card) {
+        const source = new EventSource(
+            `http://localhost:8000/job/index-jobs/${jobId}/events`,
+            { withCredentials: true }
+        );
+        source.addEventListener("progress", (event) => {
+            this.renderIndexJob(card, JSON.parse(event.data));
+        });
+        source.addEventListener("end", () => source.close());
+        source.onerror = () => {
+            console.error("Lost connection to indexing progress feed");
+            source.close();
+        };
+    }
+
+    async cancelIndexJob(jobId) {
+        try {
+            await fetch(`http://localhost:8000/job/index-jobs/${jobId}/cancel`, {
+                method: "POST",
+                credentials: "include",
+            });
+        } catch (error) {
+            console.error("Error cancelling index job:", error);
+        }
+    }
+
+    renderIndexJob(card, job) {
+        const statusClass = {
+            queued: "status-pending",
+            running: "status-running",
+            completed: "status-completed",
+            failed: "status-failed",
+            cancelled: "status-failed",
+        }[job.status] || "status-pending";
+        const progress = job.progress || {};
+        const active = job.status === "queued" || job.status === "running";
+
+        card.innerHTML = `
+            <div class="job-header">
+                <div>
+                    <div class="job-title">Repository indexing</div>
+                    <div class="job-repo">${job.job_id || ""}</div>
+                </div>
+                <span class="job-status ${statusClass}">${job.status}</span>
+            </div>
+            <div class="job-description">
+                ${progress.files_fetched || 0} files fetched,
+                ${progress.files_parsed || 0} parsed,
+                ${progress.chunks_embedded || 0} chunks embedded,
+                ${progress.chunks_stored || 0} stored
+                ${job.error ? '<br><span class="job-error"></span>' : ""}
+            </div>
+            <div class="job-meta">
+                ${active ? '<button class="filter-btn cancel-index-job">Cancel</button>' : ""}
+            </div>
+        `;
+        // Error text can quote repository paths; never parse it as HTML
+        const errorEl = card.querySelector(".job-error");
+        if (errorEl) {
+            errorEl.textContent = job.error;
+        }
+        const cancelBtn = card.querySelector(".cancel-index-job");
+        if (cancelBtn && job.job_id) {
+            cancelBtn.addEventListener("click", () => this.cancelIndexJob(job.job_id));
+        }
+    }
+
     showRepoLoading() {
         this.elements.repoList.innerHTML = `
             <div class="repo-loading">